@@ -0,0 +1,211 @@
+"""Read-only JSON views of a game for bots and scoreboards.
+
+Served under /api/v1, with /api following the latest version. Every
+response carries a weak ETag built from the game's version, so polling an
+unchanged game costs one primary key lookup and a 304.
+"""
+import gzip
+import json
+import os
+import uuid
+
+import flask
+import werkzeug.exceptions
+
+import db
+import handles
+import util
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+VERSION = 1
+
+# Responses smaller than this aren't worth compressing
+COMPRESS_MIN_BYTES = int(os.getenv("API_COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.getenv("API_GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("API_BROTLI_QUALITY", 5))
+
+PLAYER_PAGE_SIZE = int(os.getenv("API_PLAYER_PAGE_SIZE", 500))
+PLAYER_PAGE_MAX = int(os.getenv("API_PLAYER_PAGE_MAX", 5000))
+
+GAME_FIELDS = ("id", "name", "owner", "started", "announcement", "version", "updated_at")
+LOG_FIELDS = ("cursor", "ts", "text")
+
+bp = flask.Blueprint('api', __name__)
+
+
+def dumps(value: object) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def json_response(body: bytes, status: int = 200) -> flask.Response:
+    response = flask.Response(body, status, mimetype="application/json")
+    response.headers["API-Version"] = str(VERSION)
+    return response
+
+
+def selected_fields(allowed: tuple[str, ...]) -> tuple[str, ...]:
+    """Parses `?fields=a,b`, defaulting to every field."""
+    value = flask.request.args.get("fields")
+    if not value:
+        return allowed
+    fields = tuple(dict.fromkeys(f.strip() for f in value.split(",") if f.strip()))
+    if not fields or any(f not in allowed for f in fields):
+        flask.abort(400, f"fields must be drawn from {', '.join(allowed)}")
+    return fields
+
+
+def page_limit(default: int, most: int) -> int:
+    limit = flask.request.args.get("limit", default, type=int)
+    if not 0 < limit <= most:
+        flask.abort(400, f"limit must be between 1 and {most}")
+    return limit
+
+
+def resolve_game(game_id_param: str) -> uuid.UUID:
+    game_id = util.str_to_uuid(game_id_param)
+    if not game_id:
+        flask.abort(404)
+    return game_id
+
+
+def not_modified(version: int, owner: bool | None = None) -> flask.Response | None:
+    """Sets up the ETag for a response at `version`, returning the 304 to
+    send instead if the client already has it. Pass `owner` for responses
+    that show the game's owner more than everyone else."""
+    etag = f"v{VERSION}-{version}"
+    if owner is not None:
+        etag += "-owner" if owner else "-public"
+        flask.g.api_varies = True
+    flask.g.api_etag = etag
+    if flask.request.if_none_match.contains_weak(etag):
+        return json_response(b"", 304)
+    return None
+
+
+@bp.after_request
+def finish_response(response: flask.Response) -> flask.Response:
+    etag = flask.g.pop("api_etag", None)
+    if etag is not None and response.status_code in (200, 304):
+        response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    if flask.g.pop("api_varies", False):
+        response.vary.add("Cookie")
+
+    if (response.status_code != 200 or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or (response.content_length or 0) < COMPRESS_MIN_BYTES):
+        return response
+    accepted = flask.request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        response.set_data(brotli.compress(response.get_data(), quality=BROTLI_QUALITY))
+        response.headers["Content-Encoding"] = "br"
+    elif accepted["gzip"]:
+        response.set_data(gzip.compress(response.get_data(), GZIP_LEVEL))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+# The app answers 400s and 404s with HTML, and handlers for a code win over
+# handlers for a class, so those two are named here
+@bp.errorhandler(400)
+@bp.errorhandler(404)
+@bp.errorhandler(werkzeug.exceptions.HTTPException)
+def error_handler(e: werkzeug.exceptions.HTTPException):
+    return json_response(dumps({"error": e.description if e.code == 400 else e.name}), e.code or 500)
+
+
+@bp.get("/games/<game_id_param>")
+def game_handler(game_id_param: str):
+    fields = selected_fields(GAME_FIELDS)
+    game = db.get_game_by_id(resolve_game(game_id_param))
+    if not game:
+        flask.abort(404)
+    owner = game.owner is not None and flask.g.account_id == game.owner
+    if (response := not_modified(game.version, owner)) is not None:
+        return response
+
+    values = {
+        "id": game_id_param,
+        "name": game.name,
+        # Known to everyone else by the handle the players list gives them
+        "owner": game.owner if owner or game.owner is None else handles.player(game.id.bytes, game.owner),
+        "started": bool(game.started),
+        "announcement": game.announcement,
+        "version": game.version,
+        "updated_at": game.updated_at,
+    }
+    return json_response(dumps({f: values[f] for f in fields}))
+
+
+@bp.get("/games/<game_id_param>/players")
+def players_handler(game_id_param: str):
+    """The roster, `limit` players at a time; pass the `next` of one page
+    as `?after=` to get the following one. Each player's id is their
+    account id for the game's owner and an opaque handle for everyone
+    else, and `next` is sealed, since it holds an account id."""
+    fields = selected_fields(tuple(db.PLAYER_FIELDS))
+    limit = page_limit(PLAYER_PAGE_SIZE, PLAYER_PAGE_MAX)
+    after = None
+    if (value := flask.request.args.get("after")) is not None:
+        after = handles.unseal(value)
+        if after is None:
+            flask.abort(400, "after must be the next of a page")
+    game = db.get_game_by_id(resolve_game(game_id_param))
+    if not game:
+        flask.abort(404)
+    owner = game.owner is not None and flask.g.account_id == game.owner
+    if (response := not_modified(game.version, owner)) is not None:
+        return response
+
+    page = db.get_players_json(game.id, fields, limit, after, by_handle=not owner)
+    if page is None:
+        flask.abort(404)
+    players, next_id = page
+    next_cursor = handles.seal(next_id) if next_id is not None else None
+    # SQLite has already rendered each player, so they're spliced in as is
+    return json_response(b'{"players":[' + ",".join(players).encode() + b'],"next":' + dumps(next_cursor) + b"}")
+
+
+@bp.get("/games/<game_id_param>/logs")
+def logs_handler(game_id_param: str):
+    """The combat log, oldest first. `?after=` and `?before=` take the
+    cursor of an entry, as with the game page's log."""
+    fields = selected_fields(LOG_FIELDS)
+    limit = page_limit(db.LOG_PAGE_SIZE, db.LOG_PAGE_MAX)
+    cursors = {}
+    for name in ("after", "before"):
+        value = flask.request.args.get(name)
+        if value is not None:
+            cursors[name] = util.str_to_log_cursor(value)
+            if cursors[name] is None:
+                flask.abort(400, f"{name} must be a log cursor")
+    if len(cursors) > 1:
+        flask.abort(400, "after and before can't be combined")
+
+    game_id = resolve_game(game_id_param)
+    version = db.get_game_version(game_id)
+    if not version:
+        flask.abort(404)
+    if (response := not_modified(version[0])) is not None:
+        return response
+
+    page = db.get_game_logs(game_id, limit, **cursors)
+    if page is None:
+        flask.abort(404)
+    logs = []
+    for log in page.logs:
+        values = {"cursor": log.cursor, "ts": log.ts, "text": log.to_str()}
+        logs.append({f: values[f] for f in fields})
+    return json_response(dumps({"logs": logs, "more": page.more}))
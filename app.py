@@ -1,5 +1,7 @@
+import logging
 import os
 import flask
+import api
 import db
 import auth
 import game
@@ -10,15 +12,22 @@ import users
 def create_app() -> flask.Flask:
     app = flask.Flask(__name__)
     dotenv.load_dotenv()
+    # Where the modules' loggers go, including the seed each game starts with
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     app.secret_key = os.getenv("FLASK_SECRET")
 
     # Register db shutdown funcs
     db.init_app(app)
+    auth.init_app(app)
     users.init_app(app)
+    game.init_app(app)
     
     # Register Blueprints
     app.register_blueprint(auth.bp)
     app.register_blueprint(game.bp)
+    app.register_blueprint(api.bp, url_prefix=f"/api/v{api.VERSION}")
+    # Unversioned paths serve the latest version
+    app.register_blueprint(api.bp, url_prefix="/api", name="api_latest")
 
     @app.errorhandler(400)
     def _(_):
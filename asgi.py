@@ -0,0 +1,154 @@
+import asyncio
+import os
+import re
+import time
+import urllib.parse
+from typing import Any, Awaitable, Callable
+
+import a2wsgi
+import flask
+import werkzeug.http
+
+import app
+import auth
+import db
+import events
+import util
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[dict]]
+Send = Callable[[dict], Awaitable[None]]
+
+GAME_EVENTS_PATH = re.compile(r"^/games/([^/]+)/events$")
+
+
+def request_headers(scope: Scope) -> dict[str, str]:
+    """The request's headers by lowercase name. A header sent more than once
+    is joined into one value with commas, except Cookie, whose lines join
+    with "; " as a single Cookie header would hold them."""
+    headers: dict[str, str] = {}
+    for raw_name, raw_value in scope["headers"]:
+        name = raw_name.decode("latin-1").lower()
+        value = raw_value.decode("latin-1")
+        if name in headers:
+            value = f"{headers[name]}{'; ' if name == 'cookie' else ','}{value}"
+        headers[name] = value
+    return headers
+
+
+def join_cookies(scope: Scope) -> Scope:
+    """The scope with any Cookie lines folded into one header. The WSGI
+    adapter joins repeated headers with commas, which would run separate
+    Cookie lines together into one cookie."""
+    cookies = [value for name, value in scope["headers"] if name.lower() == b"cookie"]
+    if len(cookies) < 2:
+        return scope
+    headers = [(name, value) for name, value in scope["headers"] if name.lower() != b"cookie"]
+    return {**scope, "headers": headers + [(b"cookie", b"; ".join(cookies))]}
+
+
+class AsgiApp:
+    """Serves the Flask app over ASGI.
+
+    Live event streams are handled natively on the event loop, so an idle
+    viewer costs a queue rather than a thread. Every other request runs the
+    regular WSGI app through a2wsgi on a bounded thread pool, which also
+    keeps all SQLite access off the event loop.
+    """
+
+    def __init__(self, flask_app: flask.Flask, max_workers: int) -> None:
+        self.flask_app = flask_app
+        self.wsgi = a2wsgi.WSGIMiddleware(flask_app, workers=max_workers)
+        self.executor = self.wsgi.executor
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+
+        match = GAME_EVENTS_PATH.match(scope["path"])
+        if match and scope["method"] == "GET":
+            return await self.game_events(scope, receive, send, match.group(1))
+        await self.wsgi(join_cookies(scope), receive, send)
+
+    async def lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def run_db(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Runs a `db` accessor on the executor inside an app context."""
+        def call():
+            with self.flask_app.app_context():
+                return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    async def game_events(self, scope: Scope, receive: Receive, send: Send, game_id_param: str) -> None:
+        game_id = util.str_to_uuid(game_id_param)
+        version = await self.run_db(db.get_game_version, game_id) if game_id else None
+        if not game_id or not version:
+            # Let the blueprint render its usual 404
+            return await self.wsgi(join_cookies(scope), receive, send)
+
+        headers = request_headers(scope)
+        token = werkzeug.http.parse_cookie(headers.get("cookie", "")).get("jwt_cookie")
+        account_id = auth.read_bearer_token(token) if token else None
+        query = urllib.parse.parse_qs(scope["query_string"].decode("latin-1"))
+        seen = headers.get("last-event-id") or next(iter(query.get("v", [])), None)
+
+        broker: events.Broker = self.flask_app.extensions['game_events']
+        sub = broker.subscribe_async(game_id.bytes, account_id)
+        if sub is None:
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [(b"retry-after", str(int(events.KEEPALIVE_SECONDS)).encode())],
+            })
+            await send({"type": "http.response.body", "body": b"Too many live streams"})
+            return
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream; charset=utf-8"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            })
+            chunk = "retry: 5000\n\n"
+            if seen is not None and seen != str(version[0]):
+                chunk += events.format_sse({"type": "refresh"})
+            await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+
+            deadline = time.monotonic() + events.STREAM_SECONDS
+            while time.monotonic() < deadline:
+                next_event = asyncio.ensure_future(sub.get(timeout=events.KEEPALIVE_SECONDS))
+                await asyncio.wait((next_event, watcher), return_when=asyncio.FIRST_COMPLETED)
+                if watcher.done():
+                    next_event.cancel()
+                    return
+                event = next_event.result()
+                chunk = events.format_sse(event) if event else ": keepalive\n\n"
+                await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            watcher.cancel()
+            broker.unsubscribe(sub)
+
+
+def create_asgi_app() -> AsgiApp:
+    return AsgiApp(app.create_app(), int(os.getenv("ASGI_WORKER_THREADS", 16)))
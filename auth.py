@@ -1,59 +1,117 @@
 import datetime
+import hashlib
+import logging
+import math
 import os
-import sys
+import time
 import jwt
-import jwt.algorithms
 import secrets
 import flask
 import werkzeug.exceptions
 import requests
-import functools
+import cache
 import db
+import oidc
 from typedefs import Account
 
+log = logging.getLogger(__name__)
+
 AUTH_SCOPE = "openid profile email"
 
+# Loaded once by init_app rather than read from the environment per request
+_secret: str | None = None
+# Whether a missing secret has been reported; every token call retries the
+# load, and one error per process says as much as one per request
+_reported_missing = False
+
+def load_secret() -> str | None:
+    global _secret, _reported_missing
+    _secret = os.getenv("JWT_SECRET") or None
+    if not _secret and not _reported_missing:
+        _reported_missing = True
+        log.error("auth: no JWT_SECRET set, so no bearer token can be issued or read")
+    return _secret
+
+class VerifiedTokens:
+    """Bounded LRU of bearer tokens whose signature has already been checked,
+    keyed by their digest and holding (account id, expiry). An entry stops
+    being served once the token expires, so it never outlives the token."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.backend = cache.LRUBackend(max_entries)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes) -> str | None:
+        entry = self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        account_id, exp = entry
+        if exp <= time.time():
+            self.backend.delete(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return account_id
+
+    def put(self, key: bytes, account_id: str, exp: float) -> None:
+        self.backend.set(key, (account_id, exp))
+
+verified_tokens = VerifiedTokens(int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 4096)))
+
 def create_bearer_token(user_id: str) -> str:
-    secret = os.getenv("JWT_SECRET")
+    secret = _secret or load_secret()
     if not secret:
-        print("[ERROR] No JWT_SECRET set!", file=sys.stderr)
         return ""
     exp = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
     return jwt.encode({'user_id': user_id, 'exp': exp}, secret, algorithm="HS256")
 
 def read_bearer_token(token: str) -> str | None:
+    key = hashlib.sha256(token.encode()).digest()
+    account_id = verified_tokens.get(key)
+    if account_id:
+        return account_id
     try:
-        secret = os.getenv("JWT_SECRET")
+        secret = _secret or load_secret()
         if not secret:
-            print("[ERROR] No JWT_SECRET set!", file=sys.stderr)
             return None
         res = jwt.decode(token, secret, algorithms="HS256")
+        verified_tokens.put(key, res["user_id"], res.get("exp", math.inf))
         return res["user_id"]
     except:
         return None
 
+def load_account():
+    """Resolves the caller from their cookie once per request."""
+    token = flask.request.cookies.get("jwt_cookie")
+    flask.g.account_id = read_bearer_token(token) if token else None
+
+def init_app(app: flask.Flask):
+    load_secret()
+    app.before_request(load_account)
+
 bp = flask.Blueprint('auth', __name__)
 
-@functools.cache
+discovery = oidc.CachedDocument(lambda: os.getenv("OIDC_DISCOVERY_URL", "<NONE>"), dict)
+
 def oidc_get_discovery():
-    return requests.get(os.getenv("OIDC_DISCOVERY_URL", "<NONE>")).json()
+    return discovery.get()
 
-@functools.cache
 def oidc_issuer() -> str:
     return oidc_get_discovery()["issuer"]
 
-@functools.cache
 def oidc_auth_endpoint() -> str:
     return oidc_get_discovery()["authorization_endpoint"]
 
-@functools.cache
 def oidc_token_endpoint() -> str:
     return oidc_get_discovery()["token_endpoint"]
 
-@functools.cache
 def oidc_jwks_endpoint() -> str:
     return oidc_get_discovery()["jwks_uri"]
 
+signing_keys = oidc.KeySet(oidc_jwks_endpoint)
+
 @bp.post("/auth")
 def oauth_begin():
     state = secrets.token_urlsafe(16)
@@ -86,7 +144,7 @@ def oauth_cb():
 
     code = flask.request.args.get("code")
 
-    token_response = requests.post(
+    token_response = oidc.session.post(
         oidc_token_endpoint(),
         data={
             "client_id": os.getenv("AUTH_CLIENT_ID", "<NONE>"),
@@ -97,6 +155,7 @@ def oauth_cb():
             "scope": AUTH_SCOPE,
         },
         headers={"Content-Type": "application/x-www-form-urlencoded"},
+        timeout=oidc.HTTP_TIMEOUT,
     )
 
     try:
@@ -108,18 +167,12 @@ def oauth_cb():
     id_token = tokens.get('id_token')
 
     # Validate
-    jwks = requests.get(oidc_jwks_endpoint()).json()["keys"]
     unverified_header = jwt.get_unverified_header(id_token)
 
-    key = next(
-        (k for k in jwks if k["kid"] == unverified_header["kid"]),
-        None,
-    )
-    if key is None:
+    public_key = signing_keys.get(unverified_header["kid"])
+    if public_key is None:
         raise Exception("Signing key not found")
 
-    public_key = jwt.algorithms.RSAAlgorithm.from_jwk(key)
-
     try:
         claims = jwt.decode(
             id_token,
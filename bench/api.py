@@ -0,0 +1,51 @@
+"""Compares serializing a large roster through `typedefs.User` with the
+JSON API's path, where SQLite renders each player, and measures what
+compression and conditional requests save.
+
+    python -m bench.api [players] [iterations]
+"""
+import gzip
+import json
+import sys
+from dataclasses import asdict
+
+from bench import common
+
+import api
+import db
+import util
+
+
+def through_dataclasses(game_id) -> bytes:
+    users = db.get_users_by_game(game_id)
+    return json.dumps({"players": [asdict(u) for u in users]}, separators=(",", ":")).encode()
+
+
+def main(players: int = 5000, iterations: int = 200):
+    app = common.make_app()
+    with app.app_context():
+        game_id, _ = common.populate(players, eliminated=players // 3)
+        fields = tuple(db.PLAYER_FIELDS)
+        for label, fn in (
+            ("typedefs.User + json.dumps", lambda: through_dataclasses(game_id)),
+            ("get_players_json", lambda: db.get_players_json(game_id, fields, players)),
+        ):
+            common.report(label, common.timed(fn, iterations))
+
+    client = app.test_client()
+    url = f"/api/games/{util.uuid_to_str(game_id)}/players?limit={min(players, api.PLAYER_PAGE_MAX)}"
+    plain = client.get(url)
+    compressed = client.get(url, headers={"Accept-Encoding": "br, gzip"})
+    print(f"roster: {len(plain.data)} bytes, {len(compressed.data)} with "
+          f"{compressed.headers.get('Content-Encoding')} ({len(gzip.compress(plain.data, 9))} at gzip -9)")
+    etag = plain.headers["ETag"]
+    for label, headers in (
+        ("GET players", {}),
+        ("GET players, compressed", {"Accept-Encoding": "br, gzip"}),
+        ("GET players, If-None-Match", {"If-None-Match": etag}),
+    ):
+        common.report(label, common.timed(lambda: client.get(url, headers=headers), iterations))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
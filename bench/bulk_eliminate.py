@@ -0,0 +1,37 @@
+"""Compares eliminating a batch of players one call at a time with
+`db.eliminate_users`.
+
+    python -m bench.bulk_eliminate [players] [batch]
+"""
+import random
+import sys
+import time
+
+from bench import common
+
+import db
+
+
+def main(players: int = 10_000, batch: int = 1000):
+    app = common.make_app()
+    with app.app_context():
+        for label, run in (
+            ("eliminate_user x batch", lambda g, e: [db.eliminate_user(g, t, c) for t, c in e]),
+            ("eliminate_users", db.eliminate_users),
+        ):
+            game_id, ids = common.populate(players)
+            rng = random.Random(1)
+            eliminations = [(t, rng.randint(0, 1)) for t in rng.sample(ids, batch)]
+
+            counter = common.QueryCounter()
+            counter.attach(db.get_db())
+            start = time.perf_counter()
+            run(game_id, eliminations)
+            elapsed = time.perf_counter() - start
+            db.get_db().set_trace_callback(None)
+            print(f"{label:<32} players={players} batch={batch} total={elapsed * 1000:9.1f}ms "
+                  f"per_elimination={elapsed / batch * 1000:.3f}ms statements={counter.count}")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
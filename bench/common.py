@@ -0,0 +1,112 @@
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import flask
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import app
+import auth
+import db
+import instrument
+
+
+def make_app() -> flask.Flask:
+    """Creates an app backed by a fresh database in a temporary directory."""
+    work = tempfile.mkdtemp(prefix="assassins-bench-")
+    os.makedirs(os.path.join(work, "data"))
+    os.chdir(work)
+    os.environ.setdefault("JWT_SECRET", "bench-secret-bench-secret-bench-secret")
+    os.environ.setdefault("FLASK_SECRET", "bench")
+    os.environ.setdefault("METRICS_TOKEN", "bench")
+
+    a = app.create_app()
+    with a.app_context():
+        db.init_db(db.get_db())
+    return a
+
+
+def metrics(client, path: str):
+    """Reads a /metrics route as a scraper holding METRICS_TOKEN would."""
+    return client.get(path, headers={"Authorization": f"Bearer {os.environ['METRICS_TOKEN']}"})
+
+
+def populate(players: int, eliminated: int = 0, seed: int = 0) -> tuple[uuid.UUID, list[str]]:
+    """Creates a started game with `players` players, `eliminated` of which
+    have already been knocked out. Must be called inside an app context."""
+    rng = random.Random(seed)
+    conn = db.get_db()
+    game_id = uuid.uuid4()
+    ids = [f"bench-{game_id.hex[:8]}-{i}" for i in range(players)]
+
+    conn.execute("""INSERT INTO games (uuid, name) VALUES (?, ?)""",
+                 (game_id.bytes, f"Bench {players}"))
+    conn.executemany("""INSERT INTO accounts (id, name, email) VALUES (?, ?, ?)""",
+                     [(i, f"Player {i}", f"{i}@example.com") for i in ids])
+    conn.executemany("""INSERT INTO users (account_id, game_id) VALUES (?, ?)""",
+                     [(i, game_id.bytes) for i in ids])
+    conn.execute("""UPDATE games SET owner_id = ? WHERE uuid = ?""", (ids[0], game_id.bytes))
+    conn.execute("""INSERT INTO game_stats (game_id, players, alive) VALUES (?, ?, ?)""",
+                 (game_id.bytes, players, players))
+    conn.commit()
+
+    ring = ids[:]
+    rng.shuffle(ring)
+    db.set_user_targets(game_id, [(ring[i], ring[(i + 1) % len(ring)]) for i in range(len(ring))])
+    for target in rng.sample(ids[1:], eliminated):
+        db.eliminate_user(game_id, target, rng.randint(0, 1))
+    return game_id, ids
+
+
+def synthetic(games: int, players: int, played: float = 0.5, seed: int = 0) -> list[tuple[uuid.UUID, list[str]]]:
+    """Creates `games` started games of `players` players each, with
+    `played` of each ring already eliminated and logged. Must be called
+    inside an app context."""
+    eliminated = min(int(players * played), players - 2)
+    return [populate(players, eliminated=eliminated, seed=seed + i) for i in range(games)]
+
+
+def login(client, account_id: str):
+    client.set_cookie("jwt_cookie", auth.create_bearer_token(account_id))
+
+
+class QueryCounter:
+    """Counts the statements issued on a connection via its trace callback,
+    ignoring transaction control."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, statement: str) -> None:
+        if instrument.is_query(statement):
+            self.count += 1
+
+    def attach(self, conn) -> None:
+        conn.set_trace_callback(self)
+
+
+def timed(fn, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def report(label: str, samples: list[float], **extra) -> None:
+    ordered = sorted(samples)
+    p50 = statistics.median(ordered)
+    p99 = percentile(ordered, 0.99)
+    fields = " ".join(f"{k}={v}" for k, v in extra.items())
+    print(f"{label:<32} n={len(samples):<6} p50={p50 * 1000:8.3f}ms p99={p99 * 1000:8.3f}ms {fields}")
@@ -0,0 +1,42 @@
+"""Measures bytes sent and CPU time per reload of an unchanged game page,
+with and without the client revalidating its cached copy.
+
+    python -m bench.conditional [players] [iterations]
+"""
+import sys
+import time
+
+from bench import common
+
+import util
+
+
+def main(players: int = 1000, iterations: int = 500):
+    app = common.make_app()
+    with app.app_context():
+        game_id, ids = common.populate(players, eliminated=players // 4)
+
+    url = f"/games/{util.uuid_to_str(game_id)}"
+    client = app.test_client()
+    common.login(client, ids[1])
+    etag = client.get(url).headers["ETag"]
+
+    for label, headers in (("full render", {}), ("If-None-Match", {"If-None-Match": etag})):
+        sent = 0
+        statuses = set()
+        cpu_start = time.process_time()
+
+        def reload():
+            nonlocal sent
+            response = client.get(url, headers=headers)
+            statuses.add(response.status_code)
+            sent += len(response.get_data())
+
+        samples = common.timed(reload, iterations)
+        cpu = (time.process_time() - cpu_start) / iterations
+        common.report(label, samples, status=sorted(statuses), bytes_per_req=sent // iterations,
+                      cpu_ms_per_req=f"{cpu * 1000:.3f}")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
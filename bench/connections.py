@@ -0,0 +1,40 @@
+"""Compares opening a connection per request with borrowing one from the
+pool, and prints the pool counters afterwards.
+
+    python -m bench.connections [iterations]
+"""
+import sqlite3
+import sys
+
+from bench import common
+
+import db
+
+
+def connect_per_request(path: str):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.row_factory = sqlite3.Row
+    conn.execute("SELECT * FROM games LIMIT 1").fetchall()
+    conn.close()
+
+
+def main(iterations: int = 2000):
+    app = common.make_app()
+    with app.app_context():
+        common.populate(50)
+        path = db.get_pool().config.path
+
+    def pooled():
+        with app.app_context():
+            db.get_db().execute("SELECT * FROM games LIMIT 1").fetchall()
+
+    common.report("connect per request", common.timed(lambda: connect_per_request(path), iterations))
+    common.report("pooled", common.timed(pooled, iterations))
+
+    client = app.test_client()
+    print(common.metrics(client, "/metrics/db-pool").json)
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
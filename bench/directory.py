@@ -0,0 +1,116 @@
+"""Times the game directory over a large number of games: reading every
+game as db.get_games does, against a page of db.get_game_directory at the
+top and deep into the listing, by status, by OFFSET for comparison, and
+searching names for rare, common and partly typed words, where the matches
+come newest first and a page of a common word should cost no more than
+one of a rare word.
+
+    python -m bench.directory [games] [iterations]
+"""
+import random
+import sys
+import time
+import uuid
+
+from bench import common
+
+import db
+
+SEASONS = ("Spring", "Summer", "Fall", "Winter")
+KINDS = ("Assassins", "Water Gun", "Spoon", "Sock Wars", "Killer")
+# Most games on a long-running host are over
+STATUSES = (("open", 0.05), ("started", 0.10), ("finished", 0.85))
+
+
+def places(n: int, rng: random.Random) -> list[str]:
+    syllables = ("ka", "lo", "mi", "ren", "tor", "va", "bel", "dun", "sha", "quo", "ix", "zu")
+    return [" ".join(("".join(rng.choices(syllables, k=3)).capitalize(), rng.choice(("Hall", "House", "Dorm", "Club"))))
+            for _ in range(n)]
+
+
+def build(games: int, seed: int = 0) -> list[str]:
+    """Writes `games` games straight into the tables, with the triggers
+    filling games_fts as they go. Returns the place names used."""
+    rng = random.Random(seed)
+    where = places(1000, rng)
+    statuses, weights = zip(*STATUSES)
+    conn = db.get_db()
+    conn.execute("BEGIN")
+    for start in range(0, games, 50_000):
+        rows = []
+        for _ in range(min(50_000, games - start)):
+            status = rng.choices(statuses, weights)[0]
+            players = rng.randint(10, 200)
+            name = f"{rng.choice(SEASONS)} {rng.randint(2015, 2026)} {rng.choice(where)} {rng.choice(KINDS)}"
+            rows.append((uuid.uuid4().bytes, name, status != "open", status, players,
+                         1 if status == "finished" else players // 2))
+        conn.executemany("""INSERT INTO games (uuid, name, started, status) VALUES (?, ?, ?, ?)""",
+                         (r[:4] for r in rows))
+        conn.executemany("""INSERT INTO game_stats (game_id, players, alive) VALUES (?, ?, ?)""",
+                         ((r[0], r[4], r[5]) for r in rows))
+    conn.commit()
+    return where
+
+
+def main(games: int = 1_000_000, iterations: int = 200):
+    app = common.make_app()
+    with app.app_context():
+        start = time.perf_counter()
+        where = build(games)
+        print(f"{games} games, built in {time.perf_counter() - start:.1f}s")
+        conn = db.get_db()
+
+        common.report("get_games, every game", common.timed(db.get_games, 3))
+
+        middle = conn.execute("""SELECT name, uuid FROM games ORDER BY name, uuid LIMIT 1 OFFSET ?""",
+                              (games // 2,)).fetchone()
+        middle = (middle[0], middle[1])
+        for status in (None, "open", "started", "finished"):
+            label = status or "all"
+            first = db.get_game_directory(status)
+            assert len(first.games) == db.DIRECTORY_PAGE_SIZE and first.more
+            common.report(f"directory, {label}, first page", common.timed(lambda: db.get_game_directory(status), iterations))
+            common.report(f"directory, {label}, middle page",
+                          common.timed(lambda: db.get_game_directory(status, after=middle), iterations))
+
+        common.report("OFFSET, all, middle page", common.timed(lambda: conn.execute(f"""
+            SELECT {db.LISTING_COLUMNS} FROM games
+            LEFT JOIN game_stats ON game_stats.game_id = games.uuid
+            ORDER BY games.name, games.uuid LIMIT ? OFFSET ?""", (db.DIRECTORY_PAGE_SIZE + 1, games // 2)).fetchall(), 5))
+
+        place = where[0].split()[0]
+        for label, search, status in (("rare word", place, None),
+                                      ("rare word, prefix", place[:4], None),
+                                      ("two words", f"{place} {SEASONS[0]}", None),
+                                      ("common word", "assassins", None),
+                                      ("common word, open", "assassins", "open"),
+                                      ("two-letter prefix", "wa", None)):
+            page = db.get_game_directory(status, search)
+            matches = conn.execute("""SELECT count(*) FROM games_fts WHERE games_fts MATCH ?""",
+                                   (db._match_query(search),)).fetchone()[0]
+            common.report(f"search, {label}", common.timed(lambda: db.get_game_directory(status, search), iterations),
+                          matches=matches, shown=len(page.games))
+
+        # Half way down the matches for a word in a fifth of the names
+        deep = conn.execute("""
+            SELECT name, uuid FROM games WHERE seq = (
+              SELECT rowid FROM games_fts WHERE games_fts MATCH 'assassins' AND rowid <= ?
+              ORDER BY rowid DESC LIMIT 1)""", (games // 2,)).fetchone()
+        deep = (deep[0], deep[1])
+        common.report("search, common word, middle page",
+                      common.timed(lambda: db.get_game_directory(search="assassins", after=deep), iterations))
+        common.report("search by name, common word", common.timed(lambda: conn.execute(f"""
+            SELECT {db.LISTING_COLUMNS} FROM games_fts
+            CROSS JOIN games ON games.seq = games_fts.rowid
+            LEFT JOIN game_stats ON game_stats.game_id = games.uuid
+            WHERE games_fts MATCH 'assassins'
+            ORDER BY games.name, games.uuid LIMIT ?""", (db.DIRECTORY_PAGE_SIZE + 1,)).fetchall(), 5))
+
+    client = app.test_client()
+    assert client.get("/").status_code == 200
+    common.report("index page, first page", common.timed(lambda: client.get("/"), iterations))
+    common.report("index page, search", common.timed(lambda: client.get(f"/?q={place}"), iterations))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,52 @@
+"""Compares loading a long game's whole combat log, as the page used to,
+with reading the latest page and polling for new entries by cursor.
+
+    python -m bench.game_logs [eliminations] [iterations]
+"""
+import sys
+
+from bench import common
+
+import db
+import util
+
+
+def full_history(game_id):
+    return db.get_db().execute("""
+        SELECT accounts.name AS user, targets.name AS target, log_messages.* FROM logs
+        LEFT JOIN accounts ON accounts.id = logs.user_id
+        LEFT JOIN accounts AS targets ON targets.id = logs.target_id
+        LEFT JOIN log_messages ON logs.msg_id = log_messages.id
+        WHERE logs.game_id = ?
+        ORDER BY logs.ts ASC, logs.id ASC""",
+                               (game_id.bytes,)).fetchall()
+
+
+def main(eliminations: int = 5000, iterations: int = 500):
+    app = common.make_app()
+    with app.app_context():
+        game_id, _ = common.populate(eliminations + 1, eliminated=eliminations)
+        latest = db.get_game_logs(game_id)
+        newest, oldest = latest.logs[-1].cursor, latest.logs[0].cursor
+        url = f"/games/{util.uuid_to_str(game_id)}"
+        print(f"{eliminations} log entries, {db.LOG_PAGE_SIZE} per page")
+
+        for label, fn in (
+            ("full history", lambda: full_history(game_id)),
+            ("latest page", lambda: db.get_game_logs(game_id)),
+            ("older page", lambda: db.get_game_logs(game_id, before=util.str_to_log_cursor(oldest))),
+        ):
+            common.report(label, common.timed(fn, iterations))
+
+    # Outside the app context, so each request gets its own
+    client = app.test_client()
+    cache = app.extensions['game_cache']
+    for label, fn in (
+        ("poll ?after= (nothing new)", lambda: client.get(f"{url}/logs", query_string={"after": newest})),
+        ("game page (cache miss)", lambda: (cache.clear(game_id.bytes), client.get(url))),
+    ):
+        common.report(label, common.timed(fn, iterations))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
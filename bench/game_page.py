@@ -0,0 +1,50 @@
+"""Compares the per-view cost of the game page before and after
+`db.get_game_snapshot`, with the game cache cold and warm.
+
+    python -m bench.game_page [players] [iterations]
+"""
+import sys
+
+from bench import common
+
+import db
+
+
+def legacy_view(game_id, viewer_id):
+    game = db.get_game_by_id(game_id)
+    users = db.get_users_by_game(game_id)
+    user = db.get_user_by_id(game_id, viewer_id)
+    target = None
+    if user and user.target_user_id:
+        target = db.get_user_by_id(game_id, user.target_user_id)
+    logs = db.get_game_logs(game_id)
+    return game, users, user, target, logs
+
+
+def cold_snapshot(game_id, viewer_id):
+    db.get_game_cache().clear(game_id.bytes)
+    return db.get_game_snapshot(game_id, viewer_id)
+
+
+def main(players: int = 500, iterations: int = 500):
+    app = common.make_app()
+    with app.app_context():
+        game_id, ids = common.populate(players, eliminated=players // 3)
+        viewer = ids[0]
+
+        for label, fn in (
+            ("legacy (separate queries)", lambda: legacy_view(game_id, viewer)),
+            ("get_game_snapshot (cache miss)", lambda: cold_snapshot(game_id, viewer)),
+            ("get_game_snapshot (cache hit)", lambda: db.get_game_snapshot(game_id, viewer)),
+        ):
+            counter = common.QueryCounter()
+            counter.attach(db.get_db())
+            fn()
+            per_request = counter.count
+            db.get_db().set_trace_callback(None)
+            common.report(label, common.timed(fn, iterations), queries=per_request)
+        print(db.get_game_cache().stats())
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
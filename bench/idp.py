@@ -0,0 +1,116 @@
+"""A stand-in OpenID Connect provider for exercising /auth and
+/auth/callback offline.
+
+It serves discovery, a JWKS, an authorize endpoint that signs in whoever is
+named by `login_hint` without prompting, and a token endpoint that issues
+RS256 ID tokens. Requests are counted per path.
+"""
+import collections
+import datetime
+import json
+import secrets
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+import jwt.algorithms
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+class StandInProvider:
+    def __init__(self, client_id: str, cache_control: str = "max-age=300, stale-while-revalidate=60") -> None:
+        self.client_id = client_id
+        self.cache_control = cache_control
+        self.requests: collections.Counter[str] = collections.Counter()
+        self._codes: dict[str, tuple[str, str | None]] = {}
+        self._lock = threading.Lock()
+        self.rotate()
+
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *_):
+                pass
+
+            def do_GET(self):
+                provider._handle(self, "GET")
+
+            def do_POST(self):
+                provider._handle(self, "POST")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def discovery_url(self) -> str:
+        return f"{self.url}/.well-known/openid-configuration"
+
+    def rotate(self) -> None:
+        """Replaces the signing key with a new one under a new kid."""
+        self.kid = secrets.token_hex(8)
+        self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(self.private_key.public_key()))
+        self.jwks = {"keys": [dict(jwk, kid=self.kid, use="sig", alg="RS256")]}
+
+    def close(self) -> None:
+        self.server.shutdown()
+
+    def _send(self, handler: BaseHTTPRequestHandler, status: int, body: dict | None = None,
+              headers: dict[str, str] | None = None) -> None:
+        data = json.dumps(body).encode() if body is not None else b""
+        handler.send_response(status)
+        for k, v in (headers or {}).items():
+            handler.send_header(k, v)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        url = urllib.parse.urlsplit(handler.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        with self._lock:
+            self.requests[url.path] += 1
+
+        if method == "GET" and url.path == "/.well-known/openid-configuration":
+            return self._send(handler, 200, {
+                "issuer": self.url,
+                "authorization_endpoint": f"{self.url}/authorize",
+                "token_endpoint": f"{self.url}/token",
+                "jwks_uri": f"{self.url}/jwks",
+            }, {"Cache-Control": self.cache_control})
+
+        if method == "GET" and url.path == "/jwks":
+            return self._send(handler, 200, self.jwks, {"Cache-Control": self.cache_control})
+
+        if method == "GET" and url.path == "/authorize":
+            code = secrets.token_urlsafe(16)
+            sub = query.get("login_hint") or f"standin-{secrets.token_hex(6)}"
+            with self._lock:
+                self._codes[code] = (sub, query.get("nonce"))
+            location = f"{query['redirect_uri']}?" + urllib.parse.urlencode({"code": code, "state": query.get("state", "")})
+            return self._send(handler, 302, headers={"Location": location})
+
+        if method == "POST" and url.path == "/token":
+            length = int(handler.headers.get("Content-Length", 0))
+            form = dict(urllib.parse.parse_qsl(handler.rfile.read(length).decode()))
+            with self._lock:
+                entry = self._codes.pop(form.get("code", ""), None)
+            if entry is None:
+                return self._send(handler, 400, {"error": "invalid_grant"})
+            sub, nonce = entry
+            now = datetime.datetime.now(datetime.timezone.utc)
+            claims = {
+                "iss": self.url, "aud": self.client_id, "sub": sub, "nonce": nonce,
+                "name": f"Player {sub}", "email": f"{sub}@example.com",
+                "iat": now, "exp": now + datetime.timedelta(minutes=5),
+            }
+            id_token = jwt.encode(claims, self.private_key, algorithm="RS256", headers={"kid": self.kid})
+            return self._send(handler, 200, {"id_token": id_token, "access_token": "standin", "token_type": "Bearer"})
+
+        self._send(handler, 404, {"error": "not_found"})
@@ -0,0 +1,257 @@
+"""Drives the app with concurrent clients through scripted scenarios over a
+synthetic database, and reports throughput, latency percentiles and how
+long writers waited on SQLite's write lock.
+
+    python -m bench.load [--games N] [--players M] [--played F]
+                         [--workers W] [--seconds S] [--only SCENARIO ...]
+                         [--save FILE] [--baseline FILE] [--tolerance T]
+
+Scenarios, run in this order against the same database:
+
+  signup        fresh accounts sign in through the stand-in identity
+                provider and join an open game (login_post_handler)
+  refresh       players of the synthetic games reload their game page
+                (get_game_handler)
+  eliminations  each game's owner eliminates players one at a time while
+                the other workers reload that game's page
+
+`--save` writes the results as JSON; `--baseline` compares against such a
+file and exits 1 if throughput or a latency percentile is worse by more
+than the tolerance (20% by default).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+from bench import common
+from bench.idp import StandInProvider
+from bench.login import login_flow, use_provider
+
+import db
+import util
+import writer
+
+CLIENT_ID = "assassins-bench"
+SCENARIOS = ("signup", "refresh", "eliminations")
+# Redirects are the handlers' success responses
+OK_STATUSES = (200, 302, 304)
+
+
+class Recorder:
+    """Collects request latencies by label from every worker thread."""
+
+    def __init__(self) -> None:
+        self.samples: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, label: str, seconds: float, ok: bool = True) -> None:
+        with self._lock:
+            self.samples.setdefault(label, []).append(seconds)
+            self.errors[label] = self.errors.get(label, 0) + (not ok)
+
+    def request(self, label: str, send):
+        start = time.perf_counter()
+        response = send()
+        self.add(label, time.perf_counter() - start, response.status_code in OK_STATUSES)
+        return response
+
+
+@dataclass
+class Result:
+    requests: int
+    errors: int
+    per_second: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+def summarize(recorder: Recorder, seconds: float) -> dict[str, Result]:
+    results = {}
+    for label, samples in recorder.samples.items():
+        ordered = sorted(samples)
+        results[label] = Result(
+            requests=len(ordered),
+            errors=recorder.errors[label],
+            per_second=len(ordered) / seconds,
+            p50_ms=common.percentile(ordered, 0.50) * 1000,
+            p95_ms=common.percentile(ordered, 0.95) * 1000,
+            p99_ms=common.percentile(ordered, 0.99) * 1000)
+    return results
+
+
+def drive(workers: int, seconds: float, step) -> float:
+    """Calls `step(worker)` from `workers` threads until `seconds` have
+    passed, or until a step returns False. Returns the elapsed time."""
+    deadline = time.monotonic() + seconds
+
+    def loop(worker: int) -> None:
+        while time.monotonic() < deadline:
+            if step(worker) is False:
+                return
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=loop, args=(w,)) for w in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def signed_in(app, account_id: str):
+    client = app.test_client()
+    common.login(client, account_id)
+    return client
+
+
+def signup(app, games, workers: int, seconds: float, recorder: Recorder) -> float:
+    with app.app_context():
+        open_games = [util.uuid_to_str(db.create_game(f"Open {i}")) for i in range(len(games))]
+    counter = iter(range(sys.maxsize))
+
+    def step(worker: int) -> None:
+        n = next(counter)
+        start = time.perf_counter()
+        client = login_flow(app, f"signup-{n}")
+        recorder.add("signup: sign in", time.perf_counter() - start)
+        recorder.request("signup: join", lambda: client.post(f"/games/{open_games[n % len(open_games)]}/login"))
+
+    return drive(workers, seconds, step)
+
+
+def refresh(app, games, workers: int, seconds: float, recorder: Recorder) -> float:
+    clients = [[(util.uuid_to_str(game_id), signed_in(app, account_id)) for account_id in ids[:workers]]
+               for game_id, ids in games]
+
+    def step(worker: int) -> None:
+        game, client = random.choice(clients[worker % len(clients)])
+        recorder.request("refresh: game page", lambda: client.get(f"/games/{game}"))
+
+    return drive(workers, seconds, step)
+
+
+def eliminations(app, games, workers: int, seconds: float, recorder: Recorder) -> float:
+    """One worker per game acts as its owner; the rest reload pages."""
+    owners = min(len(games), max(1, workers // 2))
+    with app.app_context():
+        alive = [[u.id for u in db.get_users_by_game(game_id) if not u.eliminated and u.id != ids[0]]
+                 for game_id, ids in games[:owners]]
+    for remaining in alive:
+        random.shuffle(remaining)
+    owner_clients = [signed_in(app, ids[0]) for _, ids in games[:owners]]
+    readers = [[signed_in(app, account_id) for account_id in ids[1:workers]] for _, ids in games[:owners]]
+    paths = [f"/games/{util.uuid_to_str(game_id)}" for game_id, _ in games[:owners]]
+
+    def step(worker: int) -> bool | None:
+        game = worker % owners
+        if worker < owners:
+            # Stop short of the last pair, where the ring can't shrink further
+            if len(alive[game]) < 2:
+                return False
+            target = alive[game].pop()
+            recorder.request("eliminations: eliminate", lambda: owner_clients[game].post(
+                f"{paths[game]}/eliminate_user", data={"user_id": target, "elim_count": 1}))
+        else:
+            client = random.choice(readers[game])
+            recorder.request("eliminations: game page", lambda: client.get(paths[game]))
+        return None
+
+    return drive(workers, seconds, step)
+
+
+def run(args) -> dict:
+    os.environ["AUTH_CLIENT_ID"] = CLIENT_ID
+    app = common.make_app()
+    idp = StandInProvider(CLIENT_ID)
+    use_provider(idp)
+    pool = app.extensions['db_pool']
+
+    start = time.perf_counter()
+    with app.app_context():
+        games = common.synthetic(args.games, args.players, args.played)
+    print(f"{args.games} games x {args.players} players, {args.played:.0%} played, "
+          f"built in {time.perf_counter() - start:.1f}s; {args.workers} workers, {args.seconds:g}s per scenario")
+
+    results: dict[str, dict] = {"config": {k: getattr(args, k) for k in ("games", "players", "played", "workers", "seconds")},
+                                "requests": {}, "locks": {}}
+    for name in args.only or SCENARIOS:
+        recorder = Recorder()
+        writer.lock_stats(reset=True)
+        pool_before = pool.stats()
+        elapsed = globals()[name](app, games, args.workers, args.seconds, recorder)
+        locks = writer.lock_stats()
+        pool_after = pool.stats()
+
+        for label, result in summarize(recorder, elapsed).items():
+            results["requests"][label] = asdict(result)
+            print(f"{label:<32} n={result.requests:<6} {result.per_second:8.1f}/s p50={result.p50_ms:8.3f}ms "
+                  f"p95={result.p95_ms:8.3f}ms p99={result.p99_ms:8.3f}ms errors={result.errors}")
+        results["locks"][name] = dict(asdict(locks), pool_waits=pool_after.waits - pool_before.waits,
+                                      pool_wait_seconds=pool_after.wait_seconds - pool_before.wait_seconds)
+        print(f"{'':<32} write lock: {locks.acquired} taken, {locks.contended} contended, {locks.failed} gave up, "
+              f"waited {locks.wait_seconds * 1000:.1f}ms (max {locks.max_wait_seconds * 1000:.1f}ms); "
+              f"pool waits: {pool_after.waits - pool_before.waits}")
+    idp.close()
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """Prints each measurement against the baseline's, returning whether
+    any is worse by more than `tolerance`."""
+    if results["config"] != baseline.get("config"):
+        print(f"note: baseline was run with {baseline.get('config')}")
+    regressed = False
+    for label, now in results["requests"].items():
+        then = baseline.get("requests", {}).get(label)
+        if not then:
+            continue
+        changes = []
+        for key, higher_is_better in (("per_second", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False)):
+            if not then[key]:
+                continue
+            change = now[key] / then[key] - 1
+            worse = -change if higher_is_better else change
+            flag = " !" if worse > tolerance else ""
+            regressed |= bool(flag)
+            changes.append(f"{key}={change:+.0%}{flag}")
+        print(f"{label:<32} " + " ".join(changes))
+    return regressed
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.load")
+    parser.add_argument("--games", type=int, default=4)
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--played", type=float, default=0.5, help="share of each ring already eliminated")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--only", nargs="+", choices=SCENARIOS)
+    parser.add_argument("--save", metavar="FILE")
+    parser.add_argument("--baseline", metavar="FILE")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+    # make_app moves into a scratch directory, so pin paths down first
+    args.save, args.baseline = (os.path.abspath(p) if p else None for p in (args.save, args.baseline))
+
+    results = run(args)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"against {args.baseline}:")
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,64 @@
+"""Logs players in through /auth and /auth/callback against the stand-in
+identity provider, with the provider's documents cacheable and not.
+
+    python -m bench.login [logins]
+"""
+import os
+import sys
+import urllib.parse
+
+import requests
+
+from bench import common
+from bench.idp import StandInProvider
+
+import auth
+
+
+def use_provider(idp: StandInProvider) -> None:
+    """Points the app's sign-in at `idp`, dropping whatever discovery
+    document and keys it had cached from another provider."""
+    os.environ["OIDC_DISCOVERY_URL"] = idp.discovery_url
+    os.environ["AUTH_REDIRECT_URI"] = "http://localhost/auth/callback"
+    auth.discovery = type(auth.discovery)(auth.discovery.url, dict)
+    auth.signing_keys = type(auth.signing_keys)(auth.oidc_jwks_endpoint)
+
+
+def login_flow(app, hint: str, client=None):
+    """Signs `hint` in through the provider, returning the signed-in
+    test client."""
+    client = client or app.test_client()
+    begin = client.post("/auth", data={"cb": ""})
+    authorize = urllib.parse.urlsplit(begin.headers["Location"])
+    query = urllib.parse.parse_qs(authorize.query)
+    url = f"{authorize.scheme}://{authorize.netloc}{authorize.path}?" + urllib.parse.urlencode(
+        {"redirect_uri": query["redirect_uri"][0], "state": query["state"][0],
+         "nonce": query["nonce"][0], "login_hint": hint})
+    callback = urllib.parse.urlsplit(requests.get(url, allow_redirects=False).headers["Location"])
+    response = client.get(f"{callback.path}?{callback.query}")
+    assert response.status_code == 302 and "jwt_cookie" in response.headers.get("Set-Cookie", ""), response.status_code
+    return client
+
+
+def main(logins: int = 200):
+    os.environ["AUTH_CLIENT_ID"] = "assassins-bench"
+    app = common.make_app()
+
+    for mode, (label, cache_control) in enumerate((("provider sends no-cache", "no-cache"),
+                                 ("provider allows caching", "max-age=300, stale-while-revalidate=60"))):
+        idp = StandInProvider("assassins-bench", cache_control)
+        use_provider(idp)
+
+        hints = iter(range(logins * 2))
+        samples = common.timed(lambda: login_flow(app, f"bench-{mode}-{next(hints)}"), logins)
+        idp_calls = sum(idp.requests[p] for p in ("/.well-known/openid-configuration", "/jwks"))
+        common.report(label, samples, discovery_and_jwks_fetches_per_login=f"{idp_calls / logins:.2f}")
+
+        idp.rotate()
+        login_flow(app, f"bench-{mode}-rotated")
+        print(f"{'':<32} key rotation picked up, jwks fetched {idp.requests['/jwks']} times in total")
+        idp.close()
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,98 @@
+"""Measures how long an elimination holds the write lock, from BEGIN
+IMMEDIATE to COMMIT, when the message is picked inside the transaction
+from log_messages as before, and from the in-memory table now; and what
+reading a log page costs with and without joining log_messages.
+
+    python -m bench.messages [eliminations] [iterations]
+"""
+import random
+import sys
+import time
+
+from bench import common
+
+import db
+
+
+class TransactionTimer:
+    """Times each write transaction on a connection via its trace callback."""
+
+    def __init__(self) -> None:
+        self.samples: list[float] = []
+        self.statements = 0
+        self._start: float | None = None
+
+    def __call__(self, statement: str) -> None:
+        if statement.startswith("BEGIN IMMEDIATE"):
+            self._start = time.perf_counter()
+        elif statement.startswith("COMMIT") and self._start is not None:
+            self.samples.append(time.perf_counter() - self._start)
+            self._start = None
+        elif self._start is not None:
+            self.statements += 1
+
+
+def eliminate_reading_messages(game_id, target_id: str) -> bool:
+    """db.eliminate_user as it was, counting and reading log_messages
+    under the write lock."""
+    def apply(conn):
+        target = conn.execute("""
+            SELECT users.target_user_id, accounts.name FROM users
+            LEFT JOIN accounts ON users.account_id = accounts.id
+            WHERE game_id = ? AND account_id = ?""", (game_id.bytes, target_id)).fetchone()
+        assassin = conn.execute("""
+            SELECT users.account_id, users.elimination_count, accounts.name FROM users
+            LEFT JOIN accounts ON users.account_id = accounts.id
+            WHERE game_id = ? AND target_user_id = ?""", (game_id.bytes, target_id)).fetchone()
+        conn.execute("""UPDATE users SET eliminated = 1, target_user_id = NULL WHERE game_id = ? AND account_id = ?""",
+                     (game_id.bytes, target_id))
+        conn.execute("""
+            UPDATE users SET target_user_id = ?, elimination_count = elimination_count + 1
+            WHERE game_id = ? AND account_id = ?""", (target["target_user_id"], game_id.bytes, assassin["account_id"]))
+        row_count = conn.execute("""SELECT COUNT(*) FROM log_messages""").fetchone()[0]
+        msg_id = random.randint(1, row_count)
+        conn.execute("""INSERT INTO logs (game_id, user_id, target_id, msg_id) VALUES (?, ?, ?, ?)""",
+                     (game_id.bytes, assassin["account_id"], target_id, msg_id))
+        db._add_stats(conn, game_id, alive=-1, kills=1, eliminated=True)
+        db._bump_version(conn, game_id)
+        conn.execute("""SELECT * FROM log_messages WHERE id = ?""", (msg_id,)).fetchone()
+        conn.execute("""SELECT name FROM accounts WHERE id = ?""", (target["target_user_id"],)).fetchone()
+        return True
+
+    return db.write(apply, "eliminate_reading_messages")
+
+
+def page_with_join(conn, game_id):
+    return conn.execute("""
+        SELECT logs.id, logs.ts, accounts.name AS user, targets.name AS target, log_messages.elim, log_messages.forfeit FROM logs
+        LEFT JOIN accounts ON accounts.id = logs.user_id
+        LEFT JOIN accounts AS targets ON targets.id = logs.target_id
+        LEFT JOIN log_messages ON logs.msg_id = log_messages.id
+        WHERE logs.game_id = ?
+        ORDER BY logs.ts DESC, logs.id DESC LIMIT ?""", (game_id.bytes, db.LOG_PAGE_SIZE + 1)).fetchall()
+
+
+def main(eliminations: int = 2000, iterations: int = 500):
+    app = common.make_app()
+    with app.app_context():
+        conn = db.get_db()
+        for label, eliminate in (("log_messages in transaction", eliminate_reading_messages),
+                                 ("in-memory messages", lambda g, t: db.eliminate_user(g, t, 1))):
+            game_id, ids = common.populate(eliminations + 2)
+            owner = ids[0]
+            targets = [i for i in ids if i != owner][:eliminations]
+            timer = TransactionTimer()
+            conn.set_trace_callback(timer)
+            calls = common.timed(lambda: eliminate(game_id, targets.pop()), eliminations)
+            conn.set_trace_callback(None)
+            common.report(f"{label}, transaction", timer.samples,
+                          statements=f"{timer.statements / len(timer.samples):.0f}")
+            common.report(f"{label}, whole call", calls)
+
+        common.report("log page, joined", common.timed(lambda: page_with_join(conn, game_id), iterations))
+        common.report("log page, in memory", common.timed(lambda: db.get_game_logs(game_id), iterations))
+        print(f"log_messages loaded {app.extensions['log_messages'].loads} time(s)")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,92 @@
+"""Runs the pending migrations over a large synthetic database on the
+baseline schema while writer threads keep inserting and updating players,
+and reports how long those writes waited on the migration.
+
+    python -m bench.migrate [games] [players_per_game] [writers]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from bench import common
+from bench.schema import build
+
+import migrate
+
+
+def writer_loop(path: str, stop: threading.Event, samples: list[tuple[float, float]],
+                written: list[tuple[bytes, str]], seed: int) -> None:
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 30000")
+    conn.execute("PRAGMA foreign_keys = ON")
+    n = 0
+    while not stop.is_set():
+        game_id = uuid.UUID(int=rng.getrandbits(128)).bytes
+        ids = [f"live-{seed}-{n}-{i}" for i in range(2)]
+        n += 1
+        start = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("""INSERT INTO games (uuid, name) VALUES (?, ?)""", (game_id, "Live"))
+        conn.executemany("""INSERT INTO accounts (id, name, email) VALUES (?, ?, ?)""",
+                         [(i, i, f"{i}@example.com") for i in ids])
+        conn.executemany("""INSERT INTO users (account_id, game_id) VALUES (?, ?)""", [(i, game_id) for i in ids])
+        conn.execute("""UPDATE games SET owner_id = ? WHERE uuid = ?""", (ids[0], game_id))
+        conn.execute("""UPDATE users SET elimination_count = elimination_count + 1
+                        WHERE game_id = ? AND account_id = ?""", (game_id, ids[1]))
+        conn.execute("COMMIT")
+        samples.append((time.perf_counter(), time.perf_counter() - start))
+        written.append((game_id, ids[1]))
+        time.sleep(0.01)
+    conn.close()
+
+
+def main(games: int = 700_000, players: int = 10, writers: int = 2):
+    path = os.path.join(tempfile.mkdtemp(prefix="assassins-migrate-"), "db.sqlite")
+    start = time.perf_counter()
+    build(path, games, players)
+    print(f"built {games} games x {players} players in {time.perf_counter() - start:.1f}s "
+          f"({os.path.getsize(path) / 2**30:.2f} GiB)")
+
+    stop = threading.Event()
+    samples: list[tuple[float, float]] = []
+    written: list[tuple[bytes, str]] = []
+    threads = [threading.Thread(target=writer_loop, args=(path, stop, samples, written, 1000 + i)) for i in range(writers)]
+    for t in threads:
+        t.start()
+    time.sleep(2)
+
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA busy_timeout = 30000")
+    began = time.perf_counter()
+    migrate.upgrade(conn, os.path.join(common.ROOT, "migrations"), migrate.MigrateConfig.from_env())
+    ended = time.perf_counter()
+    time.sleep(2)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    before = [s for at, s in samples if at < began]
+    during = [s for at, s in samples if began <= at <= ended]
+    after = [s for at, s in samples if at > ended]
+    common.report("writes before", before)
+    common.report("writes during migration", during, max=f"{max(during) * 1000:.1f}ms")
+    if after:
+        common.report("writes after", after)
+
+    missing = sum(1 for game_id, account_id in written if not conn.execute(
+        """SELECT 1 FROM users WHERE game_id = ? AND account_id = ? AND elimination_count = 1""",
+        (game_id, account_id)).fetchone())
+    conn.execute("PRAGMA foreign_keys = ON")
+    print(f"{len(written)} live writes, {missing} missing after the migration, "
+          f"{len(conn.execute('PRAGMA foreign_key_check').fetchall())} broken foreign keys")
+    print(conn.execute("""SELECT version, name FROM schema_version""").fetchall())
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:4]])
@@ -0,0 +1,50 @@
+"""Reports how many statements each owner-only endpoint issues, for the
+owner and for a player who isn't allowed to act, from /metrics/queries.
+
+    python -m bench.owner_actions [players]
+"""
+import sys
+
+from bench import common
+
+import db
+import util
+
+
+def main(players: int = 500):
+    app = common.make_app()
+    with app.app_context():
+        game_id, ids = common.populate(players)
+        unstarted_id = db.create_game("Bench unstarted")
+        conn = db.get_db()
+        conn.execute("""INSERT INTO accounts (id, name, email) VALUES ('bench-host', 'Host', 'host@example.com')""")
+        conn.execute("""INSERT INTO users (account_id, game_id) VALUES ('bench-host', ?)""", (unstarted_id.bytes,))
+        conn.commit()
+        db.set_game_owner(unstarted_id, "bench-host")
+    game, unstarted = util.uuid_to_str(game_id), util.uuid_to_str(unstarted_id)
+
+    # Denials abort with a status Flask has no exception for, which logs a traceback
+    app.logger.disabled = True
+    owner, host, player = app.test_client(), app.test_client(), app.test_client()
+    common.login(owner, ids[0])
+    common.login(host, "bench-host")
+    common.login(player, ids[1])
+
+    def run(label: str, owner, host):
+        owner.post(f"/games/{game}/announcement", data={"msg": "hello"})
+        owner.post(f"/games/{game}/eliminate_user", data={"user_id": ids[2], "elim_count": 1})
+        owner.post(f"/games/{game}/eliminate_users", data={"user_id": ids[3:5], "elim_count": 1})
+        host.post(f"/games/{unstarted}/delete_user", data={"user_id": "nobody"})
+        host.post(f"/games/{unstarted}/start")
+        print(label)
+        for endpoint, stats in sorted(common.metrics(owner, "/metrics/queries").get_json().items()):
+            if endpoint.startswith("game."):
+                print(f"  {endpoint:<38} requests={stats['requests']} queries={stats['queries']} max={stats['max_queries']}")
+        app.extensions['db_queries'].__init__()
+
+    run("denied (caller is not the owner)", player, player)
+    run("allowed (owner)", owner, host)
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
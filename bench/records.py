@@ -0,0 +1,118 @@
+"""Compares loading 100k-row result sets the way db.py used to, through
+sqlite3.Row and keyword-built dataclasses, with the slotted records it
+builds positionally from tuples now. Reports time and the memory the
+resulting list holds on to.
+
+    python -m bench.records [rows] [iterations]
+"""
+import sys
+import tracemalloc
+import uuid
+from dataclasses import dataclass
+
+from bench import common
+
+import db
+
+
+# The record types as they were before they gained slots
+class DictGame:
+    def __init__(self, id, name, owner, started, announcement, version=0, updated_at=0):
+        self.id = id
+        self.name = name
+        self.owner = owner
+        self.started = started
+        self.announcement = announcement
+        self.version = version
+        self.updated_at = updated_at
+
+
+@dataclass
+class DictUser:
+    id: str
+    name: str
+    target_user_id: str | None
+    eliminated: bool
+    elimination_count: int
+
+
+@dataclass
+class DictLog:
+    user: str
+    target: str
+    elim_msg: str
+    forfeit_msg: str
+    ts: int = 0
+    id: int = 0
+
+
+def games_by_row():
+    return [DictGame(id=uuid.UUID(bytes=row["uuid"]), name=row["name"], owner=row["owner_id"],
+                     started=row["started"], announcement=row["announcement"],
+                     version=row["version"], updated_at=row["updated_at"])
+            for row in db.get_db().execute("""SELECT * FROM games ORDER BY name""").fetchall()]
+
+
+def users_by_row(game_id):
+    return [DictUser(id=row["id"], name=row["name"], target_user_id=row["target_user_id"],
+                     eliminated=row["eliminated"], elimination_count=row["elimination_count"])
+            for row in db.get_db().execute("""
+                SELECT users.*, accounts.* FROM users
+                LEFT JOIN accounts ON users.account_id = accounts.id
+                WHERE game_id = ?
+                ORDER BY eliminated ASC, elimination_count DESC, name ASC""",
+                                           (game_id.bytes,)).fetchall()]
+
+
+def logs_by_row(game_id, rows):
+    return [DictLog(user=row["user"], target=row["target"], elim_msg=row["elim"],
+                    forfeit_msg=row["forfeit"], ts=row["ts"], id=row["id"])
+            for row in db.get_db().execute("""
+                SELECT logs.id, logs.ts, accounts.name AS user, targets.name AS target, log_messages.elim, log_messages.forfeit FROM logs
+                LEFT JOIN accounts ON accounts.id = logs.user_id
+                LEFT JOIN accounts AS targets ON targets.id = logs.target_id
+                LEFT JOIN log_messages ON logs.msg_id = log_messages.id
+                WHERE logs.game_id = ?
+                ORDER BY logs.ts DESC, logs.id DESC LIMIT ?""",
+                                           (game_id.bytes, rows + 1)).fetchall()]
+
+
+def retained(fn) -> tuple[int, int]:
+    """Returns the bytes still allocated once `fn`'s result is built, and
+    the peak while building it."""
+    tracemalloc.start()
+    result = fn()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size, peak
+
+
+def main(rows: int = 100_000, iterations: int = 10):
+    app = common.make_app()
+    with app.app_context():
+        game_id, ids = common.populate(rows)
+        conn = db.get_db()
+        conn.executemany("""INSERT INTO games (uuid, name) VALUES (?, ?)""",
+                         [(uuid.uuid4().bytes, f"Game {i}") for i in range(rows - 1)])
+        conn.executemany("""INSERT INTO logs (game_id, user_id, target_id, msg_id, ts) VALUES (?, ?, ?, 1, ?)""",
+                         [(game_id.bytes, ids[i - 1], ids[i], i) for i in range(1, rows)])
+        conn.commit()
+        print(f"{rows} rows each")
+
+        for label, fn in (
+            ("games, sqlite3.Row", games_by_row),
+            ("games, get_games", db.get_games),
+            ("games, get_games, ids read", lambda: [g for g in db.get_games() if g.id]),
+            ("users, sqlite3.Row", lambda: users_by_row(game_id)),
+            ("users, get_users_by_game", lambda: db.get_users_by_game(game_id)),
+            ("logs, sqlite3.Row", lambda: logs_by_row(game_id, rows)),
+            ("logs, _read_logs", lambda: db._read_logs(conn, game_id, rows).logs),
+        ):
+            size, peak = retained(fn)
+            common.report(label, common.timed(fn, iterations),
+                          held=f"{size / 2**20:.1f}MiB", peak=f"{peak / 2**20:.1f}MiB")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
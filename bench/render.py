@@ -0,0 +1,64 @@
+"""Times the game page for a large roster with the roster and log
+fragments rendered afresh and served from the fragment cache, for each
+viewer role, and how long a new worker takes to load the templates with
+and without a warm bytecode cache.
+
+    python -m bench.render [players] [iterations]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import jinja2
+
+from bench import common
+
+import cache
+import game
+import util
+
+
+def load_templates(bytecode_cache: jinja2.BytecodeCache | None) -> float:
+    """Loads every template into a fresh environment, as a new worker would."""
+    env = jinja2.Environment(loader=jinja2.FileSystemLoader(os.path.join(common.ROOT, "templates")),
+                             bytecode_cache=bytecode_cache)
+    start = time.perf_counter()
+    for name in env.list_templates(extensions=["html"]):
+        env.get_template(name)
+    return time.perf_counter() - start
+
+
+def main(players: int = 10_000, iterations: int = 50):
+    app = common.make_app()
+    with app.app_context():
+        game_id, ids = common.populate(players, eliminated=min(players // 3, 1000))
+    url = f"/games/{util.uuid_to_str(game_id)}"
+    fragments = app.extensions['fragment_cache']
+    print(f"{players} players")
+
+    # Outside the app context, so each request gets its own
+    for role, account_id in (("owner", ids[0]), ("player", ids[1]), ("anonymous", None)):
+        client = app.test_client()
+        if account_id:
+            common.login(client, account_id)
+        page = client.get(url)
+        assert page.status_code == 200, page.status_code
+
+        def uncached():
+            fragments.backend = cache.LRUBackend(game.FRAGMENT_CACHE_SIZE)
+            client.get(url)
+
+        common.report(f"{role}, fragments rendered", common.timed(uncached, iterations), kb=len(page.data) // 1024)
+        client.get(url)
+        common.report(f"{role}, fragments cached", common.timed(lambda: client.get(url), iterations))
+
+    directory = tempfile.mkdtemp(prefix="assassins-jinja-")
+    load_templates(jinja2.FileSystemBytecodeCache(directory))
+    common.report("load templates, compiling", [load_templates(None) for _ in range(iterations)])
+    common.report("load templates, bytecode cache",
+                  [load_templates(jinja2.FileSystemBytecodeCache(directory)) for _ in range(iterations)])
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,47 @@
+"""Times building, walking, eliminating from and integrity checking rings of
+up to a million players, and confirms corrupted rings are caught.
+
+    python -m bench.ring [players]
+"""
+import random
+import sys
+import time
+
+from bench import common
+
+import ring
+import util
+
+
+def timed_once(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<32} {(time.perf_counter() - start) * 1000:10.1f}ms")
+    return result
+
+
+def main(players: int = 1_000_000):
+    ids = [f"player-{i}" for i in range(players)]
+    targets = timed_once("gen_targets", lambda: util.gen_targets(players))
+    r = timed_once("Ring.from_targets", lambda: ring.Ring.from_targets(ids, targets))
+    assert timed_once("check (intact)", r.check) == []
+    assert timed_once("walk", lambda: sum(1 for _ in r.walk(0))) == players
+
+    rng = random.Random(0)
+    victims = rng.sample(range(players), players // 10)
+    timed_once(f"eliminate x{len(victims)}", lambda: [r.eliminate(i) for i in victims])
+    assert timed_once("check (after eliminations)", r.check) == []
+
+    # Split the ring in two by swapping two players' targets
+    a = next(i for i in range(players) if r.alive[i])
+    b = list(r.walk(a))[len(r) // 2]
+    a_target, b_target = r.succ[a], r.succ[b]
+    r.succ[a], r.succ[b] = b_target, a_target
+    r.pred[a_target], r.pred[b_target] = b, a
+    problems = timed_once("check (split ring)", r.check)
+    assert any("separate cycles" in p for p in problems), problems
+    print(f"detected: {problems}")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,39 @@
+"""Compares adding players one sign-up at a time, as users.signup does for
+each OIDC login, with streaming a roster through db.import_roster.
+
+    python -m bench.roster_import [players] [signups]
+"""
+import sys
+import time
+
+from bench import common
+
+import db
+import typedefs
+import users
+
+
+def main(players: int = 100_000, signups: int = 2000):
+    app = common.make_app()
+    with app.app_context():
+        game_id = db.create_game("Signups")
+        for i in range(signups):
+            db.create_account(typedefs.Account(f"signup-{i}", f"Player {i}", f"signup-{i}@example.com"))
+        start = time.perf_counter()
+        for i in range(signups):
+            users.signup(game_id, f"signup-{i}")
+        seconds = time.perf_counter() - start
+        print(f"{'users.signup':<32} {signups} players in {seconds:.2f}s, {signups / seconds:,.0f}/s")
+
+        for chunk_size in (500, db.IMPORT_CHUNK_SIZE, 50_000):
+            game_id = db.create_game(f"Import {chunk_size}")
+            rows = ((f"import-{chunk_size}-{i}", f"Player {i}", f"import-{i}@example.com") for i in range(players))
+            start = time.perf_counter()
+            totals = db.import_roster(game_id, rows, chunk_size)
+            seconds = time.perf_counter() - start
+            print(f"{f'import_roster, chunks of {chunk_size}':<32} {totals.players} players in {seconds:.2f}s, "
+                  f"{totals.players / seconds:,.0f}/s")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
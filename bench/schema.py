@@ -0,0 +1,132 @@
+"""Builds a database of many games on the baseline schema, then times the
+hot game queries and shows their plans before and after applying
+migrations/0001_game_scoped_users.sql.
+
+    python -m bench.schema [games] [players_per_game] [iterations]
+"""
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+from bench import common
+
+QUERIES = {
+    "roster": """
+        SELECT users.*, accounts.* FROM users
+        LEFT JOIN accounts ON users.account_id = accounts.id
+        WHERE game_id = ?
+        ORDER BY eliminated ASC, elimination_count DESC, name ASC""",
+    "member": """
+        SELECT users.*, accounts.* FROM users
+        LEFT JOIN accounts ON users.account_id = accounts.id
+        WHERE account_id = ? AND game_id = ?""",
+    "assassin": """
+        SELECT users.*, accounts.* FROM users
+        LEFT JOIN accounts ON users.account_id = accounts.id
+        WHERE target_user_id = ? AND game_id = ?""",
+    "logs": """
+        SELECT accounts.name AS user, targets.name AS target, log_messages.* FROM logs
+        LEFT JOIN accounts ON accounts.id = logs.user_id
+        LEFT JOIN accounts AS targets ON targets.id = logs.target_id
+        LEFT JOIN log_messages ON logs.msg_id = log_messages.id
+        WHERE logs.game_id = ?
+        ORDER BY logs.ts ASC""",
+}
+
+
+def build(path: str, games: int, players: int, seed: int = 0) -> list[tuple[bytes, list[str]]]:
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    with open(os.path.join(common.ROOT, "migrations", "0000_baseline.sql")) as f:
+        conn.executescript(f.read())
+    conn.executemany("""INSERT INTO log_messages (elim, forfeit) VALUES (?, ?)""",
+                     [(f"elim {i}", f"forfeit {i}") for i in range(10)])
+
+    start = datetime.datetime(2024, 1, 1)
+    roster: list[tuple[bytes, list[str]]] = []
+    for g in range(games):
+        game_id = uuid.UUID(int=rng.getrandbits(128)).bytes
+        ids = [f"acct-{g}-{i}" for i in range(players)]
+        roster.append((game_id, ids))
+        conn.execute("""INSERT INTO games (uuid, name) VALUES (?, ?)""", (game_id, f"Game {g}"))
+        conn.executemany("""INSERT INTO accounts (id, name, email) VALUES (?, ?, ?)""",
+                         [(i, f"Player {rng.random():.8f}", f"{i}@example.com") for i in ids])
+        conn.executemany("""INSERT INTO users (account_id, game_id) VALUES (?, ?)""", [(i, game_id) for i in ids])
+        conn.execute("""UPDATE games SET owner_id = ?, started = 1 WHERE uuid = ?""", (ids[0], game_id))
+
+        # Half the players are out, each logged by whoever held them
+        order = ids[:]
+        rng.shuffle(order)
+        alive, out = order[:players - players // 2], order[players - players // 2:]
+        conn.executemany("""UPDATE users SET target_user_id = ?, elimination_count = ? WHERE account_id = ?""",
+                         [(alive[(k + 1) % len(alive)], rng.randint(0, 3), a) for k, a in enumerate(alive)])
+        conn.executemany("""UPDATE users SET eliminated = 1 WHERE account_id = ?""", [(a,) for a in out])
+        conn.executemany("""INSERT INTO logs (game_id, user_id, target_id, msg_id, ts) VALUES (?, ?, ?, ?, ?)""",
+                         [(game_id, rng.choice(alive), o, rng.randint(1, 10),
+                           (start + datetime.timedelta(seconds=rng.randrange(10**7))).strftime("%Y-%m-%d %H:%M:%S"))
+                          for o in out])
+        if g % 10000 == 9999:
+            conn.commit()
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return roster
+
+
+def measure(label: str, path: str, roster, iterations: int, seed: int = 1) -> None:
+    conn = sqlite3.connect(path)
+    rng = random.Random(seed)
+    print(f"-- {label}")
+    for name, sql in QUERIES.items():
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", _args(name, roster[0])).fetchall()]
+        picks = [rng.choice(roster) for _ in range(iterations)]
+        it = iter(picks * 2)
+        common.timed(lambda: conn.execute(sql, _args(name, next(it))).fetchall(), iterations)
+        samples = common.timed(lambda: conn.execute(sql, _args(name, next(it))).fetchall(), iterations)
+        common.report(name, samples)
+        for step in plan:
+            print(f"{'':<6}{step}")
+    conn.close()
+
+
+def _args(name: str, game: tuple[bytes, list[str]]) -> tuple:
+    game_id, ids = game
+    if name == "member":
+        return (ids[1], game_id)
+    if name == "assassin":
+        return (ids[2], game_id)
+    return (game_id,)
+
+
+def main(games: int = 100_000, players: int = 10, iterations: int = 2000):
+    path = os.path.join(tempfile.mkdtemp(prefix="assassins-schema-"), "db.sqlite")
+    start = time.perf_counter()
+    roster = build(path, games, players)
+    print(f"built {games} games x {players} players in {time.perf_counter() - start:.1f}s "
+          f"({os.path.getsize(path) / 2**20:.0f} MiB)")
+
+    measure("baseline schema", path, roster, iterations)
+
+    conn = sqlite3.connect(path)
+    with open(os.path.join(common.ROOT, "migrations", "0001_game_scoped_users.sql")) as f:
+        start = time.perf_counter()
+        conn.executescript(f.read())
+    print(f"migrated in {time.perf_counter() - start:.1f}s ({os.path.getsize(path) / 2**20:.0f} MiB)")
+    conn.execute("VACUUM")
+    conn.execute("ANALYZE")
+    conn.close()
+    print(f"vacuumed to {os.path.getsize(path) / 2**20:.0f} MiB")
+
+    QUERIES["logs"] += ", logs.id ASC"
+    measure("after 0001_game_scoped_users", path, roster, iterations)
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:4]])
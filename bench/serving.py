@@ -0,0 +1,104 @@
+"""Compares how many concurrent event streams each serving mode holds open,
+and how quickly a normal page request is answered while they are.
+
+Starts each server on the same machine against the same synthetic database:
+
+    python -m bench.serving [streams] [players]
+
+Requires gunicorn and uvicorn to be installed.
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from bench import common
+
+import util
+
+MODES = {
+    "wsgi (gunicorn, 32 threads)": ["gunicorn", "--threads", "32", "--bind", "127.0.0.1:{port}", "app:create_app()"],
+    "asgi (uvicorn)": ["uvicorn", "--factory", "--port", "{port}", "--log-level", "warning", "asgi:create_asgi_app"],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(port: int, timeout: float = 15) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} never came up")
+
+
+async def get(port: int, path: str, first_bytes: bytes, timeout: float):
+    """Sends a GET and waits for `first_bytes` to appear in the response.
+    Returns the open writer, or None if the server didn't answer in time."""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), timeout)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        data = b""
+        async with asyncio.timeout(timeout):
+            while first_bytes not in data:
+                chunk = await reader.read(4096)
+                if not chunk:
+                    return None
+                data += chunk
+        return writer
+    except (OSError, TimeoutError):
+        return None
+
+
+async def scenario(port: int, path: str, streams: int) -> dict:
+    start = time.perf_counter()
+    writers = await asyncio.gather(*(get(port, f"{path}/events", b"retry:", 10) for _ in range(streams)))
+    opened = sum(1 for w in writers if w)
+    open_seconds = time.perf_counter() - start
+
+    page_start = time.perf_counter()
+    page = await get(port, path, b"</html>", 10)
+    page_ms = (time.perf_counter() - page_start) * 1000 if page else None
+
+    for w in writers + [page]:
+        if w:
+            w.close()
+    return {
+        "streams_open": f"{opened}/{streams}",
+        "open_s": f"{open_seconds:.2f}",
+        "page_ms_while_open": f"{page_ms:.1f}" if page_ms is not None else "timeout",
+    }
+
+
+def main(streams: int = 500, players: int = 200):
+    app = common.make_app()
+    with app.app_context():
+        game_id, _ = common.populate(players)
+    path = f"/games/{util.uuid_to_str(game_id)}"
+    env = dict(os.environ, PYTHONPATH=common.ROOT, EVENT_KEEPALIVE_SECONDS="5")
+
+    for label, argv in MODES.items():
+        port = free_port()
+        server = subprocess.Popen([a.format(port=port) for a in argv], env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for(port)
+            result = asyncio.run(scenario(port, path, streams))
+            print(f"{label:<32}", " ".join(f"{k}={v}" for k, v in result.items()))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,40 @@
+"""Shows that reading a game's stats and top killers costs the same however
+large its roster is, unlike aggregating the roster and log on each read.
+
+    python -m bench.stats [iterations]
+"""
+import sys
+
+from bench import common
+
+import db
+
+SIZES = (100, 1000, 10_000, 50_000)
+
+
+def aggregate(game_id):
+    conn = db.get_db()
+    counts = conn.execute(db._EXPECTED_STATS + """ WHERE games.uuid = ?""", (game_id.bytes,)).fetchone()
+    killers = conn.execute("""
+        SELECT accounts.name, users.elimination_count FROM users
+        JOIN accounts ON accounts.id = users.account_id
+        WHERE users.game_id = ?
+        ORDER BY users.eliminated ASC, users.elimination_count DESC, accounts.name ASC LIMIT ?""",
+                           (game_id.bytes, db.TOP_KILLERS)).fetchall()
+    return counts, killers
+
+
+def main(iterations: int = 500):
+    app = common.make_app()
+    with app.app_context():
+        for players in SIZES:
+            game_id, _ = common.populate(players, eliminated=min(players // 3, 1000))
+            assert db.get_game_stats(game_id) is not None
+            common.report(f"{players:>6} players, aggregated", common.timed(lambda: aggregate(game_id), iterations))
+            common.report(f"{players:>6} players, game_stats", common.timed(lambda: db.get_game_stats(game_id), iterations))
+        problems = db.check_game_stats()
+        print(f"stats-check: {len(problems)} problems" if problems is not None else "stats-check failed")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,63 @@
+"""Checks that target generation is uniform over single cycles and times it
+up to ten million players.
+
+    python -m bench.targets [max_players]
+"""
+import collections
+import math
+import sys
+import time
+
+from bench import common
+
+import ring
+import util
+
+# Chi-squared critical value for 23 degrees of freedom at p = 0.001
+CHI2_CRITICAL_23 = 49.728
+
+
+def uniformity(gen, samples: int = 48_000) -> float:
+    """Samples 5-player cycles and returns the chi-squared statistic over
+    the 4! = 24 possible ones."""
+    counts = collections.Counter(tuple(int(t) for t in gen(5, seed)) for seed in range(samples))
+    assert len(counts) == math.factorial(4), f"saw {len(counts)} distinct cycles"
+    expected = samples / len(counts)
+    return sum((c - expected) ** 2 / expected for c in counts.values())
+
+
+def main(max_players: int = 10_000_000):
+    numpy = util.np
+    paths = [("numpy", numpy), ("pure python", None)] if numpy is not None else [("pure python", None)]
+
+    for label, module in paths:
+        util.np = module
+        chi2 = uniformity(util.gen_cycle)
+        verdict = "uniform" if chi2 < CHI2_CRITICAL_23 else "NOT UNIFORM"
+        print(f"{label:<12} chi2={chi2:6.2f} (critical {CHI2_CRITICAL_23}) {verdict}")
+
+        n = 10_000
+        while n <= max_players:
+            ids = [str(i) for i in range(n)]
+            start = time.perf_counter()
+            targets = util.gen_cycle(n, seed=n)
+            generated = time.perf_counter() - start
+            pairs = sum(1 for _ in util.gen_target_maps(ids, seed=n))
+            streamed = time.perf_counter() - start - generated
+            assert pairs == n
+            if n <= 1_000_000:
+                assert ring.Ring.from_targets(ids, [int(t) for t in targets]).check() == []
+            print(f"{label:<12} n={n:<9} gen_cycle={generated * 1000:9.1f}ms gen_target_maps={streamed * 1000:9.1f}ms")
+            n *= 10
+    util.np = numpy
+
+    n = 10_000
+    while n <= min(max_players, 1_000_000):
+        start = time.perf_counter()
+        util.gen_targets(n)
+        print(f"{'legacy':<12} n={n:<9} gen_targets={(time.perf_counter() - start) * 1000:9.1f}ms")
+        n *= 10
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,40 @@
+"""Measures the per-request cost of resolving the caller from their cookie:
+a full HMAC verify of the JWT as every handler used to do, against the
+verified-token cache and the before-request hook that uses it.
+
+    python -m bench.tokens [iterations]
+"""
+import hashlib
+import os
+import sys
+
+import jwt
+
+from bench import common
+
+import auth
+
+
+def main(iterations: int = 20000):
+    app = common.make_app()
+    token = auth.create_bearer_token("bench-account")
+
+    def uncached():
+        jwt.decode(token, os.getenv("JWT_SECRET"), algorithms="HS256")["user_id"]
+
+    common.report("getenv + jwt.decode", common.timed(uncached, iterations))
+
+    def cold():
+        auth.verified_tokens.backend.delete(hashlib.sha256(token.encode()).digest())
+        assert auth.read_bearer_token(token) == "bench-account"
+
+    common.report("read_bearer_token (miss)", common.timed(cold, iterations))
+    common.report("read_bearer_token (hit)", common.timed(lambda: auth.read_bearer_token(token), iterations))
+
+    with app.test_request_context("/", headers={"Cookie": f"jwt_cookie={token}"}):
+        common.report("load_account hook (hit)", common.timed(auth.load_account, iterations),
+                      hits=auth.verified_tokens.hits, misses=auth.verified_tokens.misses)
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,71 @@
+"""Measures game page reads while the owner eliminates players as fast as
+possible from other threads, with and without the write queue.
+
+    python -m bench.writes [players] [readers] [writers]
+    DB_WRITE_QUEUE=1 python -m bench.writes ...
+"""
+import sys
+import threading
+import time
+
+from bench import common
+
+import db
+
+
+def main(players: int = 2000, readers: int = 4, writers: int = 4):
+    app = common.make_app()
+    with app.app_context():
+        game_id, ids = common.populate(players)
+    victims = ids[1:]
+
+    def read_loop(samples: list[float], stop: threading.Event):
+        with app.app_context():
+            while not stop.is_set():
+                start = time.perf_counter()
+                db.get_game_snapshot(game_id, ids[0])
+                samples.append(time.perf_counter() - start)
+
+    def write_loop(chunk: list[str], done: list[int]):
+        for target in chunk:
+            with app.app_context():
+                if db.eliminate_user(game_id, target, 1):
+                    done.append(1)
+
+    def read_phase(seconds: float, write: bool):
+        stop = threading.Event()
+        samples: list[float] = []
+        done: list[int] = []
+        threads = [threading.Thread(target=read_loop, args=(samples, stop)) for _ in range(readers)]
+        for t in threads:
+            t.start()
+        start = time.perf_counter()
+        if write:
+            size = len(victims) // (2 * writers)
+            wthreads = [threading.Thread(target=write_loop, args=(victims[i * size:(i + 1) * size], done))
+                        for i in range(writers)]
+            for t in wthreads:
+                t.start()
+            for t in wthreads:
+                t.join()
+            seconds = time.perf_counter() - start
+            del victims[:size * writers]
+        else:
+            time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        label = "reads during eliminations" if write else "reads, idle"
+        common.report(label, samples, reads_per_s=int(len(samples) / seconds),
+                      writes_per_s=int(len(done) / seconds))
+        return seconds
+
+    elapsed = read_phase(0, write=True)
+    read_phase(elapsed, write=False)
+    _, queue = app.extensions['db_writer']
+    if queue:
+        print(f"group commits: {queue.batches} batches for {queue.writes} writes")
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:4]])
@@ -0,0 +1,154 @@
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Protocol
+
+
+@dataclass
+class CacheStats:
+    entries: int = 0
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    evictions: int = 0
+
+
+class Backend(Protocol):
+    def get(self, key: bytes) -> object | None: ...
+    def set(self, key: bytes, value: object) -> None: ...
+    def delete(self, key: bytes) -> None: ...
+    def __len__(self) -> int: ...
+
+
+class LRUBackend:
+    """Thread-safe in-process LRU holding at most `max_entries` values."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._data: OrderedDict[bytes, object] = OrderedDict()
+
+    def get(self, key: bytes) -> object | None:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: bytes, value: object) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: bytes) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class Client(Protocol):
+    """The subset of a memcached/redis style client the shared backend needs."""
+    def get(self, key: str) -> bytes | None: ...
+    def set(self, key: str, value: bytes) -> object: ...
+    def delete(self, key: str) -> object: ...
+
+
+class SharedBackend:
+    """Stores pickled values in an external cache shared between workers."""
+
+    def __init__(self, client: Client, prefix: str = "assassins:game:") -> None:
+        self.client = client
+        self.prefix = prefix
+        self.evictions = 0
+
+    def get(self, key: bytes) -> object | None:
+        data = self.client.get(self.prefix + key.hex())
+        return pickle.loads(data) if data is not None else None
+
+    def set(self, key: bytes, value: object) -> None:
+        self.client.set(self.prefix + key.hex(), pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+    def delete(self, key: bytes) -> None:
+        self.client.delete(self.prefix + key.hex())
+
+    def __len__(self) -> int:
+        return len(self.client) if hasattr(self.client, '__len__') else 0
+
+
+class LocalClient:
+    """In-memory stand-in for a shared cache server."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._data: dict[str, bytes] = {}
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            return self._data.get(key)
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._data[key] = value
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class VersionedCache:
+    """Caches one value per key, tagged with the version it was built from.
+
+    A lookup only hits if the stored version matches the caller's, so writers
+    invalidate every worker's copy just by bumping the version in the
+    database.
+    """
+
+    def __init__(self, backend: Backend) -> None:
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def get(self, key: bytes, version: int) -> object | None:
+        entry = self.backend.get(key)
+        with self._lock:
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            cached_version, value = entry
+            if cached_version != version:
+                self._stats.misses += 1
+                self._stats.stale += 1
+                return None
+            self._stats.hits += 1
+            return value
+
+    def put(self, key: bytes, version: int, value: object) -> None:
+        self.backend.set(key, (version, value))
+
+    def clear(self, key: bytes) -> None:
+        self.backend.delete(key)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            s = CacheStats(**self._stats.__dict__)
+        s.entries = len(self.backend)
+        s.evictions = getattr(self.backend, 'evictions', 0)
+        return s
+
+
+def from_env() -> VersionedCache:
+    backend = os.getenv("GAME_CACHE", "lru")
+    if backend == "local":
+        return VersionedCache(SharedBackend(LocalClient()))
+    return VersionedCache(LRUBackend(int(os.getenv("GAME_CACHE_SIZE", 256))))
@@ -1,17 +1,54 @@
-import random
+import concurrent.futures
+import functools
+import hmac
+import json
+import logging
+import os
+import re
 import sqlite3
+import time
 import uuid
-from flask import Flask, current_app, g
+from dataclasses import asdict
+from typing import Callable, Iterable, TypeVar
+from flask import Flask, Response, abort, current_app, g, request
 import click
+import itertools
 
+import cache
+import events
 import game
+import handles
+import instrument
+import messages
+import migrate
+import pool
+import ring
 import typedefs
+import writer
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Log entries per page, and the most a client may ask for at once
+LOG_PAGE_SIZE = int(os.getenv("GAME_LOG_PAGE_SIZE", 50))
+LOG_PAGE_MAX = int(os.getenv("GAME_LOG_PAGE_MAX", 500))
+TOP_KILLERS = int(os.getenv("GAME_TOP_KILLERS", 5))
+# Roster rows written per transaction by import_roster
+IMPORT_CHUNK_SIZE = int(os.getenv("ROSTER_IMPORT_CHUNK", 5000))
+# Games per page of the directory
+DIRECTORY_PAGE_SIZE = int(os.getenv("GAME_DIRECTORY_PAGE_SIZE", 50))
+# Values of games.status, which the 0004 migration's triggers maintain
+GAME_STATUSES = ("open", "started", "finished")
+
+def get_pool() -> pool.ConnectionPool:
+    return current_app.extensions['db_pool']
 
 def get_db() -> sqlite3.Connection:
     if 'db' not in g:
-        g.db = sqlite3.connect('./data/db.sqlite')
-        g.db.execute("PRAGMA foreign_keys = ON;")
-        g.db.row_factory = sqlite3.Row
+        g.db = get_pool().acquire()
+        if isinstance(g.db, instrument.Connection):
+            g.db.statements = g.db_statements = []
 
     return g.db
 
@@ -19,11 +56,60 @@ def close_db(_=None):
     db = g.pop('db', None)
 
     if db is not None:
-        db.close()
+        if isinstance(db, instrument.Connection):
+            db.statements = None
+        get_pool().release(db)
+
+def get_query_stats() -> instrument.QueryStats:
+    return current_app.extensions['db_queries']
+
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+def add_server_timing(response: Response) -> Response:
+    started = g.get('request_started')
+    if started is not None:
+        response.headers["Server-Timing"] = instrument.server_timing(
+            g.get('db_statements', []), time.perf_counter() - started)
+    return response
+
+def record_queries(_=None):
+    if request.endpoint:
+        started = g.get('request_started')
+        get_query_stats().record(
+            request.endpoint,
+            g.get('db_statements', []),
+            time.perf_counter() - started if started is not None else 0.0)
+
+# Each record's columns in the order of its fields, so rows can be handed to
+# the constructor positionally rather than looked up by name
+GAME_COLUMNS = "games.uuid, games.name, games.owner_id, games.started, games.announcement, games.version, games.updated_at"
+USER_COLUMNS = "users.account_id, accounts.name, users.target_user_id, users.eliminated, users.elimination_count"
+ACCOUNT_COLUMNS = "accounts.id, accounts.name, accounts.email"
+LISTING_COLUMNS = "games.uuid, games.name, games.status, coalesce(game_stats.players, 0)"
+# Except that a log's messages are looked up in memory by msg_id
+LOG_COLUMNS = "accounts.name, targets.name, logs.msg_id, logs.ts, logs.id"
+GAME_FIELD_COUNT = GAME_COLUMNS.count(",") + 1
+
+def _records(db: sqlite3.Connection, record: type[T], query: str, params: tuple = ()) -> list[T]:
+    """Runs a query selecting `record`'s columns and builds one per row
+    from the plain tuple, skipping sqlite3.Row and its lookups by name."""
+    cursor = db.cursor()
+    cursor.row_factory = None
+    return list(itertools.starmap(record, cursor.execute(query, params)))
+
+def _record(db: sqlite3.Connection, record: type[T], query: str, params: tuple = ()) -> T | None:
+    cursor = db.cursor()
+    cursor.row_factory = None
+    row = cursor.execute(query, params).fetchone()
+    return record(*row) if row else None
 
 def init_db(db: sqlite3.Connection) -> None:
-    with current_app.open_resource('schema.sql') as schema:
-        db.executescript(schema.read().decode('utf8'))
+    """Brings the database up to the latest schema, creating it if needed,
+    and seeds the elimination messages of a new one."""
+    migrate.upgrade(db, get_migrations_folder(), migrate.MigrateConfig.from_env(), echo=log.info)
+    if db.execute("""SELECT 1 FROM log_messages LIMIT 1""").fetchone():
+        return
     data = [
         ("made short work of", "didn’t survive the night."),
         ("said “goodnight” to", "forgot how gravity works."),
@@ -39,177 +125,464 @@ def init_db(db: sqlite3.Connection) -> None:
     db.executemany("""INSERT INTO log_messages (elim, forfeit) VALUES (?,?)""", data)
     db.commit()
 
+def get_migrations_folder() -> str:
+    return os.path.join(current_app.root_path, 'migrations')
+
 @click.command('init-db')
 def init_db_cmd():
     db = get_db()
     init_db(db)
     click.echo("Initialized the database")
 
+@click.command('upgrade')
+@click.option('--pending', 'list_only', is_flag=True, help="List pending migrations without applying them.")
+def upgrade_cmd(list_only: bool):
+    db = get_db()
+    folder = get_migrations_folder()
+    if list_only:
+        for migration in migrate.pending(db, folder):
+            click.echo(f"{migration.version:04d}_{migration.name}")
+        return
+    applied = migrate.upgrade(db, folder, migrate.MigrateConfig.from_env(), echo=click.echo)
+    if not applied:
+        click.echo("Already up to date")
+
     
+def get_log_messages() -> messages.MessageTable:
+    return current_app.extensions['log_messages'].get(get_db())
+
+def get_game_cache() -> cache.VersionedCache:
+    return current_app.extensions['game_cache']
+
+def _bump_version(db: sqlite3.Connection, game_id: uuid.UUID) -> int:
+    """Marks everything cached for the game as stale and returns the new
+    version. Call from inside the write transaction that changes what the
+    game page shows."""
+    row = db.execute("""
+        UPDATE games
+        SET version = version + 1, updated_at = CAST(strftime('%s', 'now') AS INTEGER)
+        WHERE uuid = ?
+        RETURNING version""",
+               (game_id.bytes,)).fetchone()
+    return row["version"] if row else 0
+
+def _add_stats(db: sqlite3.Connection, game_id: uuid.UUID, players: int = 0, alive: int = 0,
+               kills: int = 0, forfeits: int = 0, eliminated: bool = False) -> None:
+    """Applies a change to the game's counters in game_stats. Call from
+    inside the write transaction that makes it."""
+    db.execute("""
+        UPDATE game_stats SET
+        players = players + ?,
+        alive = alive + ?,
+        kills = kills + ?,
+        forfeits = forfeits + ?,
+        last_elimination_at = iif(?, (SELECT max(ts) FROM logs WHERE game_id = ?), last_elimination_at)
+        WHERE game_id = ?""",
+               (players, alive, kills, forfeits, eliminated, game_id.bytes, game_id.bytes))
+
+def get_broker() -> events.Broker:
+    return current_app.extensions['game_events']
+
+def _publish(game_id: uuid.UUID, published: list[tuple[dict, str | None]]):
+    """Sends events for a committed write to the game's live streams."""
+    broker = get_broker()
+    for event, to in published:
+        broker.publish(game_id.bytes, event, to=to)
+
+def _elimination_event(game_id: uuid.UUID, version: int, log_entry: typedefs.Log, eliminated_id: str,
+                       assassin_id: str, elim_count: int, elimination_count: int) -> dict:
+    """The elimination as every viewer of the game is sent it, holding
+    only what the public roster and log show, with players named by their
+    handles. A kill names its assassin, as its log entry does; a forfeit
+    leaves them out, since who held the player as their target is the
+    ring's secret."""
+    event = {
+        "type": "elimination",
+        "version": version,
+        "log": log_entry.to_str(),
+        "eliminated": handles.player(game_id.bytes, eliminated_id),
+    }
+    if elim_count:
+        event["assassin"] = handles.player(game_id.bytes, assassin_id)
+        event["elimination_count"] = elimination_count
+    return event
+
+def get_writer() -> tuple[writer.WriterConfig, writer.WriteQueue | None]:
+    return current_app.extensions['db_writer']
+
+def write(fn: writer.WriteFn, name: str) -> bool:
+    """Runs `fn` in an immediate write transaction, through the write queue
+    when one is enabled. Returns False if the write failed or `fn` did.
+    """
+    config, queue = get_writer()
+    try:
+        if queue:
+            result = queue.submit(fn).result(config.timeout)
+        else:
+            result = writer.run(get_db(), fn, config)
+    except concurrent.futures.TimeoutError:
+        # The write stays queued and may yet be applied
+        log.error("db::%s: no answer from the write queue in %.0fs", name, config.timeout)
+        return False
+    except sqlite3.IntegrityError as e:
+        log.info("db::%s: %s", name, e)
+        return False
+    except sqlite3.Error as e:
+        log.error("db::%s: %s", name, e)
+        return False
+    return result is not False
+
+def metrics_view(fn):
+    """Serves a /metrics route only to a scraper that sends METRICS_TOKEN as
+    its bearer token, since the figures include query text and plans. With
+    no token configured the routes don't exist."""
+    @functools.wraps(fn)
+    def wrapper():
+        token = current_app.extensions['metrics_token']
+        if not token:
+            abort(404)
+        given = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(given.encode(), token.encode()):
+            abort(401)
+        return fn()
+    return wrapper
+
+@metrics_view
+def pool_stats_handler():
+    return asdict(get_pool().stats())
+
+@metrics_view
+def game_cache_stats_handler():
+    return asdict(get_game_cache().stats())
+
+@metrics_view
+def query_stats_handler():
+    return {endpoint: asdict(stats) for endpoint, stats in get_query_stats().snapshot().items()}
+
+@metrics_view
+def metrics_handler():
+    body = get_query_stats().prometheus()
+    body += instrument.prometheus_gauges("assassins_db_pool", asdict(get_pool().stats()))
+    body += instrument.prometheus_gauges("assassins_game_cache", asdict(get_game_cache().stats()))
+    body += instrument.prometheus_gauges("assassins_db_write_lock", asdict(writer.lock_stats()))
+    if 'fragment_cache' in current_app.extensions:
+        body += instrument.prometheus_gauges("assassins_fragment_cache", asdict(current_app.extensions['fragment_cache'].stats()))
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
 def init_app(app: Flask):
+    db_pool = pool.ConnectionPool(pool.PoolConfig.from_env())
+    writer_config = writer.WriterConfig.from_env()
+    app.extensions['db_pool'] = db_pool
+    app.extensions['db_writer'] = (
+        writer_config,
+        writer.WriteQueue(db_pool.connect, writer_config) if writer_config.queue else None)
+    app.extensions['game_cache'] = cache.from_env()
+    app.extensions['log_messages'] = messages.from_env()
+    app.extensions['game_events'] = events.from_env()
+    app.extensions['db_queries'] = instrument.QueryStats()
+    app.extensions['metrics_token'] = os.getenv("METRICS_TOKEN") or None
+    app.before_request(start_request_timer)
+    app.after_request(add_server_timing)
+    app.teardown_request(record_queries)
     app.teardown_appcontext(close_db)
+    app.add_url_rule('/metrics/db-pool', view_func=pool_stats_handler)
+    app.add_url_rule('/metrics/game-cache', view_func=game_cache_stats_handler)
+    app.add_url_rule('/metrics/queries', view_func=query_stats_handler)
+    app.add_url_rule('/metrics', view_func=metrics_handler)
     app.cli.add_command(init_db_cmd)
+    app.cli.add_command(upgrade_cmd)
     app.cli.add_command(game.create_game_cmd)
     app.cli.add_command(game.reset_game_cmd)
+    app.cli.add_command(game.integrity_check_cmd)
+    app.cli.add_command(game.game_stats_cmd)
+    app.cli.add_command(game.stats_check_cmd)
+    app.cli.add_command(game.import_roster_cmd)
 
 def create_game(name: str) -> uuid.UUID | None:
-    db = get_db()
-    try:
-        id = uuid.uuid4()
+    id = uuid.uuid4()
+
+    def apply(db: sqlite3.Connection):
         db.execute("""INSERT INTO games (uuid, name) VALUES (?, ?) """, 
                    (id.bytes, name))
-        db.commit()
-        return id
-    except sqlite3.Error as e:
-        print(e)
-        db.rollback()
-    return None
+        db.execute("""INSERT INTO game_stats (game_id) VALUES (?)""", (id.bytes,))
+
+    if not write(apply, "create_game"):
+        return None
+    return id
 
 def get_games() -> list[typedefs.Game]:
-    u : list[typedefs.Game] = []
     db = get_db()
 
     try:
-        cursor = db.execute("""
-            SELECT * FROM games 
+        return _records(db, typedefs.Game, f"""
+            SELECT {GAME_COLUMNS} FROM games 
             ORDER BY name""")
-        for row in cursor.fetchall():
-            u.append(typedefs.Game(
-                id=uuid.UUID(bytes=row["uuid"]), 
-                name=row["name"], 
-                owner=row["owner_id"], 
-                started=row["started"],
-                announcement=row["announcement"]))
-    except sqlite3.Error as e:
-        print(e)
-    except Exception as e:
-        print(e)
+    except Exception:
+        log.exception("db::get_games")
+
+    return []
+
+# Words as games_fts's unicode61 tokenizer splits them
+_SEARCH_TERM = re.compile(r"[^\W_]+")
+_SEARCH_TERMS_MAX = 8
+
+def _match_query(search: str) -> str | None:
+    """Turns what someone typed into an FTS5 query matching names holding
+    a word that starts with each of their words, so nothing they type is
+    read as query syntax."""
+    terms = _SEARCH_TERM.findall(search)[:_SEARCH_TERMS_MAX]
+    return " ".join(f'"{t}"*' for t in terms) or None
 
-    return u 
+def get_game_directory(status: str | None = None, search: str | None = None,
+                       limit: int = DIRECTORY_PAGE_SIZE,
+                       after: tuple[str, bytes] | None = None) -> typedefs.GamePage | None:
+    """Returns a page of games following the cursor `after`, the (name,
+    uuid bytes) of the last game on the page before, optionally only those
+    with `status`.
+
+    Browsing lists games in (name, id) order by seeking games_name or
+    games_status_name to the cursor, so every page costs the same however
+    deep it is. A search lists the games whose names match `search`
+    newest first instead, the order games_fts holds them in, so a page of
+    a word in every other name costs no more than one of a rare word;
+    ordering the matches by name would mean sorting all of them."""
+    conditions = []
+    params: tuple = ()
+    match = _match_query(search) if search else None
+    if match:
+        # CROSS JOIN keeps games_fts on the outside, reading matches in its
+        # own rowid order, which is games.seq
+        query = f"""
+            SELECT {LISTING_COLUMNS} FROM games_fts
+            CROSS JOIN games ON games.seq = games_fts.rowid"""
+        conditions.append("games_fts MATCH ?")
+        params += (match,)
+        if after is not None:
+            conditions.append("games_fts.rowid < (SELECT seq FROM games WHERE uuid = ?)")
+            params += (after[1],)
+        order = "games_fts.rowid DESC"
+    elif search and search.strip():
+        # Nothing searchable, such as only punctuation, matches nothing
+        return typedefs.GamePage(games=[], more=False)
+    else:
+        query = f"""SELECT {LISTING_COLUMNS} FROM games"""
+        # The first page seeks from before every name, so each page runs
+        # the same plan
+        conditions.append("(games.name, games.uuid) > (?, ?)")
+        params += after or ("", b"")
+        order = "games.name, games.uuid"
+    if status is not None:
+        conditions.append("games.status = ?")
+        params += (status,)
+    query += f"""
+        LEFT JOIN game_stats ON game_stats.game_id = games.uuid
+        WHERE {" AND ".join(conditions)}
+        ORDER BY {order} LIMIT ?"""
+    params += (limit + 1,)
+
+    try:
+        games = _records(get_db(), typedefs.GameListing, query, params)
+    except sqlite3.Error:
+        log.exception("db::get_game_directory")
+        return None
+    more = len(games) > limit
+    del games[limit:]
+    return typedefs.GamePage(games=games, more=more)
 
 def get_game_by_id(id: uuid.UUID) -> typedefs.Game | None:
     db = get_db()
 
     try:
-        cursor = db.execute("""SELECT * FROM games WHERE uuid = ?""", 
+        return _record(db, typedefs.Game, f"""SELECT {GAME_COLUMNS} FROM games WHERE uuid = ?""", 
                    (id.bytes,))
-        row = cursor.fetchone()
-        return typedefs.Game(
-            id=uuid.UUID(bytes=row["uuid"]),
-            name=row["name"],
-            owner=row["owner_id"], 
-            started=row["started"],
-            announcement=row["announcement"]) 
-    except Exception as e:
-        print(e)
+    except Exception:
+        log.exception("db::get_game_by_id")
     return None
 
-def set_game_owner(game_id: uuid.UUID, user_id: str, overwrite: bool = False) -> bool:
+def get_game_version(game_id: uuid.UUID) -> tuple[int, int] | None:
+    """Returns the game's (version, updated_at), or None if it doesn't exist."""
     db = get_db()
+
     try:
-        db.execute("""UPDATE games SET owner_id = ?
+        cursor = db.execute("""SELECT version, updated_at FROM games WHERE uuid = ?""",
+                   (game_id.bytes,))
+        row = cursor.fetchone()
+        if row:
+            return row["version"], row["updated_at"]
+    except sqlite3.Error:
+        log.exception("db::get_game_version")
+    return None
+
+def set_game_owner(game_id: uuid.UUID, user_id: str, overwrite: bool = False) -> bool:
+    def apply(db: sqlite3.Connection):
+        cursor = db.execute("""UPDATE games SET owner_id = ?
                     WHERE uuid = ? AND (? OR owner_id IS NULL)""", 
                    (user_id, game_id.bytes, overwrite))
-        db.commit()
-    except sqlite3.Error as e:
-        print(e)
-        db.rollback()
-    return True 
+        if cursor.rowcount:
+            _bump_version(db, game_id)
+
+    return write(apply, "set_game_owner")
 
 def set_game_announcement(game_id: uuid.UUID, msg: str | None) -> bool:
-    db = get_db()
-    try:
+    published: list[tuple[dict, str | None]] = []
+
+    def apply(db: sqlite3.Connection):
         db.execute("""UPDATE games SET announcement = ?
                     WHERE uuid = ?""", 
                    (msg, game_id.bytes))
-        db.commit()
-    except sqlite3.Error as e:
-        print(e)
-        db.rollback()
-    return True 
+        published.append(({"type": "announcement", "version": _bump_version(db, game_id), "msg": msg}, None))
 
-def create_account(account: typedefs.Account):
-    db = get_db()
-    try:
+    if not write(apply, "set_game_announcement"):
+        return False
+    _publish(game_id, published)
+    return True
+
+def create_account(account: typedefs.Account) -> str | None:
+    def apply(db: sqlite3.Connection):
         db.execute("""INSERT INTO accounts (id, name, email) VALUES (?, ?, ?) """, 
                    (account.id, account.name, account.email))
-        db.commit()
-        return id
-    except sqlite3.Error as e:
-        print(e)
-        db.rollback()
-    return None
+
+    if not write(apply, "create_account"):
+        return None
+    return account.id
 
 def get_account_by_id(user_id: str) -> typedefs.Account | None:
     db = get_db()
     try:
-        cursor = db.execute("""
-            SELECT * FROM accounts 
+        return _record(db, typedefs.Account, f"""
+            SELECT {ACCOUNT_COLUMNS} FROM accounts 
             WHERE id = ?""", 
                    (user_id,))
-        row = cursor.fetchone()
-        return typedefs.Account(
-            id=row["id"], 
-            name=row["name"],
-            email=row["email"])
-    except sqlite3.Error as e:
-        print(e)
-    except Exception as e:
-        print(e)
+    except Exception:
+        log.exception("db::get_account_by_id")
 
     return None
 
 def create_user(game_id: uuid.UUID, account_id: str) -> bool:
-    db = get_db()
-
-    try:
+    def apply(db: sqlite3.Connection):
         db.execute("""INSERT INTO USERS (account_id, game_id) VALUES (?, ?) """, 
                    (account_id, game_id.bytes))
-        db.commit()
-    except sqlite3.IntegrityError as _:
-        db.rollback()
-        return False
-    except sqlite3.Error as _:
-        db.rollback()
-    return True 
+        _add_stats(db, game_id, players=1, alive=1)
+        _bump_version(db, game_id)
 
+    return write(apply, "create_user")
+
+def import_roster(game_id: uuid.UUID, rows: Iterable[tuple[str, str, str]],
+                  chunk_size: int = IMPORT_CHUNK_SIZE, update_accounts: bool = False,
+                  progress: Callable[[typedefs.RosterImport], None] | None = None) -> typedefs.RosterImport | None:
+    """Adds (id, name, email) rows to a game that hasn't started, creating
+    their accounts as needed. Rows are streamed `chunk_size` at a time, each
+    chunk in one transaction of one executemany per table. Existing accounts
+    keep their name and email unless `update_accounts`, which also marks
+    every game showing a changed account as stale, and players already in
+    the game are left as they are. As with signing up, the first player
+    in becomes the owner of an ownerless game.
+
+    Returns the totals, or None if a chunk failed or the game had started,
+    in which case the chunks before it remain imported."""
+    upsert = """
+        INSERT INTO accounts (id, name, email) VALUES (?, ?, ?)
+        ON CONFLICT (id) DO NOTHING"""
+    if update_accounts:
+        upsert = """
+        INSERT INTO accounts (id, name, email) VALUES (?, ?, ?)
+        ON CONFLICT (id) DO UPDATE SET name = excluded.name, email = excluded.email
+        WHERE name != excluded.name OR email != excluded.email"""
+    totals = typedefs.RosterImport()
+
+    for chunk in itertools.batched(rows, chunk_size):
+        written: list[tuple[int, int]] = []
+
+        def apply(db: sqlite3.Connection) -> bool:
+            written.clear()
+            game = db.execute("""SELECT started FROM games WHERE uuid = ?""", (game_id.bytes,)).fetchone()
+            if not game or game["started"]:
+                return False
+            # Accounts whose name or email the chunk changes, which are shown
+            # by every game they play in, not just this one
+            changed = [row[0] for row in db.execute("""
+                SELECT accounts.id FROM json_each(?) AS rows
+                JOIN accounts ON accounts.id = rows.value ->> 0
+                WHERE accounts.name != rows.value ->> 1 OR accounts.email != rows.value ->> 2""",
+                       (json.dumps(chunk),))] if update_accounts else []
+            accounts = db.executemany(upsert, chunk).rowcount
+            players = db.executemany("""
+                INSERT INTO users (account_id, game_id) VALUES (?, ?)
+                ON CONFLICT (game_id, account_id) DO NOTHING""",
+                       [(row[0], game_id.bytes) for row in chunk]).rowcount
+            if players:
+                db.execute("""UPDATE games SET owner_id = ? WHERE uuid = ? AND owner_id IS NULL""",
+                           (chunk[0][0], game_id.bytes))
+                _add_stats(db, game_id, players=players, alive=players)
+            if players or changed:
+                _bump_version(db, game_id)
+            if changed:
+                db.execute("""
+                    UPDATE games
+                    SET version = version + 1, updated_at = CAST(strftime('%s', 'now') AS INTEGER)
+                    WHERE uuid != ? AND uuid IN (
+                      SELECT game_id FROM users WHERE account_id IN (SELECT value FROM json_each(?)))""",
+                           (game_id.bytes, json.dumps(changed)))
+            written.append((accounts, players))
+            return True
+
+        if not write(apply, "import_roster"):
+            return None
+        accounts, players = written[0]
+        totals.rows += len(chunk)
+        totals.accounts += accounts
+        totals.players += players
+        if progress:
+            progress(totals)
+    return totals
 
 def remove_user(game_id: uuid.UUID, user_id: str) -> bool:
-    db = get_db()
+    def apply(db: sqlite3.Connection):
+        removed = db.execute("""DELETE FROM users WHERE game_id = ? and account_id = ? RETURNING eliminated""", 
+                   (game_id.bytes, user_id)).fetchone()
+        if removed:
+            _add_stats(db, game_id, players=-1, alive=0 if removed["eliminated"] else -1)
+        _bump_version(db, game_id)
 
-    try:
-        db.execute("""DELETE FROM users WHERE game_id = ? and account_id = ?""", 
-                   (game_id.bytes, user_id))
-        db.commit()
-    except sqlite3.IntegrityError as e:
-        print(e)
-        db.rollback()
-        return False
-    except sqlite3.Error as e:
-        print(e)
-        db.rollback()
-    return True 
+    return write(apply, "remove_user")
 
 def get_user_by_id(game_id: uuid.UUID, user_id: str) -> typedefs.User | None:
     db = get_db()
 
     try:
-        cursor = db.execute("""
-            SELECT users.*, accounts.* FROM users 
+        return _record(db, typedefs.User, f"""
+            SELECT {USER_COLUMNS} FROM users 
             LEFT JOIN accounts ON users.account_id = accounts.id
             WHERE account_id = ? AND game_id = ?""", 
                    (user_id, game_id.bytes))
+    except Exception:
+        log.exception("db::get_user_by_id")
+
+    return None
+
+def get_game_with_member(game_id: uuid.UUID, account_id: str | None) -> tuple[typedefs.Game, typedefs.User | None] | None:
+    """Loads a game and, if they've joined it, the given account's player
+    record in one query."""
+    db = get_db()
+
+    try:
+        cursor = db.cursor()
+        cursor.row_factory = None
+        cursor.execute(f"""
+            SELECT {GAME_COLUMNS}, {USER_COLUMNS}
+            FROM games
+            LEFT JOIN users ON users.game_id = games.uuid AND users.account_id = ?
+            LEFT JOIN accounts ON accounts.id = users.account_id
+            WHERE games.uuid = ?""",
+                   (account_id, game_id.bytes))
         row = cursor.fetchone()
-        return typedefs.User(
-            id=row["id"], 
-            name=row["name"],
-            target_user_id=row["target_user_id"],
-            eliminated=row["eliminated"],
-            elimination_count=row["elimination_count"])
-    except sqlite3.Error as e:
-        print(e)
-    except Exception as e:
-        print(e)
+        if row is None:
+            return None
+        game = typedefs.Game(*row[:GAME_FIELD_COUNT])
+        member = row[GAME_FIELD_COUNT:]
+        return game, typedefs.User(*member) if member[0] is not None else None
+    except sqlite3.Error:
+        log.exception("db::get_game_with_member")
 
     return None
 
@@ -217,55 +590,103 @@ def get_user_by_target(game_id: uuid.UUID, target_id: str) -> typedefs.User | No
     db = get_db()
 
     try:
-        cursor = db.execute("""
-            SELECT users.*, accounts.* FROM users 
+        return _record(db, typedefs.User, f"""
+            SELECT {USER_COLUMNS} FROM users 
             LEFT JOIN accounts ON users.account_id = accounts.id
             WHERE target_user_id = ? AND game_id = ?""", 
                    (target_id, game_id.bytes))
-        row = cursor.fetchone()
-        return typedefs.User(
-            id=row["id"], 
-            name=row["name"],
-            target_user_id=row["target_user_id"],
-            eliminated=row["eliminated"],
-            elimination_count=row["elimination_count"])
-    except sqlite3.Error as e:
-        print(e)
-    except Exception as e:
-        print(e)
+    except Exception:
+        log.exception("db::get_user_by_target")
 
     return None
 
 def get_users_by_game(game_id: uuid.UUID) -> list[typedefs.User]:
-    u : list[typedefs.User] = []
     db = get_db()
 
     try:
-        cursor = db.execute("""
-            SELECT users.*, accounts.* FROM users 
-            LEFT JOIN accounts ON users.account_id = accounts.id
-            WHERE game_id = ?
-            ORDER BY eliminated ASC, elimination_count DESC, name ASC""", 
-                   (game_id.bytes,))
-        for row in cursor.fetchall():
-            u.append(typedefs.User(
-                id=row["id"], 
-                name=row["name"],
-                target_user_id=row["target_user_id"],
-                eliminated=row["eliminated"],
-                elimination_count=row["elimination_count"]))
-    except sqlite3.Error as e:
-        print(e)
-    except Exception as e:
-        print(e)
+        return _read_users(db, game_id)
+    except Exception:
+        log.exception("db::get_users_by_game")
+
+    return []
+
+def _read_users(db: sqlite3.Connection, game_id: uuid.UUID) -> list[typedefs.User]:
+    return _records(db, typedefs.User, f"""
+        SELECT {USER_COLUMNS} FROM users 
+        LEFT JOIN accounts ON users.account_id = accounts.id
+        WHERE game_id = ?
+        ORDER BY eliminated ASC, elimination_count DESC, name ASC""", 
+               (game_id.bytes,))
+
+# The player fields the JSON API exposes, as SQL over users joined to
+# accounts. Targets stay private to each player and aren't among them.
+PLAYER_FIELDS = {
+    "id": "users.account_id",
+    "name": "accounts.name",
+    "eliminated": "json(iif(users.eliminated, 'true', 'false'))",
+    "elimination_count": "users.elimination_count",
+}
+# What everyone but the owner is shown as a player's id
+PLAYER_HANDLE_FIELD = "player_handle(users.game_id, users.account_id)"
+
+def get_players_json(game_id: uuid.UUID, fields: Iterable[str], limit: int,
+                     after: str | None = None, by_handle: bool = True) -> tuple[list[str], str | None] | None:
+    """Renders up to `limit` of the game's players after account id `after`,
+    in account id order, as JSON objects holding `fields`. SQLite builds
+    each object itself, so even a large roster never turns into Python
+    objects. With `by_handle`, each player's id is their handle rather than
+    their account id. Returns the objects and the account id the next page
+    starts after."""
+    columns = dict(PLAYER_FIELDS, id=PLAYER_HANDLE_FIELD) if by_handle else PLAYER_FIELDS
+    pairs = ", ".join(f"'{f}', {columns[f]}" for f in fields)
+    db = get_db()
+
+    try:
+        db.create_function("player_handle", 2, handles.player, deterministic=True)
+        cursor = db.cursor()
+        cursor.row_factory = None
+        rows = cursor.execute(f"""
+            SELECT users.account_id, json_object({pairs}) FROM users
+            JOIN accounts ON accounts.id = users.account_id
+            WHERE users.game_id = ? AND users.account_id > ?
+            ORDER BY users.account_id LIMIT ?""",
+                   (game_id.bytes, after or "", limit + 1)).fetchall()
+    except sqlite3.Error:
+        log.exception("db::get_players_json")
+        return None
 
-    return u 
+    more = len(rows) > limit
+    del rows[limit:]
+    return [row[1] for row in rows], rows[-1][0] if more else None
 
-def set_user_targets(game_id: uuid.UUID, mapping: list[tuple[str, str]]):
+def get_ring(game_id: uuid.UUID) -> ring.Ring | None:
     db = get_db()
-    data = [(e[1], game_id.bytes, e[0]) for e in mapping]
 
     try:
+        cursor = db.execute("""
+            SELECT account_id, target_user_id, eliminated FROM users
+            WHERE game_id = ?""",
+                   (game_id.bytes,))
+        return ring.Ring.from_rows(cursor)
+    except sqlite3.Error:
+        log.exception("db::get_ring")
+    return None
+
+def set_user_targets(game_id: uuid.UUID, mapping: Iterable[tuple[str, str]], check: bool = True) -> bool:
+    """Assigns targets and starts the game. With `check` the mapping is first
+    validated as a single ring; without it, `mapping` may be a generator that
+    is streamed straight into the update."""
+    if check:
+        mapping = list(mapping)
+        problems = ring.Ring.from_rows((e[0], e[1], 0) for e in mapping).check()
+        if problems:
+            log.error("db::set_user_targets: refusing to write a broken ring: %s", "; ".join(problems[:5]))
+            return False
+
+    data = ((e[1], game_id.bytes, e[0]) for e in mapping)
+    published: list[tuple[dict, str | None]] = []
+
+    def apply(db: sqlite3.Connection):
         db.executemany("""
             UPDATE users
             SET target_user_id = ?
@@ -276,75 +697,396 @@ def set_user_targets(game_id: uuid.UUID, mapping: list[tuple[str, str]]):
             SET started = 1
             WHERE uuid = ?
         """, (game_id.bytes,))
-        db.commit()
-    except sqlite3.Error as e:
-        print(e)
-    except Exception as e:
-        print(e)
+        db.execute("""
+            UPDATE game_stats
+            SET started_at = coalesce(started_at, CAST(strftime('%s', 'now') AS INTEGER))
+            WHERE game_id = ?""", (game_id.bytes,))
+        published.append(({"type": "started", "version": _bump_version(db, game_id)}, None))
 
-def eliminate_user(game_id: uuid.UUID, target_id: str, elim_count: int):
-    target = get_user_by_id(game_id, target_id)
-    if not target or not target.target_user_id:
-        return
+    if not write(apply, "set_user_targets"):
+        return False
+    _publish(game_id, published)
+    return True
 
-    assassin = get_user_by_target(game_id, target_id)
-    if not assassin: 
-        return
+def eliminate_user(game_id: uuid.UUID, target_id: str, elim_count: int) -> bool:
+    published: list[tuple[dict, str | None]] = []
+    # Picked before taking the write lock, which is held for less time
+    # without reading log_messages under it
+    table = get_log_messages()
+    msg_id = table.pick()
+    if msg_id is None:
+        log.error("db::eliminate_user: there are no log messages to pick from")
+        return False
+    elim_msg, forfeit_msg = table.by_id[msg_id]
+
+    def apply(db: sqlite3.Connection) -> bool:
+        # Read the chain under the write lock so concurrent eliminations
+        # can't both reassign the same assassin
+        target = db.execute("""
+            SELECT users.target_user_id, accounts.name FROM users
+            LEFT JOIN accounts ON users.account_id = accounts.id
+            WHERE game_id = ? AND account_id = ?""",
+                   (game_id.bytes, target_id)).fetchone()
+        # Already out, or the last player standing, who targets themselves
+        if not target or target["target_user_id"] in (None, target_id):
+            return False
+
+        assassin = db.execute("""
+            SELECT users.account_id, users.elimination_count, accounts.name FROM users
+            LEFT JOIN accounts ON users.account_id = accounts.id
+            WHERE game_id = ? AND target_user_id = ?""",
+                   (game_id.bytes, target_id)).fetchone()
+        if not assassin:
+            return False
 
-    db = get_db()
-    try:
         db.execute("""
             UPDATE users
             SET eliminated = 1, target_user_id = NULL
             WHERE game_id = ? AND account_id = ?""", 
-                   (game_id.bytes, target.id))
+                   (game_id.bytes, target_id))
         db.execute("""
             UPDATE users 
             SET target_user_id = ?, elimination_count = elimination_count + ?
             WHERE game_id = ? AND account_id = ?
-        """, (target.target_user_id, elim_count, game_id.bytes, assassin.id))
-        cursor = db.execute("""SELECT COUNT(*) FROM log_messages""")
-        row_count = cursor.fetchone()[0]
-        msg_id = random.randint(1, row_count)
+        """, (target["target_user_id"], elim_count, game_id.bytes, assassin["account_id"]))
         db.execute("""
             INSERT INTO logs (game_id, user_id, target_id, msg_id) VALUES (?, ?, ?, ?)
-        """, (game_id.bytes, assassin.id if elim_count else None, target_id, msg_id))
-        db.commit()
-    except sqlite3.Error as e:
-        print(e)
-    except Exception as e:
-        print(e)
+        """, (game_id.bytes, assassin["account_id"] if elim_count else None, target_id, msg_id))
+        _add_stats(db, game_id, alive=-1, kills=elim_count, forfeits=0 if elim_count else 1, eliminated=True)
+        version = _bump_version(db, game_id)
+
+        new_target = db.execute("""SELECT name FROM accounts WHERE id = ?""",
+                   (target["target_user_id"],)).fetchone()
+        log_entry = typedefs.Log(
+            user=assassin["name"] if elim_count else None,
+            target=target["name"],
+            elim_msg=elim_msg,
+            forfeit_msg=forfeit_msg)
+        published.append((_elimination_event(game_id, version, log_entry, target_id, assassin["account_id"],
+                                             elim_count, assassin["elimination_count"] + elim_count), None))
+        published.append(({"type": "target", "version": version, "target": new_target["name"]}, assassin["account_id"]))
+        return True
+
+    if not write(apply, "eliminate_user"):
+        return False
+    _publish(game_id, published)
+    return True
+
+def eliminate_users(game_id: uuid.UUID, eliminations: list[tuple[str, int]]) -> int:
+    """Applies a batch of eliminations, in order, in a single transaction.
+
+    The target ring is resolved in memory, so consecutive kills along the ring
+    credit whoever holds the target at that point in the batch, exactly as if
+    the eliminations had been submitted one at a time. Targets that are
+    already out, or the last player standing, are skipped. Returns the
+    number of eliminations applied.
+    """
+    published: list[tuple[dict, str | None]] = []
+    applied = 0
+    table = get_log_messages()
+    if not table.ids:
+        log.error("db::eliminate_users: there are no log messages to pick from")
+        return 0
 
-def get_game_logs(game_id: uuid.UUID) -> list[typedefs.Log]:
-    l : list[typedefs.Log] = []
+    def apply(db: sqlite3.Connection) -> bool:
+        nonlocal applied
+        rows = db.execute("""
+            SELECT users.account_id, users.target_user_id, users.eliminated, users.elimination_count, accounts.name FROM users
+            LEFT JOIN accounts ON users.account_id = accounts.id
+            WHERE game_id = ? AND target_user_id IS NOT NULL""",
+                   (game_id.bytes,)).fetchall()
+        targets = ring.Ring.from_rows((row["account_id"], row["target_user_id"], row["eliminated"]) for row in rows)
+        ids = targets.ids
+        names = [row["name"] for row in rows]
+        kills = [row["elimination_count"] for row in rows]
+
+        eliminated: list[int] = []
+        changed: set[int] = set()
+        logs: list[tuple[int, int, int, int, int]] = []
+
+        for target_id, elim_count in eliminations:
+            i = targets.index.get(target_id)
+            if i is None or not targets.alive[i]:
+                continue
+            try:
+                assassin, _ = targets.eliminate(i)
+            except ValueError:
+                continue
+            kills[assassin] += elim_count
+            changed.add(assassin)
+            changed.discard(i)
+
+            eliminated.append(i)
+            logs.append((assassin, elim_count, i, table.pick(), kills[assassin]))
+
+        if not eliminated:
+            return False
+
+        # Clear the eliminated players' targets first so no intermediate state
+        # has two players holding the same target
+        db.executemany("""
+            UPDATE users
+            SET eliminated = 1, target_user_id = NULL, elimination_count = ?
+            WHERE game_id = ? AND account_id = ?""",
+                   [(kills[i], game_id.bytes, ids[i]) for i in eliminated])
+        db.executemany("""
+            UPDATE users
+            SET target_user_id = ?, elimination_count = ?
+            WHERE game_id = ? AND account_id = ?""",
+                   [(ids[targets.succ[a]], kills[a], game_id.bytes, ids[a]) for a in changed])
+        db.executemany("""
+            INSERT INTO logs (game_id, user_id, target_id, msg_id) VALUES (?, ?, ?, ?)""",
+                   [(game_id.bytes, ids[assassin] if elim_count else None, ids[i], msg_id)
+                    for assassin, elim_count, i, msg_id, _ in logs])
+        _add_stats(db, game_id,
+                   alive=-len(eliminated),
+                   kills=sum(elim_count for _, elim_count, _, _, _ in logs),
+                   forfeits=sum(1 for _, elim_count, _, _, _ in logs if not elim_count),
+                   eliminated=True)
+        version = _bump_version(db, game_id)
+
+        for assassin, elim_count, i, msg_id, count in logs:
+            elim_msg, forfeit_msg = table.by_id[msg_id]
+            log_entry = typedefs.Log(
+                user=names[assassin] if elim_count else None,
+                target=names[i],
+                elim_msg=elim_msg,
+                forfeit_msg=forfeit_msg)
+            published.append((_elimination_event(game_id, version, log_entry, ids[i], ids[assassin], elim_count, count), None))
+        for assassin in changed:
+            published.append(({"type": "target", "version": version, "target": names[targets.succ[assassin]]}, ids[assassin]))
+        applied = len(eliminated)
+        return True
+
+    if not write(apply, "eliminate_users"):
+        return 0
+    _publish(game_id, published)
+    return applied
+
+def _read_logs(db: sqlite3.Connection, game_id: uuid.UUID, limit: int,
+               after: tuple[int, int] | None = None,
+               before: tuple[int, int] | None = None) -> typedefs.LogPage:
+    """Reads one page of a game's log by seeking logs_game_ts to a (ts, id)
+    cursor, so the cost depends on the page size rather than on how long
+    the game has run. With `after`, returns the oldest entries newer than it;
+    otherwise the newest entries older than `before`, or the newest of all.
+    Either way the page is in log order, oldest first."""
+    query = f"""
+        SELECT {LOG_COLUMNS} FROM logs
+        LEFT JOIN accounts ON accounts.id = logs.user_id
+        LEFT JOIN accounts AS targets ON targets.id = logs.target_id
+        WHERE logs.game_id = ?"""
+    params: tuple = (game_id.bytes,)
+    if after is not None:
+        query += """ AND (logs.ts, logs.id) > (?, ?)
+        ORDER BY logs.ts ASC, logs.id ASC LIMIT ?"""
+        params += (*after, limit + 1)
+    else:
+        if before is not None:
+            query += """ AND (logs.ts, logs.id) < (?, ?)"""
+            params += before
+        query += """
+        ORDER BY logs.ts DESC, logs.id DESC LIMIT ?"""
+        params += (limit + 1,)
+
+    cursor = db.cursor()
+    cursor.row_factory = None
+    rows = cursor.execute(query, params).fetchall()
+    by_id = current_app.extensions['log_messages'].covering(db, {row[2] for row in rows}).by_id
+    logs = [typedefs.Log(user, target, *by_id.get(msg_id, messages.MISSING), ts, id)
+            for user, target, msg_id, ts, id in rows]
+    more = len(logs) > limit
+    del logs[limit:]
+    if after is None:
+        logs.reverse()
+    return typedefs.LogPage(logs=logs, more=more)
+
+def get_game_logs(game_id: uuid.UUID, limit: int = LOG_PAGE_SIZE,
+                  after: tuple[int, int] | None = None,
+                  before: tuple[int, int] | None = None) -> typedefs.LogPage | None:
+    """Returns a page of the game's log, or None if there is no such game."""
     db = get_db()
 
     try:
-        cursor = db.execute("""
-            SELECT accounts.name AS user, targets.name AS target, log_messages.* FROM logs
-            LEFT JOIN accounts ON accounts.id = logs.user_id
-            LEFT JOIN accounts AS targets ON targets.id = logs.target_id
-            LEFT JOIN log_messages ON logs.msg_id = log_messages.id
-            WHERE logs.game_id = ?
-            ORDER BY logs.ts ASC""", 
-                   (game_id.bytes,))
-        for row in cursor.fetchall():
-            l.append(typedefs.Log(
-                user=row["user"], 
-                target=row["target"],
-                elim_msg=row["elim"],
-                forfeit_msg=row["forfeit"]))
-    except sqlite3.Error as e:
-        print(e)
-    except Exception as e:
-        print(e)
+        page = _read_logs(db, game_id, limit, after, before)
+        # An empty page is the usual answer to polling with `after`; only
+        # then is it worth telling a finished log from a missing game
+        if not page.logs and not db.execute("""SELECT 1 FROM games WHERE uuid = ?""",
+                                            (game_id.bytes,)).fetchone():
+            return None
+        return page
+    except sqlite3.Error:
+        log.exception("db::get_game_logs")
+        return None
 
-    return l
+def _read_stats(db: sqlite3.Connection, game_id: uuid.UUID, top: int) -> typedefs.GameStats | None:
+    """Reads the game's counters and its `top` killers, who come straight
+    off the users_kills index, so neither depends on the roster's size."""
+    row = db.execute("""SELECT * FROM game_stats WHERE game_id = ?""",
+               (game_id.bytes,)).fetchone()
+    if not row:
+        return None
+    killers = db.execute("""
+        SELECT accounts.name, users.elimination_count FROM users
+        JOIN accounts ON accounts.id = users.account_id
+        WHERE users.game_id = ? AND users.elimination_count > 0
+        ORDER BY users.elimination_count DESC LIMIT ?""",
+               (game_id.bytes, top)).fetchall()
+    return typedefs.GameStats(
+        players=row["players"],
+        alive=row["alive"],
+        kills=row["kills"],
+        forfeits=row["forfeits"],
+        started_at=row["started_at"],
+        last_elimination_at=row["last_elimination_at"],
+        top_killers=[(k["name"], k["elimination_count"]) for k in killers])
 
-def reset_game(game_id: uuid.UUID):
+def get_game_stats(game_id: uuid.UUID, top: int = TOP_KILLERS) -> typedefs.GameStats | None:
     db = get_db()
 
     try:
+        db.execute("BEGIN")
+        return _read_stats(db, game_id, top)
+    except sqlite3.Error:
+        log.exception("db::get_game_stats")
+        return None
+    finally:
+        db.rollback()
+
+# What each game's game_stats row should hold, worked out from its roster
+# and log the slow way
+_EXPECTED_STATS = """
+    SELECT
+      games.uuid AS game_id,
+      games.started,
+      games.updated_at,
+      (SELECT count(*) FROM users WHERE users.game_id = games.uuid) AS players,
+      (SELECT count(*) FROM users WHERE users.game_id = games.uuid AND NOT users.eliminated) AS alive,
+      (SELECT coalesce(sum(users.elimination_count), 0) FROM users WHERE users.game_id = games.uuid) AS kills,
+      (SELECT count(*) FROM logs WHERE logs.game_id = games.uuid AND logs.user_id IS NULL) AS forfeits,
+      (SELECT min(logs.ts) FROM logs WHERE logs.game_id = games.uuid) AS first_elimination_at,
+      (SELECT max(logs.ts) FROM logs WHERE logs.game_id = games.uuid) AS last_elimination_at,
+      game_stats.game_id IS NOT NULL AS present,
+      game_stats.players AS stored_players,
+      game_stats.alive AS stored_alive,
+      game_stats.kills AS stored_kills,
+      game_stats.forfeits AS stored_forfeits,
+      game_stats.started_at AS stored_started_at,
+      game_stats.last_elimination_at AS stored_last_elimination_at
+    FROM games
+    LEFT JOIN game_stats ON game_stats.game_id = games.uuid"""
+
+def check_game_stats(game_id: uuid.UUID | None = None, fix: bool = False) -> list[str] | None:
+    """Compares game_stats with the roster and log, for one game or for
+    all of them, and returns what differs. With `fix`, the rows that
+    differ are rebuilt in the same transaction. Games started before the
+    table existed can't have their start recovered, so for them it's only
+    checked to be set. Returns None if the check couldn't run."""
+    problems: list[str] = []
+    query = _EXPECTED_STATS + (""" WHERE games.uuid = ?""" if game_id else "")
+
+    def apply(db: sqlite3.Connection):
+        for row in db.execute(query, (game_id.bytes,) if game_id else ()).fetchall():
+            name = uuid.UUID(bytes=row["game_id"])
+            if not row["present"]:
+                found = ["missing"]
+            else:
+                found = [f"{column} is {row['stored_' + column]}, expected {row[column]}"
+                         for column in ("players", "alive", "kills", "forfeits", "last_elimination_at")
+                         if row["stored_" + column] != row[column]]
+                if (row["stored_started_at"] is None) == bool(row["started"]):
+                    found.append(f"started_at is {row['stored_started_at']} but the game "
+                                 f"{'has' if row['started'] else 'has not'} started")
+            if not found:
+                continue
+            problems.extend(f"{name}: {problem}" for problem in found)
+            if fix:
+                started_at = (row["stored_started_at"] or row["first_elimination_at"] or row["updated_at"]
+                              if row["started"] else None)
+                db.execute("""
+                    INSERT OR REPLACE INTO game_stats (game_id, players, alive, kills, forfeits, started_at, last_elimination_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                           (row["game_id"], row["players"], row["alive"], row["kills"], row["forfeits"],
+                            started_at, row["last_elimination_at"]))
+
+    if fix:
+        return problems if write(apply, "check_game_stats") else None
+    db = get_db()
+    try:
+        db.execute("BEGIN")
+        apply(db)
+    except sqlite3.Error:
+        log.exception("db::check_game_stats")
+        return None
+    finally:
+        db.rollback()
+    return problems
+
+def _load_game_view(db: sqlite3.Connection, game_id: uuid.UUID) -> typedefs.GameView | None:
+    game = _record(db, typedefs.Game, f"""SELECT {GAME_COLUMNS} FROM games WHERE uuid = ?""",
+               (game_id.bytes,))
+    if not game:
+        return None
+    users = _read_users(db, game_id)
+
+    # Only the latest entries are rendered; the page fetches older ones
+    # from get_game_logs as they are scrolled to
+    logs = _read_logs(db, game_id, LOG_PAGE_SIZE)
+
+    return typedefs.GameView(
+        game=game,
+        users=users,
+        logs=logs.logs,
+        by_id={u.id: u for u in users},
+        more_logs=logs.more,
+        stats=_read_stats(db, game_id, TOP_KILLERS))
+
+def get_game_snapshot(game_id: uuid.UUID, viewer_id: str | None) -> typedefs.GameSnapshot | None:
+    """Loads everything the game page needs inside a single read transaction.
+
+    The roster and log are served from the game cache while the game's version
+    is unchanged, so a cache hit costs one primary key lookup. The viewer and
+    their target are picked out of the roster in memory rather than queried
+    for separately, so every part of the page comes from the same snapshot of
+    the database.
+    """
+    db = get_db()
+    game_cache = get_game_cache()
+
+    try:
+        db.execute("BEGIN")
+        cursor = db.execute("""SELECT version FROM games WHERE uuid = ?""",
+                   (game_id.bytes,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+
+        view = game_cache.get(game_id.bytes, row["version"])
+        if view is None:
+            view = _load_game_view(db, game_id)
+            if view is None:
+                return None
+            game_cache.put(game_id.bytes, view.game.version, view)
+    except sqlite3.Error:
+        log.exception("db::get_game_snapshot")
+        return None
+    finally:
+        db.rollback()
+
+    user = view.by_id.get(viewer_id) if viewer_id else None
+    target = view.by_id.get(user.target_user_id) if user and user.target_user_id else None
+
+    return typedefs.GameSnapshot(
+        game=view.game,
+        users=view.users,
+        user=user,
+        target=target,
+        logs=view.logs,
+        more_logs=view.more_logs,
+        stats=view.stats)
+
+def reset_game(game_id: uuid.UUID) -> bool:
+    def apply(db: sqlite3.Connection):
         db.execute("""
         DELETE FROM logs
         WHERE logs.game_id = ?
@@ -364,7 +1106,16 @@ def reset_game(game_id: uuid.UUID):
             WHERE uuid = ?
         """,
            (game_id.bytes,))
-        db.commit()
-    except sqlite3.Error as e:
-        print(f"db::reset_game: {e}")
+        db.execute("""
+            UPDATE game_stats SET
+            alive = players,
+            kills = 0,
+            forfeits = 0,
+            started_at = NULL,
+            last_elimination_at = NULL
+            WHERE game_id = ?
+        """,
+           (game_id.bytes,))
+        _bump_version(db, game_id)
 
+    return write(apply, "reset_game")
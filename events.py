@@ -0,0 +1,195 @@
+import asyncio
+import json
+import os
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Protocol
+
+Deliver = Callable[[bytes, str], None]
+
+STREAM_SECONDS = float(os.getenv("EVENT_STREAM_SECONDS", 300))
+KEEPALIVE_SECONDS = float(os.getenv("EVENT_KEEPALIVE_SECONDS", 15))
+# Open streams allowed per process. A stream served by the WSGI app holds a
+# server thread for its whole life, so those get a far smaller allowance,
+# leaving most threads for ordinary requests
+MAX_STREAMS = int(os.getenv("EVENT_MAX_STREAMS", 1000))
+MAX_THREADED_STREAMS = int(os.getenv("EVENT_MAX_THREADED_STREAMS", 8))
+
+
+@dataclass(eq=False)
+class Subscription:
+    game_id: bytes
+    account_id: str | None
+    pending: queue.Queue[dict] = field(default_factory=lambda: queue.Queue(maxsize=64))
+    overflowed: bool = False
+
+    def put(self, event: dict) -> bool:
+        """Called from the publishing thread. Returns False if the event was
+        dropped because the subscriber is too far behind."""
+        try:
+            self.pending.put_nowait(event)
+            return True
+        except queue.Full:
+            self.overflowed = True
+            return False
+
+    def get(self, timeout: float) -> dict | None:
+        """Waits up to `timeout` seconds for the next event."""
+        if self.overflowed:
+            self.overflowed = False
+            return {"type": "refresh"}
+        try:
+            return self.pending.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+@dataclass(eq=False)
+class AsyncSubscription:
+    """A subscription read from an event loop rather than a blocked thread."""
+    game_id: bytes
+    account_id: str | None
+    loop: asyncio.AbstractEventLoop
+    pending: asyncio.Queue[dict] = field(default_factory=lambda: asyncio.Queue(maxsize=64))
+    overflowed: bool = False
+
+    def put(self, event: dict) -> bool:
+        """Called from the publishing thread, which hands the event to the
+        loop. Returns False if it was dropped because the subscriber is too
+        far behind or its loop has closed. The queue's size is read from
+        this thread, so an event can still find it full on arrival, which
+        marks the subscription overflowed all the same."""
+        if self.pending.full():
+            self.overflowed = True
+            return False
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop has closed, with nobody left to read the event
+            return False
+        return True
+
+    def _put(self, event: dict) -> None:
+        try:
+            self.pending.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout: float) -> dict | None:
+        if self.overflowed:
+            self.overflowed = False
+            return {"type": "refresh"}
+        try:
+            return await asyncio.wait_for(self.pending.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Transport(Protocol):
+    """Carries published events to every worker's broker, including the
+    publisher's own."""
+    def start(self, deliver: Deliver) -> None: ...
+    def send(self, game_id: bytes, message: str) -> None: ...
+
+
+class LocalTransport:
+    """Loops events straight back into this process. Stands in for a shared
+    message bus when there is only one worker."""
+
+    def __init__(self) -> None:
+        self._deliver: Deliver | None = None
+
+    def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    def send(self, game_id: bytes, message: str) -> None:
+        if self._deliver:
+            self._deliver(game_id, message)
+
+
+class Broker:
+    """Fans game events out to the streams subscribed in this process.
+
+    Events addressed `to` an account are only delivered to that account's
+    streams. A subscriber that falls too far behind is told to refresh
+    instead of being sent a partial history.
+    """
+
+    def __init__(self, transport: Transport, max_streams: int = MAX_STREAMS,
+                 max_threaded_streams: int = MAX_THREADED_STREAMS) -> None:
+        self.transport = transport
+        self.max_streams = max_streams
+        self.max_threaded_streams = max_threaded_streams
+        self._lock = threading.Lock()
+        self._subs: dict[bytes, set[Subscription | AsyncSubscription]] = {}
+        self._streams = 0
+        self._threaded_streams = 0
+        self.published = 0
+        self.delivered = 0
+        self.refused = 0
+        transport.start(self._deliver)
+
+    def subscribe(self, game_id: bytes, account_id: str | None) -> Subscription | None:
+        """Subscribes a stream served from a thread. Returns None if this
+        process already has as many of those as it allows."""
+        sub = Subscription(game_id, account_id)
+        return sub if self._add(sub) else None
+
+    def subscribe_async(self, game_id: bytes, account_id: str | None) -> AsyncSubscription | None:
+        sub = AsyncSubscription(game_id, account_id, asyncio.get_running_loop())
+        return sub if self._add(sub) else None
+
+    def _add(self, sub: Subscription | AsyncSubscription) -> bool:
+        threaded = isinstance(sub, Subscription)
+        with self._lock:
+            if self._streams >= self.max_streams or (threaded and self._threaded_streams >= self.max_threaded_streams):
+                self.refused += 1
+                return False
+            self._streams += 1
+            self._threaded_streams += threaded
+            self._subs.setdefault(sub.game_id, set()).add(sub)
+            return True
+
+    def unsubscribe(self, sub: Subscription | AsyncSubscription) -> None:
+        with self._lock:
+            subs = self._subs.get(sub.game_id)
+            if subs is None or sub not in subs:
+                return
+            subs.discard(sub)
+            self._streams -= 1
+            self._threaded_streams -= isinstance(sub, Subscription)
+            if not subs:
+                del self._subs[sub.game_id]
+
+    def publish(self, game_id: bytes, event: dict, to: str | None = None) -> None:
+        self.published += 1
+        self.transport.send(game_id, json.dumps({"to": to, "event": event}))
+
+    def _deliver(self, game_id: bytes, message: str) -> None:
+        with self._lock:
+            subs = list(self._subs.get(game_id, ()))
+        if not subs:
+            return
+        decoded = json.loads(message)
+        to, event = decoded["to"], decoded["event"]
+        for sub in subs:
+            if to is not None and sub.account_id != to:
+                continue
+            if sub.put(event):
+                self.delivered += 1
+
+    def subscribers(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subs.values())
+
+
+def format_sse(event: dict) -> str:
+    """Encodes an event, using the game version it produced as its id so a
+    reconnecting client can tell whether it missed anything."""
+    id = f"id: {event['version']}\n" if "version" in event else ""
+    return f"{id}event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def from_env() -> Broker:
+    return Broker(LocalTransport())
@@ -1,22 +1,89 @@
 import click
+import csv
+import dataclasses
 import flask
+import functools
+import hashlib
+import jinja2
+import json
+import logging
+import markupsafe
+import os
+import secrets
+import time
 import uuid
-import auth
+import werkzeug.http
+import cache
 import db
+import events
+import handles
 
-import typedefs
 import users
 import util
 
+log = logging.getLogger(__name__)
+
 bp = flask.Blueprint('game', __name__)
 
+# Rendered roster and log fragments kept per process
+FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", 64))
+# Where compiled templates are kept between worker starts; Jinja picks a
+# directory under the system's temp dir when unset
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR") or None
+
+def init_app(app: flask.Flask):
+    app.extensions['fragment_cache'] = cache.VersionedCache(cache.LRUBackend(FRAGMENT_CACHE_SIZE))
+    if TEMPLATE_CACHE_DIR:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+    app.jinja_env.bytecode_cache = jinja2.FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+    app.add_url_rule('/metrics/fragment-cache', view_func=db.metrics_view(fragment_cache_stats_handler))
+    app.cli.add_command(compile_templates_cmd)
+
+def fragment_cache_stats_handler():
+    return dataclasses.asdict(flask.current_app.extensions['fragment_cache'].stats())
+
+def render_fragment(template: str, game_id: uuid.UUID, version: int, role: str, **context) -> markupsafe.Markup:
+    """Renders part of the game page that only changes with the game's
+    version and the viewer's `role`, reusing the last rendering while
+    neither has changed."""
+    fragments = flask.current_app.extensions['fragment_cache']
+    key = game_id.bytes + f":{template}:{role}".encode()
+    html = fragments.get(key, version)
+    if html is None:
+        html = flask.render_template(template, **context)
+        fragments.put(key, version, html)
+    return markupsafe.Markup(html)
+
 
 def create_game(name: str) -> uuid.UUID | None:
     return db.create_game(name)
 
 @bp.get("/")
 def root_handler():
-    return flask.render_template('./index.html')
+    """The game directory in name order, a page at a time. `?status=`
+    narrows it to open, started or finished games, `?q=` searches their
+    names, listing the matches newest first, and `?after=` takes the
+    cursor of the last game on a page to get the next one."""
+    status = flask.request.args.get("status") or None
+    if status is not None and status not in db.GAME_STATUSES:
+        flask.abort(400)
+    after = None
+    if (value := flask.request.args.get("after")) is not None:
+        after = util.str_to_game_cursor(value)
+        if after is None:
+            flask.abort(400)
+    search = flask.request.args.get("q", "").strip()
+
+    page = db.get_game_directory(status, search or None, after=after)
+    if page is None:
+        flask.abort(500)
+    return flask.render_template('./index.html',
+                                 games=[(listing, util.uuid_to_str(listing.id)) for listing in page.games],
+                                 next=page.games[-1].cursor if page.more else None,
+                                 paged=after is not None,
+                                 status=status,
+                                 search=search,
+                                 statuses=db.GAME_STATUSES)
 
 @click.command('create-game')
 @click.argument('name')
@@ -37,6 +104,166 @@ def reset_game_cmd(id: str):
         return
     db.reset_game(game_id)
 
+@click.command('integrity-check')
+@click.argument('id')
+def integrity_check_cmd(id: str):
+    game_id = util.str_to_uuid(id)
+    if not game_id:
+        click.echo("Invalid game id", err=True)
+        return
+    game = db.get_game_by_id(game_id)
+    if not game:
+        click.echo("Game not found", err=True)
+        return
+    if not game.started:
+        click.echo("Game has not started")
+        return
+
+    targets = db.get_ring(game_id)
+    if targets is None:
+        click.echo("Failed to load targets", err=True)
+        return
+    problems = targets.check()
+    for problem in problems:
+        click.echo(problem, err=True)
+    if problems:
+        raise click.exceptions.Exit(1)
+    click.echo(f"OK: {len(targets)} players remain in a single ring")
+
+@click.command('game-stats')
+@click.argument('id')
+def game_stats_cmd(id: str):
+    game_id = util.str_to_uuid(id)
+    if not game_id:
+        click.echo("Invalid game id", err=True)
+        return
+    stats = db.get_game_stats(game_id)
+    if not stats:
+        click.echo("Game not found", err=True)
+        return
+
+    click.echo(f"Players: {stats.alive} alive of {stats.players}")
+    click.echo(f"Kills: {stats.kills}, forfeits: {stats.forfeits}")
+    if stats.kills_per_hour is not None:
+        click.echo(f"Kills per hour: {stats.kills_per_hour:.1f}")
+    for rank, (name, kills) in enumerate(stats.top_killers, 1):
+        click.echo(f"{rank}. {name} ({kills})")
+
+@click.command('compile-templates')
+def compile_templates_cmd():
+    """Compiles every template into the bytecode cache, so workers started
+    afterwards load them without recompiling."""
+    env = flask.current_app.jinja_env
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    click.echo(f"Compiled {len(names)} templates into {env.bytecode_cache.directory}")
+
+ROSTER_FIELDS = ("id", "name", "email")
+
+def read_roster(file, fmt: str, invalid: list[str]):
+    """Yields (id, name, email) from a CSV file with those columns or from
+    JSON lines holding those keys, one row at a time. Rows missing any of
+    them are described in `invalid` and skipped."""
+    if fmt == "csv":
+        reader = csv.DictReader(file)
+        missing = [f for f in ROSTER_FIELDS if f not in (reader.fieldnames or ())]
+        if missing:
+            raise click.BadParameter(f"the header lacks {', '.join(missing)}", param_hint="FILE")
+        for row in reader:
+            values = tuple((row[f] or "").strip() for f in ROSTER_FIELDS)
+            if all(values):
+                yield values
+            else:
+                invalid.append(f"line {reader.line_num}: missing {', '.join(f for f, v in zip(ROSTER_FIELDS, values) if not v)}")
+        return
+
+    for n, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            invalid.append(f"line {n}: not JSON")
+            continue
+        values = tuple(str(row.get(f) or "").strip() if isinstance(row, dict) else "" for f in ROSTER_FIELDS)
+        if all(values):
+            yield values
+        else:
+            invalid.append(f"line {n}: missing {', '.join(f for f, v in zip(ROSTER_FIELDS, values) if not v)}")
+
+@click.command('import-roster')
+@click.argument('file', type=click.File('r', encoding='utf-8'))
+@click.option('--game', 'game_param', help="Add the players to this game.")
+@click.option('--new-game', help="Create a game with this name and add the players to it.")
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help="Defaults to jsonl for .jsonl files, csv otherwise.")
+@click.option('--update-accounts', is_flag=True, help="Overwrite the name and email of accounts that already exist.")
+@click.option('--chunk-size', type=click.IntRange(1),
+              help="Rows written per transaction; defaults to ROSTER_IMPORT_CHUNK, or 5000.")
+def import_roster_cmd(file, game_param: str | None, new_game: str | None, fmt: str | None,
+                      update_accounts: bool, chunk_size: int | None):
+    """Imports players from FILE (- for stdin), a CSV with id, name and email
+    columns or JSON lines with those keys."""
+    if (game_param is None) == (new_game is None):
+        click.echo("Pass exactly one of --game and --new-game", err=True)
+        raise click.exceptions.Exit(2)
+    if new_game is not None:
+        game_id = create_game(new_game)
+        if not game_id:
+            click.echo("Failed to create game", err=True)
+            raise click.exceptions.Exit(1)
+        click.echo(f"Created game {util.uuid_to_str(game_id)}")
+    else:
+        game_id = util.str_to_uuid(game_param)
+        if not game_id:
+            click.echo("Invalid game id", err=True)
+            raise click.exceptions.Exit(1)
+        game = db.get_game_by_id(game_id)
+        if not game:
+            click.echo("Game not found", err=True)
+            raise click.exceptions.Exit(1)
+        if game.started:
+            click.echo("Game has already started", err=True)
+            raise click.exceptions.Exit(1)
+
+    if fmt is None:
+        fmt = "jsonl" if file.name.endswith((".jsonl", ".ndjson")) else "csv"
+    invalid: list[str] = []
+    started = time.perf_counter()
+
+    def progress(totals):
+        click.echo(f"{totals.rows} rows: {totals.players} players added, {totals.accounts} accounts written", err=True)
+
+    totals = db.import_roster(game_id, read_roster(file, fmt, invalid),
+                              chunk_size or db.IMPORT_CHUNK_SIZE, update_accounts, progress)
+    for problem in invalid:
+        click.echo(f"Skipped {problem}", err=True)
+    if totals is None:
+        click.echo("Import stopped: a write failed or the game started", err=True)
+        raise click.exceptions.Exit(1)
+    click.echo(f"Imported {totals.players} players ({totals.rows - totals.players} already in the game, "
+               f"{len(invalid)} invalid) in {time.perf_counter() - started:.1f}s")
+
+@click.command('stats-check')
+@click.argument('id', required=False)
+@click.option('--fix', is_flag=True, help="Rebuild the stats that don't match the roster and log.")
+def stats_check_cmd(id: str | None, fix: bool):
+    game_id = None
+    if id is not None:
+        game_id = util.str_to_uuid(id)
+        if not game_id:
+            click.echo("Invalid game id", err=True)
+            return
+    problems = db.check_game_stats(game_id, fix=fix)
+    if problems is None:
+        click.echo("Failed to check stats", err=True)
+        raise click.exceptions.Exit(1)
+    for problem in problems:
+        click.echo(problem, err=True)
+    if problems and not fix:
+        raise click.exceptions.Exit(1)
+    click.echo("Rebuilt the stats listed above" if problems else "OK: stats match")
+
 # @bp.post("/games")
 # def create_game_handler():
 #     game_name = flask.request.form["name"]
@@ -49,42 +276,150 @@ def reset_game_cmd(id: str):
 #
 #     return flask.redirect(f"/games/{url_id}")
 
+@functools.cache
+def _template_stamp() -> str:
+    """Identifies the deployed templates, so a redeploy invalidates ETags."""
+    folder = os.path.join(flask.current_app.root_path, flask.current_app.template_folder or "templates")
+    stamp = hashlib.sha1()
+    for name in sorted(os.listdir(folder)):
+        stamp.update(f"{name}:{os.stat(os.path.join(folder, name)).st_mtime_ns};".encode())
+    return stamp.hexdigest()[:12]
+
+def game_page_etag(game_id: uuid.UUID, version: int, account_id: str | None) -> str:
+    viewer = hashlib.sha1(f"{game_id.hex}:{account_id or ''}:{_template_stamp()}".encode())
+    return f"{version}-{viewer.hexdigest()[:16]}"
+
 @bp.get("/games/<game_id_param>")
 def get_game_handler(game_id_param: str):
     game_id = util.str_to_uuid(game_id_param)
     if not game_id:
         flask.abort(404)
-    game = db.get_game_by_id(game_id)
-    users = db.get_users_by_game(game_id)
-    if not game:
-        flask.abort(404)
-
-    token = flask.request.cookies.get("jwt_cookie")
-    account_id : str | None = None
-    user: typedefs.User | None = None
-    target: typedefs.User | None = None
-
-    if token:
-        account_id = auth.read_bearer_token(token)
-        if account_id:
-            user = db.get_user_by_id(game_id, account_id)
-            if user and user.target_user_id:
-                target = db.get_user_by_id(game_id, user.target_user_id)
 
-    print("Target: ", target)
-
-    logs = db.get_game_logs(game_id)
+    account_id: str | None = flask.g.account_id
+
+    # Pages carrying a flashed message are never answered from the client's copy
+    conditional = "_flashes" not in flask.session
+    if conditional:
+        version = db.get_game_version(game_id)
+        if not version:
+            flask.abort(404)
+        # Only the ETag says whose copy the client holds, so If-Modified-Since
+        # alone never earns a 304
+        etag = game_page_etag(game_id, version[0], account_id)
+        if not werkzeug.http.is_resource_modified(flask.request.environ, etag=etag):
+            response = flask.make_response("", 304)
+            response.set_etag(etag, weak=True)
+            response.headers["Cache-Control"] = "private, no-cache"
+            response.vary.add("Cookie")
+            return response
+
+    snapshot = db.get_game_snapshot(game_id, account_id)
+    if not snapshot:
+        flask.abort(404)
 
-    return flask.render_template('./game.html', 
+    game = snapshot.game
+    owner = bool(snapshot.user) and snapshot.user.id == game.owner
+    # Only the owner's rows carry actions; players and anonymous viewers
+    # see the same ones, and everyone sees the same log
+    handle = functools.partial(handles.player, game_id.bytes)
+    roster = render_fragment('game_roster.html', game_id, game.version, "owner" if owner else "viewer",
+                             id=game_id_param, game=game, owner=owner, users=snapshot.users, handle=handle)
+    log = render_fragment('game_log.html', game_id, game.version, "all",
+                          logs=snapshot.logs, more_logs=snapshot.more_logs)
+
+    response = flask.make_response(flask.render_template('./game.html', 
                                  id=game_id_param, 
                                  game=game,
                                  account_id=account_id,
-                                 users=users,
-                                 user=user,
-                                 target=target,
-                                 logs=logs)
+                                 user=snapshot.user,
+                                 target=snapshot.target,
+                                 handle=handle,
+                                 roster=roster,
+                                 log=log,
+                                 stats=snapshot.stats))
+    if conditional:
+        response.set_etag(game_page_etag(game_id, snapshot.game.version, account_id), weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Cookie")
+    return response
     
 
+@bp.get("/games/<game_id_param>/events")
+def game_events_handler(game_id_param: str):
+    game_id = util.str_to_uuid(game_id_param)
+    if not game_id:
+        flask.abort(404)
+    version = db.get_game_version(game_id)
+    if not version:
+        flask.abort(404)
+    # The page embeds the version it was rendered at; EventSource resends the
+    # last id it saw when reconnecting
+    seen = flask.request.headers.get("Last-Event-ID") or flask.request.args.get("v")
+
+    account_id: str | None = flask.g.account_id
+
+    broker = db.get_broker()
+    sub = broker.subscribe(game_id.bytes, account_id)
+    if sub is None:
+        # EventSource gives up on an error status, leaving the page as a
+        # plain page, which is still correct on reload
+        response = flask.Response("Too many live streams", 503)
+        response.headers["Retry-After"] = str(int(events.KEEPALIVE_SECONDS))
+        return response
+
+    def stream():
+        try:
+            yield "retry: 5000\n\n"
+            if seen is not None and seen != str(version[0]):
+                yield events.format_sse({"type": "refresh"})
+            deadline = time.monotonic() + events.STREAM_SECONDS
+            while time.monotonic() < deadline:
+                event = sub.get(timeout=events.KEEPALIVE_SECONDS)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield events.format_sse(event)
+        finally:
+            broker.unsubscribe(sub)
+
+    response = flask.Response(stream(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+@bp.get("/games/<game_id_param>/logs")
+def game_logs_handler(game_id_param: str):
+    """A page of the combat log as JSON. `?after=<cursor>` returns the entries
+    logged since the one a client last saw, and `?before=<cursor>` the page
+    preceding one, for scrolling back through long games."""
+    game_id = util.str_to_uuid(game_id_param)
+    if not game_id:
+        flask.abort(404)
+
+    cursors = {}
+    for name in ("after", "before"):
+        value = flask.request.args.get(name)
+        if value is not None:
+            cursors[name] = util.str_to_log_cursor(value)
+            if cursors[name] is None:
+                flask.abort(400)
+    if len(cursors) > 1:
+        flask.abort(400)
+    limit = flask.request.args.get("limit", db.LOG_PAGE_SIZE, type=int)
+    if not 0 < limit <= db.LOG_PAGE_MAX:
+        flask.abort(400)
+
+    page = db.get_game_logs(game_id, limit, **cursors)
+    if page is None:
+        flask.abort(404)
+
+    response = flask.jsonify({
+        "logs": [{"cursor": log.cursor, "ts": log.ts, "text": log.to_str()} for log in page.logs],
+        "more": page.more,
+    })
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
 @bp.post("/games/<game_id_param>/login")
 def login_post_handler(game_id_param: str):
     game_id = util.str_to_uuid(game_id_param)
@@ -92,10 +427,7 @@ def login_post_handler(game_id_param: str):
         flask.abort(404)
     response = flask.make_response(flask.redirect(flask.url_for('game.get_game_handler', game_id_param=game_id_param)))
 
-    token = flask.request.cookies.get("jwt_cookie")
-    account_id: str | None = None
-    if token:
-        account_id = auth.read_bearer_token(token)
+    account_id: str | None = flask.g.account_id
 
     if (not account_id):
         flask.abort(201, "Unauthorized to register")
@@ -107,119 +439,90 @@ def login_post_handler(game_id_param: str):
 
     return response
 
+def owner_only(action: str, started: bool | None = None):
+    """Resolves the game in the URL and the caller's player record with a
+    single query onto `flask.g.game` and `flask.g.user`, and turns away
+    anyone but the game's owner before the handler does any work. `started`
+    additionally requires the game to be (or not be) underway."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(game_id_param: str):
+            game_id = util.str_to_uuid(game_id_param)
+            if not game_id:
+                flask.abort(404)
+            found = db.get_game_with_member(game_id, flask.g.account_id)
+            if not found:
+                flask.abort(404)
+            game, user = found
+
+            if (not user) or user.id != game.owner or (started is not None and bool(game.started) != started):
+                log.info("game %s: %s is not allowed to %s", game_id, flask.g.account_id or "anonymous", action)
+                flask.abort(401 if flask.g.account_id is None else 403, f"Unauthorized to {action}")
+
+            flask.g.game_id, flask.g.game, flask.g.user = game_id, game, user
+            return fn(game_id_param)
+        return wrapper
+    return decorator
+
 @bp.post("/games/<game_id_param>/start")
+@owner_only("start game")
 def start_game_handler(game_id_param: str):
-    game_id = util.str_to_uuid(game_id_param)
-    if not game_id:
-        flask.abort(404)
-
-    game = db.get_game_by_id(game_id)
-    if not game:
-        flask.abort(404)
-    users = db.get_users_by_game(game_id)
-
+    game_id, game = flask.g.game_id, flask.g.game
     response = flask.make_response(flask.redirect(flask.url_for('game.get_game_handler', game_id_param=game_id_param)))
 
-    token = flask.request.cookies.get("jwt_cookie")
-    user: typedefs.User | None = None
-
-    if token:
-        user_id = auth.read_bearer_token(token)
-        if user_id:
-            user = db.get_user_by_id(game_id, user_id)
-
-    if (not user) or user.id != game.owner:
-        flask.abort(201, "Unauthorized to start game")
+    # The roster comes back in standings order, which leaves players who
+    # share a name in no fixed order, so the seed is applied to the ids
+    # sorted, letting an audit replay it
+    ids = sorted(user.id for user in db.get_users_by_game(game_id))
 
-
-    print(f"Starting game '{game.name}'...")
-    mapping = util.gen_target_maps([user.id for user in users])
-    db.set_user_targets(game_id, mapping)
+    # Log the seed so the assignment can be reproduced in an audit
+    seed = secrets.randbits(64)
+    log.info("game %s: starting %r with seed %d", game_id, game.name, seed)
+    db.set_user_targets(game_id, util.gen_target_maps(ids, seed))
 
     return response
 
 @bp.post("/games/<game_id_param>/announcement")
+@owner_only("set game announcement")
 def set_announcement_handler(game_id_param: str):
-    game_id = util.str_to_uuid(game_id_param)
-    if not game_id:
-        flask.abort(404)
-    game = db.get_game_by_id(game_id)
-    if not game:
-        flask.abort(404)
-
     msg = flask.request.form.get("msg",None,type=str)
     response = flask.make_response(flask.redirect(flask.url_for('game.get_game_handler', game_id_param=game_id_param)))
 
-    token = flask.request.cookies.get("jwt_cookie")
-    user: typedefs.User | None = None
-
-    if token:
-        user_id = auth.read_bearer_token(token)
-        if user_id:
-            user = db.get_user_by_id(game_id, user_id)
-
-    if (not user) or user.id != game.owner:
-        flask.abort(201, "Unauthorized to set game announcement")
-
-
-    db.set_game_announcement(game_id, msg)
+    db.set_game_announcement(flask.g.game_id, msg)
     return response
 
 @bp.post("/games/<game_id_param>/delete_user")
+@owner_only("remove player", started=False)
 def remove_user_handler(game_id_param: str):
-    game_id = util.str_to_uuid(game_id_param)
-    if not game_id:
-        flask.abort(404)
-
     target_user_id = flask.request.form.get("user_id","",type=str)
-    game = db.get_game_by_id(game_id)
-    if not game:
-        flask.abort(404)
-
     response = flask.make_response(flask.redirect(flask.url_for('game.get_game_handler', game_id_param=game_id_param)))
 
-    token = flask.request.cookies.get("jwt_cookie")
-    user: typedefs.User | None = None
-
-    if token:
-        user_id = auth.read_bearer_token(token)
-        if user_id:
-            user = db.get_user_by_id(game_id, user_id)
-
-    if game.started or (not user) or user.id != game.owner:
-        flask.abort(201, "Unauthorized to remove player")
-
-
-    db.remove_user(game_id, target_user_id)
+    db.remove_user(flask.g.game_id, target_user_id)
     return response
 
 @bp.post("/games/<game_id_param>/eliminate_user")
+@owner_only("eliminate player", started=True)
 def eliminate_user_target_handler(game_id_param: str):
-    game_id = util.str_to_uuid(game_id_param)
-    if not game_id:
-        flask.abort(404)
-
     target_user_id = flask.request.form.get("user_id","",type=str)
     elim_count = flask.request.form.get("elim_count",0,type=int)
-    game = db.get_game_by_id(game_id)
-    if not game:
-        flask.abort(404)
-
     response = flask.make_response(flask.redirect(flask.url_for('game.get_game_handler', game_id_param=game_id_param)))
 
-    token = flask.request.cookies.get("jwt_cookie")
-    user: typedefs.User | None = None
-
-    if token:
-        user_id = auth.read_bearer_token(token)
-        if user_id:
-            user = db.get_user_by_id(game_id, user_id)
+    db.eliminate_user(flask.g.game_id, target_user_id, elim_count)
+    return response
 
-    if (not game.started) or (not user) or user.id != game.owner:
-        user_name = user.name if user else "None"
-        print(f"User: <{user_name}> attempted to eliminate player")
-        flask.abort(201, "Unauthorized to eliminate player")
+@bp.post("/games/<game_id_param>/eliminate_users")
+@owner_only("eliminate players", started=True)
+def eliminate_users_handler(game_id_param: str):
+    # Either parallel user_id/elim_count form fields, or a single elim_count
+    # applied to every selected user_id
+    target_user_ids = flask.request.form.getlist("user_id", type=str)
+    elim_counts = flask.request.form.getlist("elim_count", type=int)
+    if len(elim_counts) == 1:
+        elim_counts = elim_counts * len(target_user_ids)
+    if len(elim_counts) != len(target_user_ids):
+        flask.abort(400)
 
+    response = flask.make_response(flask.redirect(flask.url_for('game.get_game_handler', game_id_param=game_id_param)))
 
-    db.eliminate_user(game_id, target_user_id, elim_count)
+    db.eliminate_users(flask.g.game_id, list(zip(target_user_ids, elim_counts)))
     return response
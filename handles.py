@@ -0,0 +1,57 @@
+"""Opaque stand-ins for account ids outside their owner's view.
+
+An account id is the identity provider's subject for a person, the same
+in every game, so only a game's owner is shown its players' ids. Everyone
+else tells players apart by a handle: a keyed digest of the game and the
+account id, stable within the game but unrelated between games and of no
+use for finding the account. Paging cursors that would otherwise carry an
+account id are sealed, so they can only be handed back.
+
+Both keys are derived from JWT_SECRET, so every worker agrees on them.
+"""
+import base64
+import functools
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+
+from cryptography.fernet import Fernet, InvalidToken
+
+log = logging.getLogger(__name__)
+
+# Digest bytes kept per handle; 12 base64-encode to 16 characters
+HANDLE_BYTES = 12
+
+
+@functools.cache
+def _key(purpose: bytes) -> bytes:
+    secret = os.getenv("JWT_SECRET")
+    if not secret:
+        log.error("handles: no JWT_SECRET set, so handles and cursors only hold within this process")
+        secret = secrets.token_hex(32)
+    return hmac.digest(secret.encode(), purpose, hashlib.sha256)
+
+
+def player(game_id: bytes, account_id: str) -> str:
+    """The handle everyone but the game's owner knows this player by."""
+    digest = hmac.digest(_key(b"player-handle"), game_id + account_id.encode(), hashlib.sha256)
+    return base64.urlsafe_b64encode(digest[:HANDLE_BYTES]).decode()
+
+
+@functools.cache
+def _fernet() -> Fernet:
+    return Fernet(base64.urlsafe_b64encode(_key(b"cursor")))
+
+
+def seal(value: str) -> str:
+    return _fernet().encrypt(value.encode()).decode()
+
+
+def unseal(token: str) -> str | None:
+    """Returns what `seal` was given, or None for anything it didn't make."""
+    try:
+        return _fernet().decrypt(token.encode()).decode()
+    except (InvalidToken, ValueError):
+        return None
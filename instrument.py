@@ -0,0 +1,300 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+log = logging.getLogger(__name__)
+
+SLOW_QUERY_SECONDS = float(os.getenv("DB_SLOW_QUERY_MS", 100)) / 1000
+EXPLAIN = os.getenv("DB_EXPLAIN", "1") == "1"
+
+# Statements that only delimit transactions, which aren't worth counting
+TRANSACTION_CONTROL = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+# Upper bounds of the statement latency histogram, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def is_query(statement: str) -> bool:
+    return not statement.lstrip()[:9].upper().startswith(TRANSACTION_CONTROL)
+
+
+def normalize(sql: str) -> str:
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+@dataclass(slots=True)
+class Statement:
+    sql: str
+    seconds: float = 0.0
+    rows: int = 0
+    full_scans: tuple[str, ...] = ()
+    error: bool = False
+
+
+# A virtual table handed constraints to search by, such as an FTS5 MATCH,
+# shows as a SCAN with them encoded after the index number
+_VIRTUAL_SEARCH = re.compile(r"VIRTUAL TABLE INDEX \d+:\S")
+# Query plans only depend on the statement and the schema, so they are
+# explained once per process
+_plans: dict[str, tuple[str, ...]] = {}
+_plans_lock = threading.Lock()
+
+
+def _full_scans(conn: sqlite3.Connection, sql: str, parameters: Any) -> tuple[str, ...]:
+    """Returns the tables the statement reads by scanning rather than
+    searching, according to EXPLAIN QUERY PLAN."""
+    with _plans_lock:
+        plan = _plans.get(sql)
+    if plan is not None:
+        return plan
+    try:
+        # A plain cursor, so the EXPLAIN itself isn't recorded
+        rows = conn.cursor(sqlite3.Cursor).execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+        plan = tuple(row[3] for row in rows if row[3].startswith("SCAN ") and "CONSTANT ROW" not in row[3]
+                     and not _VIRTUAL_SEARCH.search(row[3]))
+    except sqlite3.Error:
+        plan = ()
+    with _plans_lock:
+        _plans[sql] = plan
+    if plan:
+        log.warning(json.dumps({"event": "full_scan", "sql": normalize(sql), "plan": list(plan)}))
+    return plan
+
+
+class Cursor(sqlite3.Cursor):
+    """Times each statement and counts the rows fetched from it into the
+    owning connection's `statements` list, when it has one."""
+
+    _current: Statement | None = None
+
+    def _run(self, run, sql: str, parameters: Any, many: bool):
+        sink = getattr(self.connection, 'statements', None)
+        if sink is None or not is_query(sql):
+            return run(sql, parameters)
+
+        statement = Statement(sql)
+        if EXPLAIN and not many and sql.lstrip()[:6].upper().startswith(EXPLAINABLE):
+            statement.full_scans = _full_scans(self.connection, sql, parameters)
+        start = time.perf_counter()
+        try:
+            return run(sql, parameters)
+        except sqlite3.Error:
+            statement.error = True
+            raise
+        finally:
+            statement.seconds = time.perf_counter() - start
+            self._current = statement
+            sink.append(statement)
+
+    def execute(self, sql: str, parameters: Any = ()) -> 'Cursor':
+        return self._run(super().execute, sql, parameters, False)
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any]) -> 'Cursor':
+        return self._run(super().executemany, sql, seq_of_parameters, True)
+
+    def _fetched(self, start: float, rows: int) -> None:
+        if self._current is not None:
+            self._current.seconds += time.perf_counter() - start
+            self._current.rows += rows
+
+    def fetchone(self) -> Any:
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None)
+        return row
+
+    def fetchmany(self, size: int | None = None) -> list[Any]:
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetchall(self) -> list[Any]:
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        return rows
+
+    def __next__(self) -> Any:
+        start = time.perf_counter()
+        row = super().__next__()
+        self._fetched(start, 1)
+        return row
+
+
+class Connection(sqlite3.Connection):
+    """A connection whose statements are recorded while `statements` is set.
+    The pool hands these out; whoever acquires one attaches a list to
+    collect into and detaches it before releasing."""
+
+    statements: list[Statement] | None = None
+
+    def cursor(self, factory=Cursor) -> Cursor:
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = ()) -> Cursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any]) -> Cursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+@dataclass
+class EndpointQueries:
+    requests: int = 0
+    queries: int = 0
+    max_queries: int = 0
+    rows: int = 0
+    errors: int = 0
+    db_seconds: float = 0.0
+    request_seconds: float = 0.0
+
+
+@dataclass
+class StatementTotals:
+    calls: int = 0
+    rows: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    full_scans: tuple[str, ...] = ()
+
+
+@dataclass
+class Histogram:
+    counts: list[int] = field(default_factory=lambda: [0] * (len(BUCKETS) + 1))
+    total: float = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                break
+        else:
+            i = len(BUCKETS)
+        self.counts[i] += 1
+        self.total += value
+
+
+class QueryStats:
+    """Aggregates the statements each request issued on its connection, by
+    endpoint and by statement, and logs the slow ones.
+
+    Only statements run on a request's own connection are seen; writes
+    handed to the write queue run on the queue's connection.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._endpoints: dict[str, EndpointQueries] = {}
+        self._statements: dict[str, StatementTotals] = {}
+        self._latency = Histogram()
+
+    def record(self, endpoint: str, statements: list[Statement], request_seconds: float = 0.0) -> None:
+        for s in statements:
+            if s.seconds >= SLOW_QUERY_SECONDS:
+                log.warning(json.dumps({
+                    "event": "slow_query",
+                    "endpoint": endpoint,
+                    "ms": round(s.seconds * 1000, 3),
+                    "rows": s.rows,
+                    "full_scans": list(s.full_scans),
+                    "sql": normalize(s.sql),
+                }))
+
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, EndpointQueries())
+            stats.requests += 1
+            stats.queries += len(statements)
+            stats.max_queries = max(stats.max_queries, len(statements))
+            stats.request_seconds += request_seconds
+            for s in statements:
+                stats.rows += s.rows
+                stats.errors += s.error
+                stats.db_seconds += s.seconds
+                self._latency.observe(s.seconds)
+                totals = self._statements.get(s.sql)
+                if totals is None:
+                    totals = self._statements[s.sql] = StatementTotals(full_scans=s.full_scans)
+                totals.calls += 1
+                totals.rows += s.rows
+                totals.errors += s.error
+                totals.seconds += s.seconds
+
+    def snapshot(self) -> dict[str, EndpointQueries]:
+        with self._lock:
+            return {k: EndpointQueries(**v.__dict__) for k, v in self._endpoints.items()}
+
+    def prometheus(self) -> str:
+        """Renders the aggregates in the Prometheus text exposition format."""
+        with self._lock:
+            endpoints = {k: EndpointQueries(**v.__dict__) for k, v in self._endpoints.items()}
+            statements = {normalize(k): StatementTotals(**v.__dict__) for k, v in self._statements.items()}
+            latency = Histogram(list(self._latency.counts), self._latency.total)
+
+        lines: list[str] = []
+
+        def family(name: str, kind: str, help: str, samples: Iterable[tuple[str, float]]):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{labels} {value:g}" for labels, value in samples)
+
+        by_endpoint = [(f'{{endpoint="{_escape(k)}"}}', v) for k, v in sorted(endpoints.items())]
+        family("assassins_http_requests_total", "counter", "Requests served, by endpoint.",
+               ((l, v.requests) for l, v in by_endpoint))
+        family("assassins_http_request_seconds_total", "counter", "Time spent serving requests, by endpoint.",
+               ((l, v.request_seconds) for l, v in by_endpoint))
+        family("assassins_db_queries_total", "counter", "Statements executed, by endpoint.",
+               ((l, v.queries) for l, v in by_endpoint))
+        family("assassins_db_query_seconds_total", "counter", "Time spent executing and fetching statements, by endpoint.",
+               ((l, v.db_seconds) for l, v in by_endpoint))
+        family("assassins_db_rows_total", "counter", "Rows fetched, by endpoint.",
+               ((l, v.rows) for l, v in by_endpoint))
+        family("assassins_db_errors_total", "counter", "Statements that raised, by endpoint.",
+               ((l, v.errors) for l, v in by_endpoint))
+
+        by_statement = [(f'{{statement="{_escape(k)}"}}', v) for k, v in sorted(statements.items())]
+        family("assassins_db_statement_calls_total", "counter", "Executions, by statement.",
+               ((l, v.calls) for l, v in by_statement))
+        family("assassins_db_statement_seconds_total", "counter", "Time spent, by statement.",
+               ((l, v.seconds) for l, v in by_statement))
+        family("assassins_db_statement_full_scan", "gauge", "1 if the statement's query plan scans a whole table.",
+               ((l, 1 if v.full_scans else 0) for l, v in by_statement))
+
+        cumulative = 0
+        buckets = []
+        for bound, count in zip((*BUCKETS, float("inf")), latency.counts):
+            cumulative += count
+            buckets.append((f'{{le="{"+Inf" if bound == float("inf") else f"{bound:g}"}"}}', cumulative))
+        family("assassins_db_statement_duration_seconds", "histogram", "Statement latency, including fetching.", [])
+        lines.extend(f"assassins_db_statement_duration_seconds_bucket{l} {v}" for l, v in buckets)
+        lines.append(f"assassins_db_statement_duration_seconds_sum {latency.total:g}")
+        lines.append(f"assassins_db_statement_duration_seconds_count {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_gauges(prefix: str, values: dict[str, float]) -> str:
+    """Renders a stats dataclass's fields as one gauge each."""
+    lines = []
+    for name, value in values.items():
+        lines.append(f"# TYPE {prefix}_{name} gauge")
+        lines.append(f"{prefix}_{name} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def server_timing(statements: list[Statement], request_seconds: float) -> str:
+    db_seconds = sum(s.seconds for s in statements)
+    rows = sum(s.rows for s in statements)
+    return (f'db;dur={db_seconds * 1000:.3f};desc="{len(statements)} queries, {rows} rows", '
+            f'app;dur={request_seconds * 1000:.3f}')
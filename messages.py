@@ -0,0 +1,74 @@
+"""The elimination and forfeit messages, held in memory by each worker.
+
+log_messages is seed data, so rather than counting it on every elimination
+and joining it into every log read, each worker loads it once and checks
+the version that triggers keep in reference_versions at most every
+`check_seconds`. An id the worker hasn't seen, such as one picked by a
+worker that reloaded sooner, triggers a check straight away.
+"""
+import os
+import random
+import sqlite3
+import threading
+import time
+import types
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+
+
+@dataclass(frozen=True, slots=True)
+class MessageTable:
+    version: int
+    ids: tuple[int, ...]
+    # id -> (elim, forfeit)
+    by_id: Mapping[int, tuple[str, str]]
+
+    def pick(self) -> int | None:
+        return random.choice(self.ids) if self.ids else None
+
+
+# Stands in for a message deleted since it was logged
+MISSING = ("eliminated", "forfeited")
+
+
+class MessageStore:
+    def __init__(self, check_seconds: float) -> None:
+        self.check_seconds = check_seconds
+        self.loads = 0
+        self._lock = threading.Lock()
+        self._table: MessageTable | None = None
+        self._checked = 0.0
+
+    def get(self, conn: sqlite3.Connection) -> MessageTable:
+        table = self._table
+        # An empty table is likely one loaded before the seed data went in
+        if table is not None and table.ids and time.monotonic() - self._checked < self.check_seconds:
+            return table
+        with self._lock:
+            row = conn.execute("""SELECT version FROM reference_versions WHERE name = 'log_messages'""").fetchone()
+            version = row[0] if row else 0
+            if self._table is None or self._table.version != version:
+                rows = conn.execute("""SELECT id, elim, forfeit FROM log_messages ORDER BY id""").fetchall()
+                self._table = MessageTable(
+                    version=version,
+                    ids=tuple(r[0] for r in rows),
+                    by_id=types.MappingProxyType({r[0]: (r[1], r[2]) for r in rows}))
+                self.loads += 1
+            self._checked = time.monotonic()
+            return self._table
+
+    def covering(self, conn: sqlite3.Connection, ids: Iterable[int]) -> MessageTable:
+        """Returns the table, reloaded first if it lacks any of `ids`."""
+        table = self.get(conn)
+        if any(i not in table.by_id for i in ids):
+            self.invalidate()
+            table = self.get(conn)
+        return table
+
+    def invalidate(self) -> None:
+        """Makes the next lookup check the version."""
+        self._checked = float("-inf")
+
+
+def from_env() -> MessageStore:
+    return MessageStore(float(os.getenv("LOG_MESSAGES_CHECK_SECONDS", 60)))
@@ -0,0 +1,284 @@
+import importlib.util
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import writer
+
+MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.(sql|py)$")
+
+Echo = Callable[[str], None]
+
+
+@dataclass
+class MigrateConfig:
+    batch_size: int = 5000
+    pause: float = 0.1
+
+    @classmethod
+    def from_env(cls) -> 'MigrateConfig':
+        default = cls()
+        return cls(
+            batch_size=int(os.getenv("DB_MIGRATE_BATCH", default.batch_size)),
+            pause=float(os.getenv("DB_MIGRATE_PAUSE", default.pause)))
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: str
+
+    @property
+    def kind(self) -> str:
+        return os.path.splitext(self.path)[1][1:]
+
+
+@dataclass(frozen=True)
+class Copy:
+    """Copies `source` into `target`. `columns` maps each target column to an
+    SQL expression over the source row, written with `{row}` standing for
+    the row (e.g. "{row}.rowid"), and `key` names the target columns that
+    identify a copied row."""
+    source: str
+    target: str
+    columns: dict[str, str]
+    key: tuple[str, ...]
+
+    def values(self, row: str) -> str:
+        return ", ".join(expr.format(row=row) for expr in self.columns.values())
+
+    def match(self, row: str) -> str:
+        return " AND ".join(f"{k} = {self.columns[k].format(row=row)}" for k in self.key)
+
+
+def discover(folder: str) -> list[Migration]:
+    migrations = []
+    for name in os.listdir(folder):
+        match = MIGRATION_FILE.match(name)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(folder, name)))
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"duplicate migration numbers in {folder}")
+    return migrations
+
+
+def applied_versions(conn: sqlite3.Connection) -> set[int]:
+    """Returns the versions recorded in schema_version, creating the table
+    first if needed. Databases made before migrations were tracked are
+    adopted at the version their layout matches."""
+    exists = conn.execute("""
+        SELECT 1 FROM sqlite_schema WHERE type = 'table' AND name = 'schema_version'""").fetchone()
+    if not exists:
+        has_games = conn.execute("""
+            SELECT 1 FROM sqlite_schema WHERE type = 'table' AND name = 'games'""").fetchone()
+        # The old schema.sql and the shell-applied 0001 stamped user_version = 1
+        user_version = conn.execute("PRAGMA user_version").fetchone()[0]
+        adopted = [] if not has_games else [0, 1] if user_version >= 1 else [0]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("""
+                CREATE TABLE schema_version (
+                  version INTEGER PRIMARY KEY,
+                  name TEXT NOT NULL,
+                  applied_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+                )""")
+            conn.executemany("""INSERT INTO schema_version (version, name) VALUES (?, 'adopted')""",
+                             [(v,) for v in adopted])
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return {row[0] for row in conn.execute("""SELECT version FROM schema_version""")}
+
+
+def pending(conn: sqlite3.Connection, folder: str) -> list[Migration]:
+    applied = applied_versions(conn)
+    return [m for m in discover(folder) if m.version not in applied]
+
+
+class Context:
+    """What a Python migration gets to work with.
+
+    Each `execute` is its own short transaction, and `backfill` copies in
+    batches of `batch_size` rows with a pause between them, so the app's
+    writers are never locked out for long. `finish` runs the final swap and
+    records the migration in one transaction.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, migration: Migration, config: MigrateConfig, echo: Echo) -> None:
+        self.conn = conn
+        self.migration = migration
+        self.config = config
+        self.echo = echo
+        self.finished = False
+        self._copies: list[Copy] = []
+        self._writer = writer.WriterConfig(retries=50, max_backoff=1.0)
+
+    def execute(self, script: str) -> None:
+        writer.run(self.conn, lambda db: _run_script(db, script), self._writer)
+
+    def backfill(self, copy: Copy) -> int:
+        """Copies `copy.source` into `copy.target` batch by batch. Triggers
+        mirror any write to the source into the target while the copy runs,
+        and stay until `finish` drops the source."""
+        columns = ", ".join(copy.columns)
+        self.execute(f"""
+            DROP TRIGGER IF EXISTS {copy.target}_mirror_insert;
+            DROP TRIGGER IF EXISTS {copy.target}_mirror_update;
+            DROP TRIGGER IF EXISTS {copy.target}_mirror_delete;
+            CREATE TRIGGER {copy.target}_mirror_insert AFTER INSERT ON {copy.source}
+            BEGIN
+              INSERT OR REPLACE INTO {copy.target} ({columns}) VALUES ({copy.values("new")});
+            END;
+            CREATE TRIGGER {copy.target}_mirror_update AFTER UPDATE ON {copy.source}
+            BEGIN
+              DELETE FROM {copy.target} WHERE {copy.match("old")};
+              INSERT OR REPLACE INTO {copy.target} ({columns}) VALUES ({copy.values("new")});
+            END;
+            CREATE TRIGGER {copy.target}_mirror_delete AFTER DELETE ON {copy.source}
+            BEGIN
+              DELETE FROM {copy.target} WHERE {copy.match("old")};
+            END;""")
+        self._copies.append(copy)
+
+        # Rows added after this point are already mirrored, so the copy
+        # doesn't chase the app's inserts
+        end = self.conn.execute(f"""SELECT max(rowid) FROM {copy.source}""").fetchone()[0] or 0
+        last, copied = 0, 0
+        start = time.monotonic()
+        while last < end:
+            upper = self.conn.execute(f"""
+                SELECT max(rowid) FROM (
+                  SELECT rowid FROM {copy.source} WHERE rowid > ? AND rowid <= ? ORDER BY rowid LIMIT ?)""",
+                                      (last, end, self.config.batch_size)).fetchone()[0]
+            if upper is None:
+                break
+
+            def batch(db: sqlite3.Connection, lower=last, upper=upper) -> int:
+                return db.execute(f"""
+                    INSERT OR IGNORE INTO {copy.target} ({columns})
+                    SELECT {copy.values("src")} FROM {copy.source} AS src
+                    WHERE src.rowid > ? AND src.rowid <= ?""",
+                                  (lower, upper)).rowcount
+
+            copied += writer.run(self.conn, batch, self._writer)
+            last = upper
+            time.sleep(self.config.pause)
+        self.echo(f"  copied {copied} rows from {copy.source} in {time.monotonic() - start:.1f}s")
+        return copied
+
+    def finish(self, script: str) -> None:
+        """Checks every backfill caught up, drops the mirroring triggers and
+        runs `script`, recording the migration in the same transaction."""
+        # Checked in one read snapshot rather than under the write lock: once
+        # every target matches its source there, the triggers keep it so
+        self.conn.execute("BEGIN")
+        try:
+            for copy in self._copies:
+                source = self.conn.execute(f"""SELECT count(*) FROM {copy.source}""").fetchone()[0]
+                target = self.conn.execute(f"""SELECT count(*) FROM {copy.target}""").fetchone()[0]
+                if source != target:
+                    raise sqlite3.IntegrityError(
+                        f"{copy.target} has {target} rows but {copy.source} has {source}")
+                if self.conn.execute(f"""PRAGMA foreign_key_check({copy.target})""").fetchone():
+                    raise sqlite3.IntegrityError(f"broken foreign keys in {copy.target}")
+        finally:
+            self.conn.rollback()
+
+        def swap(db: sqlite3.Connection):
+            for copy in self._copies:
+                for op in ("insert", "update", "delete"):
+                    db.execute(f"""DROP TRIGGER {copy.target}_mirror_{op}""")
+            _run_script(db, script)
+            _record(db, self.migration)
+
+        # Dropped tables' contents live on in their replacements, so there's
+        # no point zeroing every page they free, which otherwise writes the
+        # whole of each through the WAL while writers wait
+        secure_delete = self.conn.execute("PRAGMA secure_delete").fetchone()[0]
+        self.conn.execute("PRAGMA secure_delete = FAST")
+        start = time.monotonic()
+        try:
+            writer.run(self.conn, swap, self._writer)
+        finally:
+            self.conn.execute(f"PRAGMA secure_delete = {('OFF', 'ON', 'FAST')[secure_delete]}")
+        self.echo(f"  swapped in {time.monotonic() - start:.2f}s")
+        self.finished = True
+
+
+def _run_script(db: sqlite3.Connection, script: str) -> None:
+    """Runs each statement of `script` in the current transaction, which
+    executescript would commit."""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            if statement.strip():
+                db.execute(statement)
+            statement = ""
+    if any(line.strip() and not line.lstrip().startswith("--") for line in statement.splitlines()):
+        db.execute(statement)
+
+
+def _check_foreign_keys(db: sqlite3.Connection, migration: Migration) -> None:
+    problems = db.execute("PRAGMA foreign_key_check").fetchall()
+    if problems:
+        raise sqlite3.IntegrityError(f"{len(problems)} broken foreign keys after {migration.name}")
+
+
+def _record(db: sqlite3.Connection, migration: Migration) -> None:
+    db.execute("""INSERT INTO schema_version (version, name) VALUES (?, ?)""",
+               (migration.version, migration.name))
+
+
+def apply(conn: sqlite3.Connection, migration: Migration, config: MigrateConfig, echo: Echo) -> None:
+    if migration.kind == "sql":
+        with open(migration.path) as f:
+            script = f.read()
+
+        def run(db: sqlite3.Connection):
+            _run_script(db, script)
+            _check_foreign_keys(db, migration)
+            _record(db, migration)
+
+        writer.run(conn, run, writer.WriterConfig(retries=50, max_backoff=1.0))
+        return
+
+    spec = importlib.util.spec_from_file_location(f"migrations.m{migration.version:04d}", migration.path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    context = Context(conn, migration, config, echo)
+    module.upgrade(context)
+    if not context.finished:
+        context.finish("")
+
+
+def upgrade(conn: sqlite3.Connection, folder: str, config: MigrateConfig, echo: Echo = print) -> list[Migration]:
+    """Applies every pending migration in order. Each is all-or-nothing:
+    SQL migrations run in one transaction, and Python ones only record
+    themselves in their final swap.
+
+    Foreign keys are switched off on `conn` meanwhile, since rebuilding a
+    table means briefly dropping what others reference; foreign_key_check
+    has to pass over the result before a migration is recorded.
+    """
+    todo = pending(conn, folder)
+    if not todo:
+        return []
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for migration in todo:
+            echo(f"Applying {migration.version:04d}_{migration.name}")
+            start = time.monotonic()
+            apply(conn, migration, config, echo)
+            echo(f"  done in {time.monotonic() - start:.1f}s")
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {int(foreign_keys)}")
+    return todo
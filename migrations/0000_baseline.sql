@@ -1,27 +1,26 @@
-DROP TABLE IF EXISTS logs;
-DROP TABLE IF EXISTS log_messages;
-DROP TABLE IF EXISTS users;
-DROP TABLE IF EXISTS accounts;
-DROP TABLE IF EXISTS games;
+-- The schema as it stood before migrations were versioned. Databases
+-- created by `flask init-db` up to this point already match it.
 
-CREATE TABLE games (
+CREATE TABLE IF NOT EXISTS games (
   uuid BLOB(16) PRIMARY KEY,
   name TEXT NOT NULL,
   owner_id TEXT,
   started INTEGER NOT NULL DEFAULT 0,
   announcement TEXT,
+  version INTEGER NOT NULL DEFAULT 0,
+  updated_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
 
   FOREIGN KEY(owner_id) REFERENCES users(account_id) ON DELETE SET NULL,
   FOREIGN KEY(uuid, owner_id) REFERENCES users(game_id, account_id)
 );
 
-CREATE TABLE accounts (
+CREATE TABLE IF NOT EXISTS accounts (
   id TEXT PRIMARY KEY,
   name TEXT NOT NULL,
   email TEXT NOT NULL
 );
 
-CREATE TABLE users (
+CREATE TABLE IF NOT EXISTS users (
   account_id TEXT PRIMARY KEY,
   game_id BLOB(16) NOT NULL,
 
@@ -36,13 +35,13 @@ CREATE TABLE users (
   FOREIGN KEY(game_id, target_user_id) REFERENCES users(game_id, account_id)
 );
 
-CREATE TABLE log_messages (
+CREATE TABLE IF NOT EXISTS log_messages (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   elim TEXT NOT NULL,
   forfeit TEXT NOT NULL
 );
 
-CREATE TABLE logs (
+CREATE TABLE IF NOT EXISTS logs (
   game_id BLOB(16) NOT NULL,
   user_id TEXT,
   target_id TEXT NOT NULL,
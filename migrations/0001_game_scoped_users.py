@@ -0,0 +1,133 @@
+"""Keys players by (game_id, account_id) so an account can join more than
+one game, stores users and accounts WITHOUT ROWID, adds a covering roster
+index and orders logs by an integer timestamp through a (game_id, ts) index.
+
+SQLite can't alter keys in place, so every table but log_messages is
+rebuilt under a new name and backfilled in batches while the app keeps
+writing to the old one; the swap at the end is a single short transaction.
+"""
+import migrate
+
+EPOCH = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+TABLES = """
+DROP TABLE IF EXISTS games_new;
+DROP TABLE IF EXISTS accounts_new;
+DROP TABLE IF EXISTS users_new;
+DROP TABLE IF EXISTS logs_new;
+
+CREATE TABLE games_new (
+  uuid BLOB(16) PRIMARY KEY,
+  name TEXT NOT NULL,
+  owner_id TEXT,
+  started INTEGER NOT NULL DEFAULT 0,
+  announcement TEXT,
+  version INTEGER NOT NULL DEFAULT 0,
+  updated_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+
+  FOREIGN KEY(uuid, owner_id) REFERENCES users(game_id, account_id)
+);
+
+CREATE TABLE accounts_new (
+  id TEXT PRIMARY KEY,
+  name TEXT NOT NULL,
+  email TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE users_new (
+  game_id BLOB(16) NOT NULL,
+  account_id TEXT NOT NULL,
+
+  target_user_id TEXT,
+  eliminated INTEGER NOT NULL DEFAULT 0,
+  elimination_count INTEGER NOT NULL DEFAULT 0,
+
+  PRIMARY KEY (game_id, account_id),
+  UNIQUE (game_id, target_user_id),
+  FOREIGN KEY(account_id) REFERENCES accounts(id) ON DELETE CASCADE,
+  FOREIGN KEY(game_id) REFERENCES games(uuid) ON DELETE CASCADE,
+  FOREIGN KEY(game_id, target_user_id) REFERENCES users(game_id, account_id)
+) WITHOUT ROWID;
+
+-- Covers the roster query: rows come back already ordered by standing, and
+-- only the name sort within a standing needs the accounts join
+CREATE INDEX users_roster ON users_new (game_id, eliminated, elimination_count DESC, target_user_id);
+
+CREATE TABLE logs_new (
+  id INTEGER PRIMARY KEY,
+  game_id BLOB(16) NOT NULL,
+  user_id TEXT,
+  target_id TEXT NOT NULL,
+  msg_id INTEGER NOT NULL,
+  ts INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+
+  UNIQUE(game_id, target_id),
+  FOREIGN KEY(game_id) REFERENCES games(uuid) ON DELETE CASCADE,
+  FOREIGN KEY(game_id, user_id) REFERENCES users(game_id, account_id) ON DELETE CASCADE,
+  FOREIGN KEY(game_id, target_id) REFERENCES users(game_id, account_id) ON DELETE CASCADE,
+  FOREIGN KEY(msg_id) REFERENCES log_messages(id)
+);
+
+CREATE INDEX logs_game_ts ON logs_new (game_id, ts);
+"""
+
+SWAP = """
+DROP TABLE logs;
+DROP TABLE users;
+DROP TABLE accounts;
+DROP TABLE games;
+ALTER TABLE games_new RENAME TO games;
+ALTER TABLE accounts_new RENAME TO accounts;
+ALTER TABLE users_new RENAME TO users;
+ALTER TABLE logs_new RENAME TO logs;
+
+-- The owner's player row can't null games.owner_id through a composite key
+-- without also nulling the game's uuid, so do it by hand
+CREATE TRIGGER users_owner_left AFTER DELETE ON users
+BEGIN
+  UPDATE games SET owner_id = NULL WHERE uuid = old.game_id AND owner_id = old.account_id;
+END;
+"""
+
+
+def upgrade(m: migrate.Context) -> None:
+    m.execute(TABLES)
+
+    columns = {row[0] for row in m.conn.execute("""SELECT name FROM pragma_table_info('games')""")}
+    # Versions restart above anything cached under the old ones
+    version = f"{EPOCH} + {{row}}.version" if "version" in columns else EPOCH
+    updated_at = "{row}.updated_at" if "updated_at" in columns else EPOCH
+
+    m.backfill(migrate.Copy("games", "games_new", {
+        "uuid": "{row}.uuid",
+        "name": "{row}.name",
+        "owner_id": "{row}.owner_id",
+        "started": "{row}.started",
+        "announcement": "{row}.announcement",
+        "version": version,
+        "updated_at": updated_at,
+    }, key=("uuid",)))
+    m.backfill(migrate.Copy("accounts", "accounts_new", {
+        "id": "{row}.id",
+        "name": "{row}.name",
+        "email": "{row}.email",
+    }, key=("id",)))
+    m.backfill(migrate.Copy("users", "users_new", {
+        "game_id": "{row}.game_id",
+        "account_id": "{row}.account_id",
+        "target_user_id": "{row}.target_user_id",
+        "eliminated": "{row}.eliminated",
+        "elimination_count": "{row}.elimination_count",
+    }, key=("game_id", "account_id")))
+    # Keeping the old rowids as ids preserves the order entries were written
+    # in, which breaks ties between entries logged in the same second
+    m.backfill(migrate.Copy("logs", "logs_new", {
+        "id": "{row}.rowid",
+        "game_id": "{row}.game_id",
+        "user_id": "{row}.user_id",
+        "target_id": "{row}.target_id",
+        "msg_id": "{row}.msg_id",
+        "ts": "CAST(strftime('%s', {row}.ts) AS INTEGER)",
+    }, key=("id",)))
+
+    m.finish(SWAP)
@@ -0,0 +1,30 @@
+-- Per-game counters, kept up to date by the same writes that change them
+-- so the page never has to aggregate the roster or the log.
+
+CREATE TABLE game_stats (
+  game_id BLOB(16) PRIMARY KEY,
+  players INTEGER NOT NULL DEFAULT 0,
+  alive INTEGER NOT NULL DEFAULT 0,
+  kills INTEGER NOT NULL DEFAULT 0,
+  forfeits INTEGER NOT NULL DEFAULT 0,
+  started_at INTEGER,
+  last_elimination_at INTEGER,
+
+  FOREIGN KEY(game_id) REFERENCES games(uuid) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+-- Top killers, read straight off the index
+CREATE INDEX users_kills ON users (game_id, elimination_count DESC);
+
+-- Games already underway get their first log entry as their start, for
+-- want of anything better
+INSERT INTO game_stats (game_id, players, alive, kills, forfeits, started_at, last_elimination_at)
+SELECT
+  games.uuid,
+  (SELECT count(*) FROM users WHERE users.game_id = games.uuid),
+  (SELECT count(*) FROM users WHERE users.game_id = games.uuid AND NOT users.eliminated),
+  (SELECT coalesce(sum(users.elimination_count), 0) FROM users WHERE users.game_id = games.uuid),
+  (SELECT count(*) FROM logs WHERE logs.game_id = games.uuid AND logs.user_id IS NULL),
+  iif(games.started, coalesce((SELECT min(logs.ts) FROM logs WHERE logs.game_id = games.uuid), games.updated_at), NULL),
+  (SELECT max(logs.ts) FROM logs WHERE logs.game_id = games.uuid)
+FROM games;
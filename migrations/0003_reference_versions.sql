@@ -0,0 +1,22 @@
+-- A counter per table of reference data, bumped by any change to it, so
+-- workers holding the table in memory can tell when to reload it with a
+-- primary key lookup.
+
+CREATE TABLE reference_versions (
+  name TEXT PRIMARY KEY,
+  version INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+INSERT INTO reference_versions (name) VALUES ('log_messages');
+
+CREATE TRIGGER log_messages_inserted AFTER INSERT ON log_messages BEGIN
+  UPDATE reference_versions SET version = version + 1 WHERE name = 'log_messages';
+END;
+
+CREATE TRIGGER log_messages_updated AFTER UPDATE ON log_messages BEGIN
+  UPDATE reference_versions SET version = version + 1 WHERE name = 'log_messages';
+END;
+
+CREATE TRIGGER log_messages_deleted AFTER DELETE ON log_messages BEGIN
+  UPDATE reference_versions SET version = version + 1 WHERE name = 'log_messages';
+END;
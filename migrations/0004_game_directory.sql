@@ -0,0 +1,61 @@
+-- The game directory: games listed by name a page at a time, filtered by
+-- where they stand and searched by name.
+
+-- Where each game stands, kept by triggers so the directory can filter on
+-- it straight off an index: 'open' while taking sign-ups, 'started' once
+-- the ring is assigned, and 'finished' when at most one player is left.
+ALTER TABLE games ADD COLUMN status TEXT NOT NULL DEFAULT 'open';
+
+UPDATE games SET status = CASE
+  WHEN NOT started THEN 'open'
+  WHEN (SELECT alive FROM game_stats WHERE game_stats.game_id = games.uuid) <= 1 THEN 'finished'
+  ELSE 'started'
+END;
+
+CREATE TRIGGER games_status_started AFTER UPDATE OF started ON games BEGIN
+  UPDATE games SET status = CASE
+    WHEN NOT NEW.started THEN 'open'
+    WHEN (SELECT alive FROM game_stats WHERE game_stats.game_id = NEW.uuid) <= 1 THEN 'finished'
+    ELSE 'started'
+  END
+  WHERE uuid = NEW.uuid;
+END;
+
+-- Every elimination touches alive, so only crossing the line costs a write
+CREATE TRIGGER games_status_alive AFTER UPDATE OF alive ON game_stats
+WHEN (NEW.alive <= 1) != (OLD.alive <= 1) BEGIN
+  UPDATE games SET status = iif(NEW.alive <= 1, 'finished', 'started')
+  WHERE uuid = NEW.game_id AND started;
+END;
+
+-- Keyset pagination seeks these to a (name, uuid) cursor, the whole
+-- directory and each status alike
+CREATE INDEX games_name ON games (name, uuid);
+CREATE INDEX games_status_name ON games (status, name, uuid);
+
+-- Name search. The index holds only tokens and reads names from games by
+-- rowid. That is games' implicit rowid, which VACUUM may renumber since
+-- games has no INTEGER PRIMARY KEY; 0005 keys the index on games.seq, an
+-- explicit one, instead.
+CREATE VIRTUAL TABLE games_fts USING fts5 (
+  name,
+  content = 'games',
+  content_rowid = 'rowid',
+  tokenize = 'unicode61 remove_diacritics 2',
+  prefix = '2 3'
+);
+
+INSERT INTO games_fts (games_fts) VALUES ('rebuild');
+
+CREATE TRIGGER games_fts_inserted AFTER INSERT ON games BEGIN
+  INSERT INTO games_fts (rowid, name) VALUES (NEW.rowid, NEW.name);
+END;
+
+CREATE TRIGGER games_fts_deleted AFTER DELETE ON games BEGIN
+  INSERT INTO games_fts (games_fts, rowid, name) VALUES ('delete', OLD.rowid, OLD.name);
+END;
+
+CREATE TRIGGER games_fts_renamed AFTER UPDATE OF name ON games BEGIN
+  INSERT INTO games_fts (games_fts, rowid, name) VALUES ('delete', OLD.rowid, OLD.name);
+  INSERT INTO games_fts (rowid, name) VALUES (NEW.rowid, NEW.name);
+END;
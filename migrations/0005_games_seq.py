@@ -0,0 +1,111 @@
+"""Gives games an explicit INTEGER PRIMARY KEY, `seq`, for games_fts to
+find names by.
+
+games_fts is an external-content index that reads each name from games by
+the rowid it was indexed under. 0004 left that the implicit rowid games
+only has because its uuid primary key is a BLOB, which SQLite doesn't
+promise to keep: VACUUM may renumber it, leaving the index pointing at
+other games' names. A column declared INTEGER PRIMARY KEY is the rowid
+under a name, so nothing renumbers it, and games_fts's content_rowid of
+'rowid' now means seq.
+
+Adding the key means rebuilding games, so it is backfilled in batches like
+0001's tables, keeping each game's rowid as its seq. The index therefore
+still holds, and is only checked against games before the swap; a database
+vacuumed since 0004 fails the check and has it rebuilt there, a single
+statement that takes the write lock for some seconds per million games.
+"""
+import sqlite3
+
+import migrate
+
+TABLES = """
+DROP TABLE IF EXISTS games_new;
+
+CREATE TABLE games_new (
+  seq INTEGER PRIMARY KEY,
+  uuid BLOB(16) NOT NULL UNIQUE,
+  name TEXT NOT NULL,
+  owner_id TEXT,
+  started INTEGER NOT NULL DEFAULT 0,
+  announcement TEXT,
+  version INTEGER NOT NULL DEFAULT 0,
+  updated_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+  status TEXT NOT NULL DEFAULT 'open',
+
+  FOREIGN KEY(uuid, owner_id) REFERENCES users(game_id, account_id)
+);
+"""
+
+# Dropping games takes its indexes and triggers with it, so 0004's are
+# made again, those keeping games_fts now naming seq. The triggers on
+# users and game_stats that write to games are dropped and remade around
+# the rename, which can't rewrite triggers naming a table missing just then
+SWAP = """
+DROP TRIGGER users_owner_left;
+DROP TRIGGER games_status_alive;
+DROP TABLE games;
+ALTER TABLE games_new RENAME TO games;
+
+CREATE TRIGGER users_owner_left AFTER DELETE ON users
+BEGIN
+  UPDATE games SET owner_id = NULL WHERE uuid = old.game_id AND owner_id = old.account_id;
+END;
+
+CREATE TRIGGER games_status_started AFTER UPDATE OF started ON games BEGIN
+  UPDATE games SET status = CASE
+    WHEN NOT NEW.started THEN 'open'
+    WHEN (SELECT alive FROM game_stats WHERE game_stats.game_id = NEW.uuid) <= 1 THEN 'finished'
+    ELSE 'started'
+  END
+  WHERE seq = NEW.seq;
+END;
+
+CREATE TRIGGER games_status_alive AFTER UPDATE OF alive ON game_stats
+WHEN (NEW.alive <= 1) != (OLD.alive <= 1) BEGIN
+  UPDATE games SET status = iif(NEW.alive <= 1, 'finished', 'started')
+  WHERE uuid = NEW.game_id AND started;
+END;
+
+CREATE INDEX games_name ON games (name, uuid);
+CREATE INDEX games_status_name ON games (status, name, uuid);
+
+CREATE TRIGGER games_fts_inserted AFTER INSERT ON games BEGIN
+  INSERT INTO games_fts (rowid, name) VALUES (NEW.seq, NEW.name);
+END;
+
+CREATE TRIGGER games_fts_deleted AFTER DELETE ON games BEGIN
+  INSERT INTO games_fts (games_fts, rowid, name) VALUES ('delete', OLD.seq, OLD.name);
+END;
+
+CREATE TRIGGER games_fts_renamed AFTER UPDATE OF name ON games BEGIN
+  INSERT INTO games_fts (games_fts, rowid, name) VALUES ('delete', OLD.seq, OLD.name);
+  INSERT INTO games_fts (rowid, name) VALUES (NEW.seq, NEW.name);
+END;
+"""
+
+
+def upgrade(m: migrate.Context) -> None:
+    m.execute(TABLES)
+
+    m.backfill(migrate.Copy("games", "games_new", {
+        "seq": "{row}.rowid",
+        "uuid": "{row}.uuid",
+        "name": "{row}.name",
+        "owner_id": "{row}.owner_id",
+        "started": "{row}.started",
+        "announcement": "{row}.announcement",
+        "version": "{row}.version",
+        "updated_at": "{row}.updated_at",
+        "status": "{row}.status",
+    }, key=("uuid",)))
+
+    # Checked against games' rowids, which seq copies; the triggers keep the
+    # index up to date from here to the swap
+    try:
+        m.execute("""INSERT INTO games_fts (games_fts, rank) VALUES ('integrity-check', 1)""")
+    except sqlite3.DatabaseError:
+        m.echo("  games_fts doesn't match games, rebuilding it")
+        m.execute("""INSERT INTO games_fts (games_fts) VALUES ('rebuild')""")
+
+    m.finish(SWAP)
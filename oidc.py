@@ -0,0 +1,161 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Generic, TypeVar
+
+import jwt.algorithms
+import requests
+import requests.adapters
+
+T = TypeVar('T')
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TTL = float(os.getenv("OIDC_CACHE_TTL", 3600))
+DEFAULT_STALE = float(os.getenv("OIDC_CACHE_STALE", 300))
+MIN_REFETCH_INTERVAL = float(os.getenv("OIDC_JWKS_MIN_REFETCH", 30))
+HTTP_TIMEOUT = float(os.getenv("OIDC_HTTP_TIMEOUT", 5))
+
+# One keep-alive connection pool for every call to the identity provider
+session = requests.Session()
+_adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32)
+session.mount("https://", _adapter)
+session.mount("http://", _adapter)
+
+
+def parse_cache_control(header: str | None) -> tuple[float | None, float | None]:
+    """Returns (max-age, stale-while-revalidate) from a Cache-Control header.
+    no-store and no-cache count as a max-age of zero."""
+    max_age: float | None = None
+    stale: float | None = None
+    for directive in (header or "").split(","):
+        name, _, value = directive.strip().partition("=")
+        name = name.lower()
+        try:
+            if name == "max-age":
+                max_age = float(value.strip('"'))
+            elif name == "stale-while-revalidate":
+                stale = float(value.strip('"'))
+        except ValueError:
+            continue
+        if name in ("no-store", "no-cache"):
+            max_age = 0
+    return max_age, stale
+
+
+class CachedDocument(Generic[T]):
+    """A JSON document fetched over HTTP and kept for as long as the
+    response's Cache-Control allows.
+
+    Once expired, the old value keeps being served for the
+    stale-while-revalidate window while a background thread refetches it.
+    Concurrent misses share one fetch, and a failed refresh falls back to the
+    last good value rather than failing the request.
+    """
+
+    def __init__(self, url: Callable[[], str], parse: Callable[[Any], T]) -> None:
+        self.url = url
+        self.parse = parse
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._value: T | None = None
+        self._expires = 0.0
+        self._stale_until = 0.0
+        self._generation = 0
+        self._refreshing = False
+        self.fetches = 0
+        self.errors = 0
+
+    def get(self) -> T:
+        now = time.monotonic()
+        with self._lock:
+            value = self._value
+            if value is not None and now < self._expires:
+                return value
+            serve_stale = value is not None and now < self._stale_until
+            if serve_stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh_in_background, daemon=True).start()
+        if serve_stale:
+            return value
+        return self.refresh()
+
+    def refresh(self, after: int | None = None) -> T:
+        """Fetches the document now, unless another thread finished fetching
+        it while this one waited (or since generation `after`)."""
+        generation = self._generation if after is None else after
+        with self._fetch_lock:
+            if self._generation != generation and self._value is not None:
+                return self._value
+            try:
+                response = session.get(self.url(), timeout=HTTP_TIMEOUT)
+                response.raise_for_status()
+                value = self.parse(response.json())
+            except (requests.RequestException, ValueError, KeyError) as e:
+                self.errors += 1
+                if self._value is None:
+                    raise
+                log.warning("oidc: refreshing %s failed, serving the cached copy: %s", self.url(), e)
+                return self._value
+
+            max_age, stale = parse_cache_control(response.headers.get("Cache-Control"))
+            max_age = DEFAULT_TTL if max_age is None else max_age
+            stale = DEFAULT_STALE if stale is None else stale
+            now = time.monotonic()
+            with self._lock:
+                self.fetches += 1
+                self._value = value
+                self._expires = now + max_age
+                self._stale_until = now + max_age + stale
+                self._generation += 1
+            return value
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            log.warning("oidc: background refresh of %s failed: %s", self.url(), e)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+
+def parse_jwks(document: dict) -> dict[str, Any]:
+    """Parses a JWKS document into RSA public keys indexed by kid."""
+    return {
+        key["kid"]: jwt.algorithms.RSAAlgorithm.from_jwk(key)
+        for key in document["keys"]
+        if key.get("kty") == "RSA" and "kid" in key
+    }
+
+
+class KeySet:
+    """The identity provider's signing keys, parsed once and indexed by kid.
+
+    A token signed with a kid we haven't seen triggers a refetch, in case the
+    provider rotated its keys, but at most once every MIN_REFETCH_INTERVAL
+    seconds so forged kids can't be used to hammer the provider.
+    """
+
+    def __init__(self, url: Callable[[], str]) -> None:
+        self.document: CachedDocument[dict[str, Any]] = CachedDocument(url, parse_jwks)
+        self._lock = threading.Lock()
+        self._last_forced = float("-inf")
+
+    def get(self, kid: str) -> Any | None:
+        generation = self.document.generation
+        key = self.document.get().get(kid)
+        if key is not None:
+            return key
+
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_forced < MIN_REFETCH_INTERVAL:
+                return None
+            self._last_forced = now
+        return self.document.refresh(after=generation).get(kid)
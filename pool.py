@@ -0,0 +1,180 @@
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, asdict
+
+import instrument
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    pass
+
+
+@dataclass
+class PoolConfig:
+    path: str = './data/db.sqlite'
+    max_size: int = 8
+    min_size: int = 2
+    acquire_timeout: float = 5.0
+    busy_timeout_ms: int = 5000
+    cache_size_kib: int = 16384
+    mmap_size: int = 256 * 1024 * 1024
+    instrument: bool = True
+
+    @classmethod
+    def from_env(cls) -> 'PoolConfig':
+        default = cls()
+        return cls(
+            path=os.getenv("DB_PATH", default.path),
+            max_size=int(os.getenv("DB_POOL_SIZE", default.max_size)),
+            min_size=int(os.getenv("DB_POOL_MIN", default.min_size)),
+            acquire_timeout=float(os.getenv("DB_POOL_TIMEOUT", default.acquire_timeout)),
+            busy_timeout_ms=int(os.getenv("DB_BUSY_TIMEOUT_MS", default.busy_timeout_ms)),
+            cache_size_kib=int(os.getenv("DB_CACHE_SIZE_KIB", default.cache_size_kib)),
+            mmap_size=int(os.getenv("DB_MMAP_SIZE", default.mmap_size)),
+            instrument=os.getenv("DB_INSTRUMENT", "1") == "1")
+
+
+@dataclass
+class PoolStats:
+    size: int = 0
+    idle: int = 0
+    in_use: int = 0
+    acquired: int = 0
+    hits: int = 0
+    misses: int = 0
+    waits: int = 0
+    wait_seconds: float = 0.0
+    timeouts: int = 0
+
+
+class ConnectionPool:
+    """A bounded pool of configured SQLite connections.
+
+    Connections are opened lazily up to `max_size` and handed back out on
+    release instead of being closed. The pool belongs to the process that
+    created it; after a fork the child starts over with an empty pool rather
+    than sharing the parent's file handles.
+    """
+
+    def __init__(self, config: PoolConfig) -> None:
+        self.config = config
+        self._cond = threading.Condition()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._idle: list[sqlite3.Connection] = []
+        self._size = 0
+        self._stats = PoolStats()
+        self._warmed = False
+
+    def connect(self) -> sqlite3.Connection:
+        c = self.config
+        factory = instrument.Connection if c.instrument else sqlite3.Connection
+        conn = sqlite3.connect(c.path, timeout=c.busy_timeout_ms / 1000, check_same_thread=False, factory=factory)
+        conn.execute("PRAGMA journal_mode = WAL;")
+        conn.execute("PRAGMA synchronous = NORMAL;")
+        conn.execute(f"PRAGMA cache_size = {-c.cache_size_kib};")
+        conn.execute(f"PRAGMA mmap_size = {c.mmap_size};")
+        conn.execute(f"PRAGMA busy_timeout = {c.busy_timeout_ms};")
+        conn.execute("PRAGMA foreign_keys = ON;")
+        # Touch the schema so the first real statement doesn't pay to parse it
+        conn.execute("SELECT count(*) FROM sqlite_schema").fetchone()
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _check_pid(self) -> None:
+        if self._pid != os.getpid():
+            self._reset()
+
+    def warm(self) -> None:
+        """Opens connections up to `min_size` so early requests don't pay for it."""
+        with self._cond:
+            self._check_pid()
+            self._warmed = True
+            count = max(0, min(self.config.min_size, self.config.max_size) - self._size)
+            self._size += count
+        opened: list[sqlite3.Connection] = []
+        try:
+            for _ in range(count):
+                opened.append(self.connect())
+        finally:
+            with self._cond:
+                self._size -= count - len(opened)
+                self._idle.extend(opened)
+                self._cond.notify_all()
+
+    def acquire(self) -> sqlite3.Connection:
+        """Hands out an idle connection, or opens one if the pool has room.
+        The slot is reserved under the lock and the connection opened
+        outside it, so a slow open doesn't hold up threads returning
+        theirs."""
+        with self._cond:
+            self._check_pid()
+            warm = not self._warmed
+        if warm:
+            self.warm()
+
+        with self._cond:
+            self._stats.acquired += 1
+            if self._idle:
+                self._stats.hits += 1
+                return self._idle.pop()
+
+            if self._size >= self.config.max_size:
+                self._stats.waits += 1
+                start = time.monotonic()
+                # A slot freed by a failed open will do as well as a connection
+                ok = self._cond.wait_for(lambda: self._idle or self._size < self.config.max_size,
+                                         self.config.acquire_timeout)
+                self._stats.wait_seconds += time.monotonic() - start
+                if not ok:
+                    self._stats.timeouts += 1
+                    raise PoolTimeout("timed out waiting for a database connection")
+                if self._idle:
+                    return self._idle.pop()
+
+            self._stats.misses += 1
+            self._size += 1
+
+        try:
+            return self.connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if self._pid != os.getpid():
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            for conn in self._idle:
+                conn.close()
+            self._size -= len(self._idle)
+            self._idle = []
+
+    def stats(self) -> PoolStats:
+        with self._cond:
+            self._check_pid()
+            s = PoolStats(**asdict(self._stats))
+            s.size = self._size
+            s.idle = len(self._idle)
+            s.in_use = self._size - s.idle
+            return s
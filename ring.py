@@ -0,0 +1,141 @@
+from array import array
+from typing import Iterable, Iterator
+
+NONE = -1
+
+
+class Ring:
+    """The target cycle of a game, held as successor/predecessor arrays
+    indexed by player position.
+
+    `succ[i]` is the index of player i's target and `pred[i]` the index of
+    the player targeting them, so finding an assassin, reassigning a target
+    or eliminating a player are all constant time. Links that can't be
+    represented (targets outside the game, two players sharing a target) are
+    kept aside so `check` can report them.
+    """
+
+    __slots__ = ('ids', 'index', 'succ', 'pred', 'alive', 'dangling', 'shared')
+
+    def __init__(self, ids: list[str]) -> None:
+        n = len(ids)
+        self.ids = ids
+        self.index = {id: i for i, id in enumerate(ids)}
+        self.succ = array('q', [NONE]) * n
+        self.pred = array('q', [NONE]) * n
+        self.alive = bytearray(b'\x01') * n
+        self.dangling: list[tuple[int, str]] = []
+        self.shared: list[tuple[int, int]] = []
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple[str, str | None, int]]) -> 'Ring':
+        """Builds a ring from (account_id, target_user_id, eliminated) rows."""
+        rows = list(rows)
+        ring = cls([row[0] for row in rows])
+        index = ring.index
+        for i, (_, target, eliminated) in enumerate(rows):
+            if eliminated:
+                ring.alive[i] = 0
+            if target is None:
+                continue
+            j = index.get(target)
+            if j is None:
+                ring.dangling.append((i, target))
+                continue
+            ring.succ[i] = j
+            if ring.pred[j] != NONE:
+                ring.shared.append((ring.pred[j], i))
+            ring.pred[j] = i
+        return ring
+
+    @classmethod
+    def from_targets(cls, ids: list[str], targets: list[int]) -> 'Ring':
+        """Builds a ring where player i targets player targets[i]."""
+        ring = cls(ids)
+        for i, j in enumerate(targets):
+            ring.succ[i] = j
+            ring.pred[j] = i
+        return ring
+
+    def __len__(self) -> int:
+        return self.alive.count(1)
+
+    def target_of(self, id: str) -> str | None:
+        j = self.succ[self.index[id]]
+        return self.ids[j] if j != NONE else None
+
+    def assassin_of(self, id: str) -> str | None:
+        i = self.pred[self.index[id]]
+        return self.ids[i] if i != NONE else None
+
+    def eliminate(self, i: int) -> tuple[int, int]:
+        """Removes player i from the ring, handing their target to their
+        assassin. Returns (assassin, new target) indices."""
+        j = self.succ[i]
+        a = self.pred[i]
+        if j == NONE or a == NONE or j == i:
+            raise ValueError(f"{self.ids[i]} can't be eliminated")
+        self.succ[a] = j
+        self.pred[j] = a
+        self.succ[i] = NONE
+        self.pred[i] = NONE
+        self.alive[i] = 0
+        return a, j
+
+    def walk(self, start: int) -> Iterator[int]:
+        """Yields indices along the ring from `start` until it loops back or
+        a link is missing."""
+        i = start
+        for _ in range(len(self.ids)):
+            yield i
+            i = self.succ[i]
+            if i == NONE or i == start:
+                return
+
+    def mapping(self) -> list[tuple[str, str]]:
+        return [(self.ids[i], self.ids[j]) for i, j in enumerate(self.succ) if j != NONE]
+
+    def check(self) -> list[str]:
+        """Validates that the living players form exactly one cycle, in
+        linear time. Returns a description of every broken link found."""
+        problems: list[str] = []
+        ids, succ, pred, alive = self.ids, self.succ, self.pred, self.alive
+
+        for i, target in self.dangling:
+            problems.append(f"{ids[i]} targets {target}, who is not in the game")
+        for first, second in self.shared:
+            problems.append(f"{ids[first]} and {ids[second]} share the target {ids[succ[second]]}")
+
+        no_target = {i for i, _ in self.dangling}
+        for i in range(len(ids)):
+            j = succ[i]
+            if not alive[i]:
+                if j != NONE:
+                    problems.append(f"{ids[i]} is eliminated but still targets {ids[j]}")
+                continue
+            if j == NONE:
+                if i not in no_target:
+                    problems.append(f"{ids[i]} has no target")
+            elif not alive[j]:
+                problems.append(f"{ids[i]} targets {ids[j]}, who is eliminated")
+            if pred[i] == NONE:
+                problems.append(f"nobody targets {ids[i]}")
+
+        # Follow successors from every unvisited player, stamping each walk;
+        # reaching a player stamped by the current walk closes a new cycle
+        stamp = array('q', [NONE]) * len(ids)
+        cycles = 0
+        for start in range(len(ids)):
+            if stamp[start] != NONE or not alive[start]:
+                continue
+            i = start
+            while i != NONE and stamp[i] == NONE:
+                stamp[i] = start
+                i = succ[i]
+            if i != NONE and stamp[i] == start:
+                cycles += 1
+        if cycles > 1:
+            problems.append(f"living players form {cycles} separate cycles")
+        elif cycles == 0 and len(self) > 0:
+            problems.append("living players don't form a cycle")
+        return problems
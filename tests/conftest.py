@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as application
+import db
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """An app backed by a fresh database, migrated to the latest schema."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "db.sqlite"))
+    monkeypatch.setenv("JWT_SECRET", "test-secret")
+    monkeypatch.setenv("FLASK_SECRET", "test")
+    a = application.create_app()
+    with a.app_context():
+        db.init_db(db.get_db())
+        yield a
@@ -0,0 +1,60 @@
+import pytest
+
+import auth
+import db
+import handles
+import util
+
+
+@pytest.fixture
+def game(app):
+    # The first player imported owns the game
+    game_id = db.create_game("Spring")
+    ids = [f"player-{i}" for i in range(5)]
+    db.import_roster(game_id, [(id, id, f"{id}@example.com") for id in ids])
+    return game_id, ids
+
+
+def get(app, path: str, account_id: str | None = None, **args):
+    client = app.test_client()
+    if account_id:
+        client.set_cookie("jwt_cookie", auth.create_bearer_token(account_id))
+    return client.get(f"/api/v1{path}", query_string=args)
+
+
+def roster(app, game_id, account_id: str | None) -> list[str]:
+    """Every player id the caller is shown, following `next` page by page."""
+    ids, after = [], None
+    while True:
+        args = {"limit": 2} | ({"after": after} if after else {})
+        page = get(app, f"/games/{util.uuid_to_str(game_id)}/players", account_id, **args).get_json()
+        ids += [p["id"] for p in page["players"]]
+        if (after := page["next"]) is None:
+            return ids
+
+
+@pytest.mark.parametrize("viewer", [None, "player-1", "stranger"])
+def test_everyone_but_the_owner_only_sees_handles(app, game, viewer):
+    game_id, ids = game
+    shown = get(app, f"/games/{util.uuid_to_str(game_id)}", viewer).get_json()
+    assert shown["owner"] == handles.player(game_id.bytes, ids[0])
+
+    players = roster(app, game_id, viewer)
+    assert sorted(players) == sorted(handles.player(game_id.bytes, id) for id in ids)
+    assert not set(players) & set(ids)
+
+
+def test_owner_sees_account_ids(app, game):
+    game_id, ids = game
+    assert get(app, f"/games/{util.uuid_to_str(game_id)}", ids[0]).get_json()["owner"] == ids[0]
+    assert roster(app, game_id, ids[0]) == ids
+
+
+def test_after_takes_only_a_sealed_cursor(app, game):
+    game_id, ids = game
+    path = f"/games/{util.uuid_to_str(game_id)}/players"
+    assert get(app, path, after=ids[1]).status_code == 400
+    assert get(app, path, ids[0], after=ids[1]).status_code == 400
+
+    page = get(app, path, after=handles.seal(ids[1])).get_json()
+    assert [p["id"] for p in page["players"]] == [handles.player(game_id.bytes, id) for id in ids[2:]]
@@ -0,0 +1,67 @@
+import db
+from bench import common
+
+
+def seat(id: str) -> str:
+    """A player's place in their game, the same in games populated alike."""
+    return id.rsplit("-", 1)[1]
+
+
+def outcome(game_id) -> tuple:
+    conn = db.get_db()
+    users = sorted(
+        (seat(row["account_id"]), row["target_user_id"] and seat(row["target_user_id"]),
+         row["eliminated"], row["elimination_count"])
+        for row in conn.execute("""
+            SELECT account_id, target_user_id, eliminated, elimination_count FROM users
+            WHERE game_id = ?""", (game_id.bytes,)))
+    logs = [(row["user_id"] and seat(row["user_id"]), seat(row["target_id"]))
+            for row in conn.execute("""
+                SELECT user_id, target_id FROM logs WHERE game_id = ? ORDER BY id""", (game_id.bytes,))]
+    stats = tuple(conn.execute("""
+        SELECT players, alive, kills, forfeits FROM game_stats WHERE game_id = ?""", (game_id.bytes,)).fetchone())
+    return users, logs, stats
+
+
+def test_batch_and_single_elimination_agree(app):
+    single, single_ids = common.populate(30, eliminated=4)
+    batch, batch_ids = common.populate(30, eliminated=4)
+    assert outcome(single) == outcome(batch)
+
+    # Consecutive kills along the ring, a forfeit and a player already out,
+    # by seat so both games get the same
+    targets = db.get_ring(single)
+    chain = [targets.ids[i] for i in targets.walk(targets.index[single_ids[0]])][1:5]
+    forfeit = next(id for id in single_ids[1:] if targets.target_of(id) and id not in chain)
+    out = next(id for id in single_ids if targets.target_of(id) is None)
+    seats = [(int(seat(id)), 1) for id in chain] + [(int(seat(forfeit)), 0), (int(seat(out)), 1)]
+
+    applied = 0
+    for i, elim_count in seats:
+        applied += db.eliminate_user(single, single_ids[i], elim_count)
+    assert applied == 5
+    eliminations = [(batch_ids[i], elim_count) for i, elim_count in seats] + [("nobody", 1)]
+    assert db.eliminate_users(batch, eliminations) == applied
+
+    assert outcome(single) == outcome(batch)
+    assert db.get_ring(batch).check() == []
+
+    # Everyone left, by seat; the last player standing stays in either way
+    targets = db.get_ring(single)
+    seats = [int(seat(id)) for id in single_ids if targets.target_of(id)]
+    applied = sum(db.eliminate_user(single, single_ids[i], 1) for i in seats)
+    assert applied == len(seats) - 1
+    assert db.eliminate_users(batch, [(batch_ids[i], 1) for i in seats]) == applied
+
+    assert outcome(single) == outcome(batch)
+    last = next(id for id in single_ids if db.get_ring(single).target_of(id))
+    assert db.get_ring(single).target_of(last) == last
+    assert db.get_ring(batch).check() == []
+
+
+def test_batch_of_players_already_out_changes_nothing(app):
+    game_id, ids = common.populate(10, eliminated=3)
+    before = outcome(game_id)
+    out = [id for id in ids if db.get_ring(game_id).target_of(id) is None]
+    assert db.eliminate_users(game_id, [(id, 1) for id in out]) == 0
+    assert outcome(game_id) == before
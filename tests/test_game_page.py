@@ -0,0 +1,20 @@
+import auth
+import db
+import util
+
+
+def test_only_the_viewers_own_etag_earns_a_304(app):
+    game_id = db.create_game("Spring")
+    db.import_roster(game_id, [("alice", "Alice", "alice@example.com"), ("bob", "Bob", "bob@example.com")])
+    path = f"/games/{util.uuid_to_str(game_id)}"
+
+    owner = app.test_client()
+    owner.set_cookie("jwt_cookie", auth.create_bearer_token("alice"))
+    page = owner.get(path)
+    assert page.status_code == 200 and "Last-Modified" not in page.headers
+    assert owner.get(path, headers={"If-None-Match": page.headers["ETag"]}).status_code == 304
+
+    # The owner's copy is no good to anyone else, however recent
+    since = {"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"}
+    assert app.test_client().get(path, headers=since).status_code == 200
+    assert app.test_client().get(path, headers={"If-None-Match": page.headers["ETag"], **since}).status_code == 200
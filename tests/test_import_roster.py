@@ -0,0 +1,33 @@
+import db
+import util
+
+
+def test_renaming_players_refreshes_every_game_showing_them(app):
+    game_id, other_id = db.create_game("Spring"), db.create_game("Summer")
+    roster = [("alice", "Alice", "alice@example.com"), ("bob", "Bob", "bob@example.com")]
+    assert db.import_roster(game_id, roster).players == 2
+    assert db.import_roster(other_id, roster[:1]).players == 1
+
+    client = app.test_client()
+    path = f"/games/{util.uuid_to_str(game_id)}"
+    page = client.get(path)
+    assert b"Alice" in page.data
+    other_version = db.get_game_version(other_id)[0]
+
+    totals = db.import_roster(game_id, [("alice", "Alicia", "alice@example.com")], update_accounts=True)
+    assert (totals.accounts, totals.players) == (1, 0)
+
+    again = client.get(path, headers={"If-None-Match": page.headers["ETag"]})
+    assert again.status_code == 200 and b"Alicia" in again.data
+    assert db.get_game_version(other_id)[0] > other_version
+
+
+def test_unchanged_accounts_leave_games_alone(app):
+    game_id = db.create_game("Spring")
+    roster = [("alice", "Alice", "alice@example.com")]
+    db.import_roster(game_id, roster)
+    version = db.get_game_version(game_id)[0]
+
+    totals = db.import_roster(game_id, roster, update_accounts=True)
+    assert (totals.accounts, totals.players) == (0, 0)
+    assert db.get_game_version(game_id)[0] == version
@@ -0,0 +1,125 @@
+import os
+import shutil
+import sqlite3
+import uuid
+
+import pytest
+
+import migrate
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+CONFIG = migrate.MigrateConfig(batch_size=7, pause=0)
+
+BASE = """
+CREATE TABLE teams (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE members (
+  team_id INTEGER NOT NULL REFERENCES teams(id),
+  name TEXT NOT NULL
+);
+"""
+
+# Rebuilds members with a primary key, and meanwhile writes to the old
+# table as the app would, which the mirroring triggers must carry over
+REBUILD = '''
+import migrate
+
+def upgrade(m):
+    m.execute("""
+        CREATE TABLE members_new (
+          team_id INTEGER NOT NULL REFERENCES teams(id),
+          name TEXT NOT NULL,
+          PRIMARY KEY (team_id, name)
+        ) WITHOUT ROWID""")
+    m.backfill(migrate.Copy("members", "members_new", {
+        "team_id": "{row}.team_id",
+        "name": "{row}.name",
+    }, key=("team_id", "name")))
+    m.execute("""
+        INSERT INTO members (team_id, name) VALUES (1, 'late');
+        UPDATE members SET name = 'renamed' WHERE name = 'm3';
+        DELETE FROM members WHERE name = 'm4';""")
+    m.finish("""
+        DROP TABLE members;
+        ALTER TABLE members_new RENAME TO members;""")
+'''
+
+
+def connect(path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def counts(conn: sqlite3.Connection, *tables: str) -> dict[str, int]:
+    return {t: conn.execute(f"""SELECT count(*) FROM {t}""").fetchone()[0] for t in tables}
+
+
+def test_backfill_and_finish_keep_rows_and_foreign_keys(tmp_path):
+    folder = tmp_path / "migrations"
+    folder.mkdir()
+    (folder / "0000_base.sql").write_text(BASE)
+    conn = connect(tmp_path / "db.sqlite")
+    migrate.upgrade(conn, str(folder), CONFIG, echo=lambda _: None)
+    conn.executemany("""INSERT INTO teams (id, name) VALUES (?, ?)""", [(i, f"t{i}") for i in range(1, 6)])
+    conn.executemany("""INSERT INTO members (team_id, name) VALUES (?, ?)""",
+                     [(i % 5 + 1, f"m{i}") for i in range(50)])
+
+    (folder / "0001_rebuild.py").write_text(REBUILD)
+    assert [m.name for m in migrate.upgrade(conn, str(folder), CONFIG, echo=lambda _: None)] == ["rebuild"]
+
+    assert counts(conn, "teams", "members") == {"teams": 5, "members": 50}
+    names = {row["name"] for row in conn.execute("""SELECT name FROM members""")}
+    assert {"late", "renamed"} <= names and not {"m3", "m4"} & names
+    assert conn.execute("""PRAGMA foreign_key_check""").fetchall() == []
+    assert conn.execute("""SELECT 1 FROM sqlite_schema WHERE name LIKE '%_mirror_%'""").fetchone() is None
+    assert migrate.pending(conn, str(folder)) == []
+
+
+def test_finish_refuses_a_copy_that_fell_behind(tmp_path):
+    folder = tmp_path / "migrations"
+    folder.mkdir()
+    (folder / "0000_base.sql").write_text(BASE)
+    conn = connect(tmp_path / "db.sqlite")
+    migrate.upgrade(conn, str(folder), CONFIG, echo=lambda _: None)
+    conn.execute("""INSERT INTO teams (id, name) VALUES (1, 't1')""")
+    conn.executemany("""INSERT INTO members (team_id, name) VALUES (1, ?)""", [(f"m{i}",) for i in range(10)])
+
+    (folder / "0001_rebuild.py").write_text(REBUILD.replace(
+        "    m.finish(", "    m.execute(\"DELETE FROM members_new WHERE name = 'm0'\")\n    m.finish("))
+    with pytest.raises(sqlite3.IntegrityError):
+        migrate.upgrade(conn, str(folder), CONFIG, echo=lambda _: None)
+    assert [m.name for m in migrate.pending(conn, str(folder))] == ["rebuild"]
+    assert counts(conn, "members") == {"members": 10}
+
+
+def test_upgrading_populated_database_keeps_rows_and_foreign_keys(tmp_path):
+    # A database as the app left it before the latest migration
+    old = tmp_path / "old"
+    old.mkdir()
+    latest = migrate.discover(MIGRATIONS)[-1]
+    for m in migrate.discover(MIGRATIONS)[:-1]:
+        shutil.copy(m.path, old)
+    conn = connect(tmp_path / "db.sqlite")
+    migrate.upgrade(conn, str(old), CONFIG, echo=lambda _: None)
+
+    conn.execute("""INSERT INTO log_messages (elim, forfeit) VALUES ('got', 'left')""")
+    games = [uuid.uuid4().bytes for _ in range(20)]
+    for n, game in enumerate(games):
+        conn.execute("""INSERT INTO games (uuid, name) VALUES (?, ?)""", (game, f"Game {n}"))
+        conn.execute("""INSERT INTO game_stats (game_id, players, alive) VALUES (?, 3, 3)""", (game,))
+        players = [f"{n}-{i}" for i in range(3)]
+        conn.executemany("""INSERT OR IGNORE INTO accounts (id, name, email) VALUES (?, ?, '')""",
+                         [(p, p) for p in players])
+        conn.executemany("""INSERT INTO users (game_id, account_id) VALUES (?, ?)""", [(game, p) for p in players])
+        conn.execute("""UPDATE games SET owner_id = ? WHERE uuid = ?""", (players[0], game))
+        conn.execute("""INSERT INTO logs (game_id, user_id, target_id, msg_id) VALUES (?, ?, ?, 1)""",
+                     (game, players[0], players[1]))
+    conn.execute("""DELETE FROM games WHERE uuid = ?""", (games[3],))
+    tables = ("games", "accounts", "users", "logs", "game_stats")
+    before = counts(conn, *tables)
+
+    assert migrate.upgrade(conn, MIGRATIONS, CONFIG, echo=lambda _: None) == [latest]
+    assert counts(conn, *tables) == before
+    assert conn.execute("""PRAGMA foreign_key_check""").fetchall() == []
+    conn.execute("""INSERT INTO games_fts (games_fts, rank) VALUES ('integrity-check', 1)""")
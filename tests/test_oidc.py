@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+import oidc
+from bench.idp import StandInProvider
+
+
+@pytest.fixture
+def provider():
+    p = StandInProvider("test-client")
+    yield p
+    p.close()
+
+
+def test_document_is_fetched_once_while_fresh(provider):
+    discovery = oidc.CachedDocument(lambda: provider.discovery_url, dict)
+    for _ in range(5):
+        assert discovery.get()["jwks_uri"] == f"{provider.url}/jwks"
+    assert provider.requests["/.well-known/openid-configuration"] == 1
+
+
+def test_expired_document_is_served_stale_while_it_refreshes(provider):
+    provider.cache_control = "max-age=0, stale-while-revalidate=60"
+    discovery = oidc.CachedDocument(lambda: provider.discovery_url, dict)
+    first = discovery.get()
+    assert discovery.get() is first
+    deadline = time.monotonic() + 5
+    while discovery.fetches < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert discovery.fetches == 2
+
+
+def test_failed_refresh_keeps_the_last_good_copy(provider):
+    provider.cache_control = "max-age=0, stale-while-revalidate=0"
+    url = provider.discovery_url
+    discovery = oidc.CachedDocument(lambda: url, dict)
+    first = discovery.get()
+    url = f"{provider.url}/missing"
+    assert discovery.get() == first
+    assert discovery.errors == 1
+
+
+def test_unknown_kid_refetches_keys_at_most_once_per_interval(provider, monkeypatch):
+    monkeypatch.setattr(oidc, "MIN_REFETCH_INTERVAL", 60)
+    keys = oidc.KeySet(lambda: f"{provider.url}/jwks")
+    assert keys.get(provider.kid) is not None
+
+    provider.rotate()
+    assert keys.get(provider.kid) is not None
+    assert provider.requests["/jwks"] == 2
+
+    assert keys.get("forged") is None
+    assert keys.get("forged-again") is None
+    assert provider.requests["/jwks"] == 2
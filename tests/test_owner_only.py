@@ -0,0 +1,46 @@
+import pytest
+
+import auth
+import db
+import util
+
+
+@pytest.fixture
+def game(app, monkeypatch):
+    # Not started yet; the first player imported owns it
+    game_id = db.create_game("Spring")
+    ids = [f"player-{i}" for i in range(6)]
+    db.import_roster(game_id, [(id, id, f"{id}@example.com") for id in ids])
+    loads = []
+    get_users_by_game = db.get_users_by_game
+    monkeypatch.setattr(db, "get_users_by_game", lambda g: loads.append(g) or get_users_by_game(g))
+    return game_id, ids, loads
+
+
+def post(app, game_id, action: str, account_id: str | None = None, **form):
+    client = app.test_client()
+    if account_id:
+        client.set_cookie("jwt_cookie", auth.create_bearer_token(account_id))
+    return client.post(f"/games/{util.uuid_to_str(game_id)}/{action}", data=form)
+
+
+def test_anonymous_callers_and_other_players_are_turned_away_before_the_roster_loads(app, game):
+    game_id, ids, loads = game
+    assert post(app, game_id, "start").status_code == 401
+    assert post(app, game_id, "start", ids[1]).status_code == 403
+    assert post(app, game_id, "start", "stranger").status_code == 403
+    assert loads == []
+
+    assert post(app, game_id, "start", ids[0]).status_code == 302
+    assert loads == [game_id]
+
+
+def test_started_gating(app, game):
+    game_id, ids, _ = game
+    assert post(app, game_id, "eliminate_user", ids[0], user_id=ids[1], elim_count=1).status_code == 403
+    assert post(app, game_id, "delete_user", ids[0], user_id=ids[5]).status_code == 302
+
+    assert post(app, game_id, "start", ids[0]).status_code == 302
+    assert post(app, game_id, "delete_user", ids[0], user_id=ids[4]).status_code == 403
+    assert post(app, game_id, "eliminate_user", ids[0], user_id=ids[1], elim_count=1).status_code == 302
+    assert db.get_ring(game_id).target_of(ids[1]) is None
@@ -0,0 +1,79 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import pool
+
+
+class SlowPool(pool.ConnectionPool):
+    """Opens connections only once `gate` is set, failing the next
+    `failures` of them."""
+
+    def __init__(self, config: pool.PoolConfig) -> None:
+        super().__init__(config)
+        self.gate = threading.Event()
+        self.gate.set()
+        self.failures = 0
+
+    def connect(self) -> sqlite3.Connection:
+        self.gate.wait()
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("unable to open database file")
+        return super().connect()
+
+
+@pytest.fixture
+def connections(tmp_path):
+    p = SlowPool(pool.PoolConfig(path=str(tmp_path / "db.sqlite"), max_size=2, min_size=1,
+                                 acquire_timeout=2, instrument=False))
+    yield p
+    p.close()
+
+
+def test_slow_open_does_not_hold_up_release(connections):
+    first = connections.acquire()
+    connections.gate.clear()
+    opening = threading.Thread(target=connections.acquire)
+    opening.start()
+    time.sleep(0.05)
+
+    start = time.monotonic()
+    connections.release(first)
+    assert time.monotonic() - start < 0.5
+    assert connections.stats().idle == 1
+    connections.gate.set()
+    opening.join()
+
+
+def test_failed_open_frees_its_slot_for_a_waiter(connections):
+    first = connections.acquire()
+    connections.gate.clear()
+    connections.failures = 1
+    errors, got = [], []
+
+    def open_one():
+        try:
+            connections.acquire()
+        except sqlite3.OperationalError as e:
+            errors.append(e)
+
+    opening = threading.Thread(target=open_one)
+    opening.start()
+    time.sleep(0.05)
+    # The pool is full with the open under way, so this one waits
+    waiting = threading.Thread(target=lambda: got.append(connections.acquire()))
+    waiting.start()
+    time.sleep(0.05)
+    assert connections.stats().waits == 1
+
+    connections.gate.set()
+    opening.join()
+    waiting.join()
+    assert len(errors) == 1 and len(got) == 1
+    stats = connections.stats()
+    assert stats.size == 2 and stats.timeouts == 0
+    connections.release(first)
+    connections.release(got[0])
@@ -0,0 +1,54 @@
+import random
+
+import db
+import ring
+from bench import common
+
+
+def test_ring_stays_one_cycle_after_eliminations(app):
+    game_id, ids = common.populate(40)
+    rng = random.Random(1)
+    for target in rng.sample(ids[1:], 30):
+        assert db.eliminate_user(game_id, target, rng.randint(0, 1))
+        targets = db.get_ring(game_id)
+        assert targets.check() == []
+        assert targets.target_of(target) is None
+
+    alive = [user.id for user in db.get_users_by_game(game_id) if not user.eliminated]
+    targets = db.get_ring(game_id)
+    assert len(targets) == len(alive) == 10
+    walked = [targets.ids[i] for i in targets.walk(targets.index[alive[0]])]
+    assert sorted(walked) == sorted(alive)
+
+
+def test_ring_stays_one_cycle_after_batch_eliminations(app):
+    game_id, ids = common.populate(40, eliminated=5)
+    targets = db.get_ring(game_id)
+    # A run of consecutive kills along the ring, then scattered ones
+    start = targets.index[ids[0]]
+    chain = [targets.ids[i] for i in targets.walk(start)][1:6]
+    rest = [id for id in ids[1:] if id not in chain and targets.target_of(id)][:10]
+    assert db.eliminate_users(game_id, [(id, 1) for id in chain] + [(id, 0) for id in rest]) == 15
+
+    targets = db.get_ring(game_id)
+    assert targets.check() == []
+    assert len(targets) == 40 - 5 - 15
+
+
+def test_check_reports_broken_rings():
+    ids = [f"p{i}" for i in range(6)]
+    assert ring.Ring.from_targets(ids, [1, 2, 3, 4, 5, 0]).check() == []
+    # Two cycles of three
+    assert ring.Ring.from_targets(ids, [1, 2, 0, 4, 5, 3]).check()
+
+    shared = ring.Ring.from_rows([("a", "b", 0), ("b", "a", 0), ("c", "a", 0)])
+    assert any("share the target" in problem for problem in shared.check())
+    dangling = ring.Ring.from_rows([("a", "b", 0), ("b", "z", 0)])
+    assert any("not in the game" in problem for problem in dangling.check())
+
+
+def test_eliminate_hands_the_target_to_the_assassin():
+    targets = ring.Ring.from_targets(["a", "b", "c", "d"], [1, 2, 3, 0])
+    assert targets.eliminate(targets.index["b"]) == (targets.index["a"], targets.index["c"])
+    assert targets.target_of("a") == "c" and targets.assassin_of("c") == "a"
+    assert targets.check() == [] and len(targets) == 3
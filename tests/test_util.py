@@ -0,0 +1,26 @@
+import pytest
+
+import ring
+import util
+from bench.targets import CHI2_CRITICAL_23, uniformity
+
+PATHS = [pytest.param(util.np, id="numpy", marks=pytest.mark.skipif(util.np is None, reason="NumPy not installed")),
+         pytest.param(None, id="pure python")]
+
+
+@pytest.fixture(params=PATHS)
+def path(request, monkeypatch):
+    monkeypatch.setattr(util, "np", request.param)
+
+
+def test_gen_cycle_is_uniform_over_single_cycles(path):
+    assert uniformity(util.gen_cycle) < CHI2_CRITICAL_23
+
+
+def test_seed_reproduces_the_cycle(path):
+    ids = [str(i) for i in range(1000)]
+    first = [int(t) for t in util.gen_cycle(1000, seed=7)]
+    assert [int(t) for t in util.gen_cycle(1000, seed=7)] == first
+    assert [int(t) for t in util.gen_cycle(1000, seed=8)] != first
+    assert ring.Ring.from_targets(ids, first).check() == []
+    assert list(util.gen_target_maps(ids, seed=7, chunk_size=300)) == [(ids[i], ids[t]) for i, t in enumerate(first)]
@@ -0,0 +1,22 @@
+import sqlite3
+
+import pytest
+
+import writer
+
+
+def test_failed_connect_fails_waiting_writes_and_retries(tmp_path):
+    attempts = []
+
+    def connect() -> sqlite3.Connection:
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("unable to open database file")
+        return sqlite3.connect(tmp_path / "db.sqlite", isolation_level=None, check_same_thread=False)
+
+    queue = writer.WriteQueue(connect, writer.WriterConfig(queue=True))
+    with pytest.raises(sqlite3.OperationalError):
+        queue.submit(lambda conn: 1).result(5)
+
+    assert queue.submit(lambda conn: conn.execute("SELECT 2").fetchone()[0]).result(5) == 2
+    assert len(attempts) == 2
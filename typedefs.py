@@ -1,21 +1,42 @@
+import base64
 import uuid
 from dataclasses import dataclass
 
 class Game:
-    def __init__(self, id: uuid.UUID, name: str, owner: str | None, started: bool, announcement: str | None) -> None:
-        self.id = id
+    """A row of games. Rows arrive holding the id as its 16 stored bytes,
+    which are only turned into a UUID when something reads `id`."""
+    __slots__ = ("_id", "name", "owner", "started", "announcement", "version", "updated_at")
+
+    def __init__(self, id: uuid.UUID | bytes, name: str, owner: str | None, started: bool, announcement: str | None, version: int = 0, updated_at: int = 0) -> None:
+        self._id = id
         self.name = name
         self.owner = owner
         self.started = started
         self.announcement = announcement
+        self.version = version
+        self.updated_at = updated_at
 
-@dataclass
+    @property
+    def id(self) -> uuid.UUID:
+        if not isinstance(self._id, uuid.UUID):
+            self._id = uuid.UUID(bytes=self._id)
+        return self._id
+
+    @id.setter
+    def id(self, value: uuid.UUID) -> None:
+        self._id = value
+
+# The per-row records are slotted, since a roster or log can hold tens of
+# thousands of them, and db.py builds them positionally from tuple rows, so
+# their field order is also the order of its *_COLUMNS lists
+
+@dataclass(slots=True)
 class Account:
     id: str
     name: str
     email: str
 
-@dataclass
+@dataclass(slots=True)
 class User:
     id: str
     name: str
@@ -23,12 +44,14 @@ class User:
     eliminated: bool
     elimination_count: int
 
-@dataclass
+@dataclass(slots=True)
 class Log:
     user: str
     target: str
     elim_msg: str
     forfeit_msg: str
+    ts: int = 0
+    id: int = 0
 
     def to_str(self) -> str:
         if self.user:
@@ -36,3 +59,85 @@ class Log:
         else:
             return f"{self.target} {self.forfeit_msg}"
 
+    @property
+    def cursor(self) -> str:
+        """Where this entry sits in its game's log, ordered by (ts, id)."""
+        return f"{self.ts}.{self.id}"
+
+@dataclass
+class LogPage:
+    logs: list[Log]
+    # Whether further entries lie beyond this page, in the direction it was read
+    more: bool
+
+@dataclass(slots=True)
+class GameListing:
+    """A game as the directory lists it, holding the id as stored."""
+    key: bytes
+    name: str
+    status: str
+    players: int
+
+    @property
+    def id(self) -> uuid.UUID:
+        return uuid.UUID(bytes=self.key)
+
+    @property
+    def cursor(self) -> str:
+        """Where this game sits in the directory, by its name and id, from
+        which a search finds its place among the matches too."""
+        return base64.urlsafe_b64encode(self.key + self.name.encode()).decode()
+
+@dataclass
+class GamePage:
+    games: list[GameListing]
+    # Whether further games follow this page
+    more: bool
+
+@dataclass
+class RosterImport:
+    rows: int = 0
+    # Accounts created, or with update_accounts also changed
+    accounts: int = 0
+    # Players added to the game; the rest of the rows were already in it
+    players: int = 0
+
+@dataclass
+class GameStats:
+    players: int
+    alive: int
+    kills: int
+    forfeits: int
+    started_at: int | None
+    last_elimination_at: int | None
+    # (name, eliminations) of the leading players, best first
+    top_killers: list[tuple[str, int]]
+
+    @property
+    def kills_per_hour(self) -> float | None:
+        """Kills over the time from the start to the latest elimination, so
+        the figure only moves when the game does."""
+        if self.started_at is None or self.last_elimination_at is None:
+            return None
+        hours = (self.last_elimination_at - self.started_at) / 3600
+        return self.kills / hours if hours >= 1 / 60 else None
+
+@dataclass
+class GameView:
+    """The parts of the game page shared by every viewer."""
+    game: Game
+    users: list[User]
+    logs: list[Log]
+    by_id: dict[str, User]
+    more_logs: bool = False
+    stats: GameStats | None = None
+
+@dataclass
+class GameSnapshot:
+    game: Game
+    users: list[User]
+    user: User | None
+    target: User | None
+    logs: list[Log]
+    more_logs: bool = False
+    stats: GameStats | None = None
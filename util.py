@@ -2,6 +2,12 @@ import base64
 import uuid
 import bcrypt
 import random
+from typing import Iterator, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 def hash_pwd(plaintext: bytes) -> bytes:
     return bcrypt.hashpw(plaintext, bcrypt.gensalt())
@@ -18,6 +24,21 @@ def str_to_uuid(id: str) -> uuid.UUID | None:
     except Exception:
         return None
 
+def str_to_log_cursor(cursor: str) -> tuple[int, int] | None:
+    ts, sep, id = cursor.partition(".")
+    try:
+        return (int(ts), int(id)) if sep else None
+    except ValueError:
+        return None
+
+def str_to_game_cursor(cursor: str) -> tuple[str, bytes] | None:
+    """Parses a GameListing.cursor back into its (name, uuid bytes)."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor)
+        return (raw[16:].decode(), raw[:16]) if len(raw) >= 16 else None
+    except ValueError:
+        return None
+
 
 def gen_targets(n: int) -> list[int]:
     if n <= 0: return []
@@ -37,13 +58,37 @@ def gen_targets(n: int) -> list[int]:
     assigned[ptr] = 0
     return assigned
 
-def gen_target_maps(ids: list[str]) -> list[tuple[str, str]]:
-    mapping = gen_targets(len(ids))
+def gen_cycle(n: int, seed: int | None = None) -> Sequence[int]:
+    """Returns a uniformly random single-cycle permutation, where player i
+    targets player result[i].
+
+    Shuffles the players into a random order and has each target the next,
+    the last wrapping round to the first. Uses NumPy when it is installed;
+    a seed reproduces the same cycle only on the same code path.
+    """
+    if n <= 0: return []
 
-    mapped : list[tuple[str, str]] = []
+    if np is not None:
+        order = np.random.default_rng(seed).permutation(n)
+        targets = np.empty(n, dtype=np.int64)
+        targets[order] = np.roll(order, -1)
+        return targets
 
-    for i in range(len(mapping)):
-        mapped.append((ids[i], ids[mapping[i]]))
+    order = list(range(n))
+    random.Random(seed).shuffle(order)
+    targets = [0] * n
+    for i in range(n):
+        targets[order[i - 1]] = order[i]
+    return targets
 
-    return mapped
+def gen_target_maps(ids: list[str], seed: int | None = None, chunk_size: int = 65536) -> Iterator[tuple[str, str]]:
+    """Yields (player, target) pairs for a random single cycle over `ids`,
+    a chunk at a time so large games never hold the whole mapping."""
+    mapping = gen_cycle(len(ids), seed)
 
+    for start in range(0, len(ids), chunk_size):
+        chunk = mapping[start:start + chunk_size]
+        if np is not None:
+            chunk = chunk.tolist()
+        for i, target in enumerate(chunk, start):
+            yield (ids[i], ids[target])
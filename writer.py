@@ -0,0 +1,212 @@
+import logging
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, TypeVar
+
+T = TypeVar('T')
+WriteFn = Callable[[sqlite3.Connection], T]
+
+log = logging.getLogger(__name__)
+
+# Waits for the write lock at least this long count as contended
+CONTENDED_SECONDS = float(os.getenv("DB_LOCK_CONTENDED_MS", 1)) / 1000
+
+
+@dataclass
+class WriterConfig:
+    retries: int = 5
+    backoff: float = 0.01
+    max_backoff: float = 0.5
+    queue: bool = False
+    batch_size: int = 64
+    linger: float = 0.0
+    # How long a caller waits on the write queue before giving up on a write
+    timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> 'WriterConfig':
+        default = cls()
+        return cls(
+            retries=int(os.getenv("DB_WRITE_RETRIES", default.retries)),
+            backoff=float(os.getenv("DB_WRITE_BACKOFF", default.backoff)),
+            max_backoff=float(os.getenv("DB_WRITE_MAX_BACKOFF", default.max_backoff)),
+            queue=os.getenv("DB_WRITE_QUEUE", "0") == "1",
+            batch_size=int(os.getenv("DB_WRITE_BATCH", default.batch_size)),
+            linger=float(os.getenv("DB_WRITE_LINGER", default.linger)),
+            timeout=float(os.getenv("DB_WRITE_TIMEOUT", default.timeout)))
+
+
+@dataclass
+class LockStats:
+    """Time spent in BEGIN IMMEDIATE waiting for SQLite's write lock, both
+    inside busy_timeout and across retries."""
+    acquired: int = 0
+    contended: int = 0
+    # Gave up still busy
+    failed: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+
+_lock_stats = LockStats()
+_lock_stats_lock = threading.Lock()
+
+
+def lock_stats(reset: bool = False) -> LockStats:
+    global _lock_stats
+    with _lock_stats_lock:
+        s = LockStats(**_lock_stats.__dict__)
+        if reset:
+            _lock_stats = LockStats()
+    return s
+
+
+def _record_lock_wait(seconds: float, acquired: bool) -> None:
+    with _lock_stats_lock:
+        if acquired:
+            _lock_stats.acquired += 1
+        else:
+            _lock_stats.failed += 1
+        if seconds >= CONTENDED_SECONDS:
+            _lock_stats.contended += 1
+        _lock_stats.wait_seconds += seconds
+        _lock_stats.max_wait_seconds = max(_lock_stats.max_wait_seconds, seconds)
+
+
+def is_busy(e: sqlite3.Error) -> bool:
+    code = getattr(e, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return 'locked' in str(e) or 'busy' in str(e)
+
+
+def begin_immediate(conn: sqlite3.Connection, config: WriterConfig) -> None:
+    """Takes the write lock up front, backing off and retrying while another
+    connection holds it."""
+    delay = config.backoff
+    start = time.perf_counter()
+    for attempt in range(config.retries + 1):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            _record_lock_wait(time.perf_counter() - start, True)
+            return
+        except sqlite3.OperationalError as e:
+            if not is_busy(e):
+                raise
+            if attempt == config.retries:
+                _record_lock_wait(time.perf_counter() - start, False)
+                raise
+            log.warning("database busy, retrying write in %.3fs", delay)
+            time.sleep(delay * (1 + random.random()))
+            delay = min(delay * 2, config.max_backoff)
+
+
+def run(conn: sqlite3.Connection, fn: WriteFn[T], config: WriterConfig) -> T:
+    """Runs `fn` inside its own BEGIN IMMEDIATE transaction on `conn`."""
+    begin_immediate(conn, config)
+    try:
+        result = fn(conn)
+        conn.commit()
+        return result
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+class WriteQueue:
+    """Funnels writes through one background connection.
+
+    Writes that arrive while the writer is busy are group-committed: each runs
+    under its own savepoint inside a single shared transaction, so one failing
+    write is rolled back on its own without affecting the rest of the batch.
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection], config: WriterConfig) -> None:
+        self._connect = connect
+        self.config = config
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+        self._queue: queue.SimpleQueue[tuple[WriteFn, Future]] = queue.SimpleQueue()
+        self.batches = 0
+        self.writes = 0
+
+    def _ensure_started(self) -> None:
+        # Called holding _lock
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._queue = queue.SimpleQueue()
+        threading.Thread(target=self._loop, args=(self._queue,), name="db-writer", daemon=True).start()
+
+    def submit(self, fn: WriteFn[T]) -> 'Future[T]':
+        future: Future[T] = Future()
+        # Queued under the lock, so a writer that failed to start can't miss
+        # a write queued while it was giving up
+        with self._lock:
+            self._ensure_started()
+            self._queue.put((fn, future))
+        return future
+
+    def _drain(self, q: queue.SimpleQueue) -> list[tuple[WriteFn, Future]]:
+        batch = [q.get()]
+        deadline = time.monotonic() + self.config.linger
+        while len(batch) < self.config.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(q.get(timeout=remaining) if remaining > 0 else q.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self, q: queue.SimpleQueue) -> None:
+        try:
+            conn = self._connect()
+        except Exception as e:
+            log.exception("db writer could not connect")
+            # Fail whatever is waiting, and let the next submit start over
+            with self._lock:
+                self._pid = None
+                while True:
+                    try:
+                        _, future = q.get_nowait()
+                    except queue.Empty:
+                        break
+                    future.set_exception(e)
+            return
+        while True:
+            batch = self._drain(q)
+            try:
+                results = run(conn, lambda c: self._apply(c, batch), self.config)
+            except Exception as e:
+                log.exception("group commit of %d writes failed", len(batch))
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.writes += len(batch)
+            for (_, future), (ok, value) in zip(batch, results):
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, batch: list[tuple[WriteFn, Future]]) -> list[tuple[bool, object]]:
+        results: list[tuple[bool, object]] = []
+        for fn, _ in batch:
+            conn.execute("SAVEPOINT write")
+            try:
+                results.append((True, fn(conn)))
+                conn.execute("RELEASE write")
+            except Exception as e:
+                conn.execute("ROLLBACK TO write")
+                conn.execute("RELEASE write")
+                results.append((False, e))
+        return results